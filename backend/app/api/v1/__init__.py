@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import user, auth, appointment
+from . import user, auth, appointment, metrics
 
 router = APIRouter()
 
@@ -7,4 +7,5 @@ router.include_router(user.router, prefix="/users", tags=["Users"])
 router.include_router(auth.router, prefix="/auth", tags=["Auth"])
 router.include_router(appointment.router, prefix="/appointment", tags=["Appointment"])
 router.include_router(appointment.router, prefix="/report", tags=["Report"])
+router.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
 
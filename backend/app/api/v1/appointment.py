@@ -1,69 +1,114 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, status, Query, Header, UploadFile
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import and_, func, or_, select
 from typing import Optional, Literal
-from datetime import date
+from datetime import date, timedelta
 
-from app.db.database import SessionLocal
+from sqlalchemy.orm import Session
+from app.db import bulk_import
+from app.db.database import get_async_db, get_db
 from app.db.models.user import User
-from app.db.models.appointment import Appointment
-from app.db.schemas.appointment import AppointmentCreate, AppointmentOut, AppointmentStatusUpdate
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.db.models.stats import DoctorDailyStats
+from app.db.crud.appointment import book_seat, export_query, get_appointment_with_parties, release_seat, with_parties
+from app.db.crud.availability import slot_covering
+from app.db.crud.search import name_matches
+from app.db.schemas.appointment import (
+    AppointmentCreate, AppointmentOut, AppointmentPage, AppointmentStatusUpdate, StatsDashboard
+)
+from app.core.config import settings
 from app.core.security import get_current_user
+from app.core.principal import Principal
+from app.core.idempotency import get_idempotency_store, request_fingerprint
+from app.tasks.export import export_appointments as export_appointments_task
 from app.tasks.report import generate_monthly_doctor_report
+from app.utils.export import get_encoder
+from app.utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter()
 
-# Dependency for DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # ----------------------------------------------------------
 # Patient books an appointment
+#
+# Each booking claims a seat of the covering slot, so at most `capacity`
+# bookings succeed per slot and day however many race for it; the rest get a
+# 409. Send an `Idempotency-Key` header to make retries safe: a repeated key
+# replays the first outcome instead of booking again.
 @router.post("/appointments", response_model=AppointmentOut)
-def book_appointment(
+async def book_appointment(
     data: AppointmentCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db=Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
+    if not idempotency_key:
+        return await _book(data, db, current_user)
+
+    store = get_idempotency_store()
+    key = f"{current_user.id}:{idempotency_key}"
+    replay = store.begin(key, request_fingerprint(data.model_dump_json()))
+    if replay is not None:
+        status_code, body = replay
+        return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+    try:
+        appointment = await _book(data, db, current_user)
+    except HTTPException as exc:
+        if exc.status_code < 500:
+            store.complete(key, exc.status_code, {"detail": exc.detail})
+        else:
+            store.release(key)
+        raise
+    except BaseException:
+        store.release(key)
+        raise
+    body = jsonable_encoder(AppointmentOut.model_validate(appointment, from_attributes=True))
+    store.complete(key, status.HTTP_200_OK, body)
+    return body
+
+
+async def _book(data: AppointmentCreate, db, current_user: Principal):
     if current_user.user_type != "patient":
         raise HTTPException(status_code=403, detail="Only patients can book appointments")
 
-    doctor = db.query(User).filter(User.id == data.doctor_id, User.user_type == "doctor").first()
-    if not doctor:
+    doctor_id = await db.scalar(select(User.id).where(User.id == data.doctor_id, User.user_type == "doctor"))
+    if not doctor_id:
         raise HTTPException(status_code=404, detail="Doctor not found")
 
-    if str(data.appointment_time.strftime("%H:%M")) not in doctor.available_timeslots:
+    slot = (await db.execute(slot_covering(data.doctor_id, data.appointment_time))).scalars().first()
+    if slot is None:
         raise HTTPException(status_code=400, detail="Appointment time does not match doctor's availability")
 
     appointment = Appointment(
         patient_id=current_user.id,
         doctor_id=data.doctor_id,
-        appointment_time=data.appointment_time,
+        appointment_time=data.appointment_time.replace(tzinfo=None),
         notes=data.notes
     )
 
-    db.add(appointment)
-    db.commit()
-    db.refresh(appointment)
-    return appointment
+    appointment_id = await book_seat(db, appointment, slot)
+    if appointment_id is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="This slot is already fully booked")
+    return await get_appointment_with_parties(db, appointment_id)
 
 # ----------------------------------------------------------
 # Doctor updates appointment status (e.g., Confirmed, Cancelled)
 @router.patch("/appointments/{appointment_id}/status", response_model=AppointmentOut)
-def update_appointment_status(
+async def update_appointment_status(
     appointment_id: int,
     data: AppointmentStatusUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db=Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     if current_user.user_type != "doctor":
         raise HTTPException(status_code=403, detail="Only doctors can update appointment status")
 
-    appointment = db.query(Appointment).filter_by(id=appointment_id, doctor_id=current_user.id).first()
+    result = await db.execute(
+        select(Appointment).filter_by(id=appointment_id, doctor_id=current_user.id)
+    )
+    appointment = result.scalars().first()
 
     if not appointment:
         raise HTTPException(status_code=404, detail="Appointment not found or not authorized")
@@ -72,53 +117,227 @@ def update_appointment_status(
         raise HTTPException(status_code=400, detail=f"Cannot update a {appointment.status.lower()} appointment")
 
     appointment.status = data.status
-    db.commit()
-    db.refresh(appointment)
-    return appointment
+    if data.status == AppointmentStatus.cancelled:
+        await release_seat(db, appointment.id)
+    await db.commit()
+    return await get_appointment_with_parties(db, appointment.id)
 
 # ----------------------------------------------------------
 # NEW: Get appointments list (based on user type)
-@router.get("/appointments", response_model=List[AppointmentOut])
-def list_appointments(
+#
+# Results are keyset-paginated on (appointment_time, id), newest first. Pass the
+# returned `next_cursor` back as `cursor` to fetch the following page. With
+# `format=ndjson` every matching row after the cursor is streamed instead, one
+# JSON object per line, without materializing the result set.
+STREAM_BATCH_SIZE = 500
+
+@router.get("/appointments", response_model=AppointmentPage)
+async def list_appointments(
     status: Optional[str] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
     doctor_name: Optional[str] = Query(None),  # New parameter for doctor name search
     patient_name: Optional[str] = Query(None),  # New parameter for patient name search
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    format: Literal["json", "ndjson"] = Query("json"),
+    db=Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
 ):
-    query = db.query(Appointment)
+    query = with_parties(select(Appointment))
 
     # Filtering by user role
     if current_user.user_type == "doctor":
-        query = query.filter(Appointment.doctor_id == current_user.id)
+        query = query.where(Appointment.doctor_id == current_user.id)
     elif current_user.user_type == "patient":
-        query = query.filter(Appointment.patient_id == current_user.id)
+        query = query.where(Appointment.patient_id == current_user.id)
     elif current_user.user_type != "admin":
         raise HTTPException(status_code=403, detail="Unauthorized")
 
     # Apply filters
     if status:
-        query = query.filter(Appointment.status == status)
+        query = query.where(Appointment.status == status)
     if date_from:
-        query = query.filter(Appointment.appointment_time >= date_from)
+        query = query.where(Appointment.appointment_time >= date_from)
     if date_to:
-        query = query.filter(Appointment.appointment_time <= date_to)
+        query = query.where(Appointment.appointment_time <= date_to)
 
-    # Add name-based searching
+    # Name search through the name index (see app.db.crud.search)
     if doctor_name:
-        query = query.join(User, Appointment.doctor_id == User.id)\
-                    .filter(User.full_name.ilike(f"%{doctor_name}%"))
-    
+        query = query.where(name_matches(Appointment.doctor_id, doctor_name))
     if patient_name:
-        query = query.join(User, Appointment.patient_id == User.id)\
-                    .filter(User.full_name.ilike(f"%{patient_name}%"))
-        
-    query = query.order_by(Appointment.appointment_time.desc())
-    appointments = query.all()
-    return appointments
+        query = query.where(name_matches(Appointment.patient_id, patient_name))
+
+    # Seek past the last row of the previous page
+    if cursor:
+        after_time, after_id = decode_cursor(cursor)
+        query = query.where(or_(
+            Appointment.appointment_time < after_time,
+            and_(Appointment.appointment_time == after_time, Appointment.id < after_id)
+        ))
+
+    query = query.order_by(Appointment.appointment_time.desc(), Appointment.id.desc())
+
+    if format == "ndjson":
+        return StreamingResponse(_stream_appointments(query, db), media_type="application/x-ndjson")
+
+    result = await db.execute(query.limit(limit + 1))
+    appointments = result.scalars().all()
+    next_cursor = None
+    if len(appointments) > limit:
+        appointments = appointments[:limit]
+        last = appointments[-1]
+        next_cursor = encode_cursor(last.appointment_time, last.id)
+    return {"items": appointments, "next_cursor": next_cursor}
+
+
+async def _stream_appointments(query, db):
+    # The request's session may already have been released by the time the
+    # body is sent; it reconnects on first use, so close it again when done.
+    try:
+        rows = await db.stream_scalars(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for appointment in rows:
+            yield AppointmentOut.model_validate(appointment, from_attributes=True).model_dump_json() + "\n"
+    finally:
+        await db.close()
+
+
+# ----------------------------------------------------------
+# Admin export of appointments as CSV, NDJSON or Parquet
+#
+# Rows come through a server-side cursor EXPORT_BATCH_SIZE at a time and are
+# encoded as they arrive, so memory stays flat however many match. `date_to`
+# is inclusive. For very large ranges POST the same parameters instead: a
+# Celery task then writes the file to EXPORT_DIR.
+ExportFormat = Literal["csv", "ndjson", "parquet"]
+
+@router.get("/appointments/export")
+async def export_appointments(
+    format: ExportFormat = Query("csv"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    status: Optional[AppointmentStatus] = Query(None),
+    db=Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.user_type != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export appointments")
+    try:
+        encoder = get_encoder(format, settings.EXPORT_PARQUET_ROW_GROUP)
+    except ImportError:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed")
+
+    return StreamingResponse(
+        _stream_export(export_query(date_from, date_to, status), encoder, db),
+        media_type=encoder.media_type,
+        headers={"Content-Disposition": f'attachment; filename="appointments.{encoder.extension}"'}
+    )
+
+@router.post("/appointments/export", status_code=status.HTTP_202_ACCEPTED)
+def queue_appointment_export(
+    format: ExportFormat = Query("csv"),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    status: Optional[AppointmentStatus] = Query(None),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.user_type != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can export appointments")
+    result = export_appointments_task.delay(
+        format,
+        date_from.isoformat() if date_from else None,
+        date_to.isoformat() if date_to else None,
+        status.value if status else None
+    )
+    return {"task_id": result.id}
+
+
+async def _stream_export(query, encoder, db):
+    # Like _stream_appointments, the session is reopened for the body
+    try:
+        yield encoder.begin()
+        result = await db.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            chunk = encoder.encode(rows)
+            if chunk:
+                yield chunk
+        yield encoder.finish()
+    finally:
+        await db.close()
+
+# ----------------------------------------------------------
+# Admin bulk import of appointments from CSV or NDJSON (see app.db.bulk_import).
+# Doctor and patient are given by email and must exist already; the response
+# lists the rows that were rejected.
+@router.post("/appointments/import")
+def import_appointments(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.user_type != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can import appointments")
+    try:
+        rows = bulk_import.read_upload(file.file, bulk_import.format_of(file.filename, format))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return bulk_import.import_appointments(rows, bind=db.get_bind()).as_dict()
+
+# ----------------------------------------------------------
+# Appointment statistics dashboard
+#
+# Reads only the doctor_daily_stats rollup (see app.db.models.stats), so the
+# cost depends on doctors x days, not on the number of appointments. Doctors
+# see their own figures; admins see everyone's, or one doctor's with
+# `doctor_id`. Defaults to the current month so far.
+MAX_STATS_DAYS = 366
+
+@router.get("/appointments/stats", response_model=StatsDashboard)
+async def appointment_stats(
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    doctor_id: Optional[int] = Query(None),
+    db=Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.user_type == "doctor":
+        if doctor_id not in (None, current_user.id):
+            raise HTTPException(status_code=403, detail="Doctors can only see their own statistics")
+        doctor_id = current_user.id
+    elif current_user.user_type != "admin":
+        raise HTTPException(status_code=403, detail="Unauthorized")
+
+    date_to = date_to or date.today()
+    date_from = date_from or date_to.replace(day=1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+    if date_to - date_from >= timedelta(days=MAX_STATS_DAYS):
+        raise HTTPException(status_code=400, detail=f"At most {MAX_STATS_DAYS} days at a time")
+
+    stats = DoctorDailyStats
+    scope = [stats.day >= date_from, stats.day <= date_to]
+    if doctor_id is not None:
+        scope.append(stats.doctor_id == doctor_id)
+
+    async def grouped(*keys):
+        appointments = func.sum(stats.appointments)
+        result = await db.execute(
+            select(*keys, stats.status, appointments.label("appointments"), func.sum(stats.revenue).label("revenue"))
+            .where(*scope)
+            .group_by(*keys, stats.status)
+            .having(appointments != 0)  # buckets emptied by status changes
+            .order_by(*keys, stats.status)
+        )
+        return [{**row._asdict(), "status": row.status.value} for row in result]
 
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": await grouped(),
+        "days": await grouped(stats.day),
+        "doctors": await grouped(stats.doctor_id),
+    }
 
 # ----------------------------------------------------------
 # Trigger monthly report generation (test only)
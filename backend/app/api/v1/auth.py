@@ -1,21 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from app.db.database import get_async_db
 from app.db.schemas.user import LoginSchema, TokenSchema, UserCreate, UserOut
 from app.db.crud.user import get_user_by_email, create_user, get_user_by_mobile
-from app.core.security import verify_password, create_access_token
+from app.core.security import create_access_token, hash_password_async, verify_password_async
 import os
 import uuid
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 UPLOAD_DIR = "uploads/profile_images"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
@@ -34,55 +29,69 @@ async def register(
     consultation_fee: float = Form(None),
     available_timeslots: str = Form(None),
     profile_image: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
-    existing_user = get_user_by_email(db, email)
-    if existing_user:
+    # Validate and reject duplicates before spending a bcrypt slot on the password
+    try:
+        user_data = UserCreate(
+            full_name=full_name,
+            email=email,
+            mobile_number=mobile_number,
+            password=password,
+            user_type=user_type,
+            division=division,
+            district=district,
+            thana=thana,
+            license_number=license_number,
+            experience_years=experience_years,
+            consultation_fee=consultation_fee,
+            available_timeslots=available_timeslots,
+        )
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False))
+    image_data = await profile_image.read()
+
+    if await db.run_sync(get_user_by_email, user_data.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    existing_user = get_user_by_mobile(db, mobile_number)
-    if existing_user:
+    if await db.run_sync(get_user_by_mobile, user_data.mobile_number):
         raise HTTPException(status_code=400, detail="Mobile number already registered")
 
-    image_data = await profile_image.read()
-
-    user_data = UserCreate(
-        full_name=full_name,
-        email=email,
-        mobile_number=mobile_number,
-        password=password,
-        user_type=user_type,
-        division=division,
-        district=district,
-        thana=thana,
-        profile_image=image_data,
-        license_number=license_number,
-        experience_years=experience_years,
-        consultation_fee=consultation_fee,
-        available_timeslots=available_timeslots,
-    )
+    # Hand the connection back instead of holding it while bcrypt runs
+    await db.rollback()
+    hashed_password = await hash_password_async(user_data.password)
 
-    user = create_user(db, user_data, image_data)
-    return user
+    try:
+        return await db.run_sync(create_user, user_data, image_data, hashed_password)
+    except IntegrityError:
+        # Registered concurrently since the checks above
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Email or mobile number already registered")
 
 
 @router.post("/login")
-def login(data: LoginSchema, db: Session = Depends(get_db)):
-    user = get_user_by_email(db, data.email)
-    if not user or not verify_password(data.password, user.hashed_password):
+async def login(data: LoginSchema, db=Depends(get_async_db)):
+    user = await db.run_sync(get_user_by_email, data.email)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # Read what the response needs, then hand the connection back before bcrypt runs
+    user_id, email, hashed_password = user.id, user.email, user.hashed_password
+    user_type = user.user_type.value if hasattr(user.user_type, "value") else user.user_type
+    await db.rollback()
+    if not await verify_password_async(data.password, hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # Create access token with user_type
     token = create_access_token(data={
-        "sub": user.email,
-        "user_id": user.id,
-        "user_type": user.user_type.value if hasattr(user.user_type, "value") else user.user_type
+        "sub": email,
+        "user_id": user_id,
+        "user_type": user_type
     })
 
     # ✅ Return user_type explicitly in response
     return {
         "access_token": token,
         "token_type": "bearer",
-        "user_type": user.user_type.value if hasattr(user.user_type, "value") else user.user_type,
-        "email": user.email
+        "user_type": user_type,
+        "email": email
     }
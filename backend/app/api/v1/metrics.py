@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Response
+from app.core.metrics import CONTENT_TYPE, get_http_metrics
+from app.db.database import pool_stats
+
+router = APIRouter()
+
+# ----------------------------------------------------------
+# Connection pool gauges and checkout wait/timeout counters
+@router.get("/db-pool")
+def db_pool_metrics():
+    return pool_stats()
+
+
+# ----------------------------------------------------------
+# Prometheus scrape target, mounted at /metrics by app.main: the request
+# metrics of this process (see app.core.metrics) and the pool stats above
+exposition = APIRouter()
+
+POOL_COUNTERS = ("checkouts", "timeouts")
+
+def render_pool_stats(stats: dict):
+    names = sorted({name for pool in stats.values() for name in pool})
+    for name in names:
+        counter = name in POOL_COUNTERS
+        metric = f"db_pool_{name}_total" if counter else f"db_pool_{name}"
+        yield f"# TYPE {metric} {'counter' if counter else 'gauge'}"
+        for pool, values in stats.items():
+            if name in values:
+                yield f'{metric}{{pool="{pool}"}} {values[name]}'
+
+@exposition.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    lines = [*get_http_metrics().render(), *render_pool_stats(pool_stats())]
+    return Response("\n".join(lines) + "\n", media_type=CONTENT_TYPE)
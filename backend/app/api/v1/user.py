@@ -1,12 +1,26 @@
+import json
 import logging
+from datetime import date, datetime
 from app.db.models.user import User
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Header, Query, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from app.db.database import SessionLocal
-from app.core.security import get_current_user
-from app.db.schemas.user import UserCreate, UserOut
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.security import get_current_user, hash_password_async
+from app.core.principal import Principal
+from app.core.directory_cache import get_directory_cache
+from app.db.schemas.user import DoctorSearchPage, UserCreate, UserOut
+from app.db.schemas.availability import DoctorFreeSlots, DoctorSlotOut
+from app.db.models.availability import DoctorSlot
+from app.db.models.search import normalize_name
+from app.db.crud.availability import find_free_slots
+from app.db.crud.search import name_matches, name_rank, search_users
 from app.db.crud import user as user_crud
+from app.db import bulk_import
+from app.core.storage import get_blob_store, sniff_content_type
+from app.utils.http import etag_matches, parse_byte_range
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -21,17 +35,19 @@ def test_user():
     return {"message": "✅ User route is working"}
 
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db
 
 
-from typing import Optional
+from typing import List, Literal, Optional
 from app.utils.form_data import form_body
 
 @router.post("/register", response_model=UserOut)
-async def register(user_data: UserCreate = Depends(form_body(UserCreate)), profile_image: Optional[UploadFile] = File(None), db: Session = Depends(get_db)):
+async def register(user_data: UserCreate = Depends(form_body(UserCreate)), profile_image: Optional[UploadFile] = File(None), db=Depends(get_async_db)):
     try:
+        image_data = await profile_image.read() if profile_image else None
+
         # Check if email already exists
-        if user_crud.get_user_by_email(db, user_data.email):
+        if await db.run_sync(user_crud.get_user_by_email, user_data.email):
             logger.warning(f"❌ Registration failed: Email {user_data.email} already registered")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -39,22 +55,23 @@ async def register(user_data: UserCreate = Depends(form_body(UserCreate)), profi
             )
 
         # Check if mobile already exists
-        if user_crud.get_user_by_mobile(db, user_data.mobile_number):
+        if await db.run_sync(user_crud.get_user_by_mobile, user_data.mobile_number):
             logger.warning(f"❌ Registration failed: Mobile {user_data.mobile_number} already registered")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Mobile number already registered"
             )
 
-        image_data = await profile_image.read() if profile_image else None
-
+        # Only new users cost a bcrypt slot; hand the connection back while it runs
+        await db.rollback()
+        hashed_password = await hash_password_async(user_data.password)
 
-        new_user = user_crud.create_user(db, user_data, image_data)
+        new_user = await db.run_sync(user_crud.create_user, user_data, image_data, hashed_password)
         logger.info(f"✅ New user registered: {user_data.email}")
         return new_user
 
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         err_msg = str(e).lower()
         logger.error(f"⚠️ IntegrityError during registration: {err_msg}")
         if "mobile_number" in err_msg:
@@ -75,35 +92,180 @@ async def register(user_data: UserCreate = Depends(form_body(UserCreate)), profi
     except HTTPException as http_exc:
         raise http_exc
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.exception("❌ Unexpected error during registration")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred during registration"
         )
 
+# ----------------------------------------------------------
+# Admin bulk import of users from CSV or NDJSON (see app.db.bulk_import).
+# Each row is validated like a registration; the response lists the rows
+# that were rejected. Very large files are better run through the command.
+@router.post("/users/import")
+def import_users(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    if current_user.user_type != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can import users")
+    try:
+        rows = bulk_import.read_upload(file.file, bulk_import.format_of(file.filename, format))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return bulk_import.import_users(rows, bind=db.get_bind()).as_dict()
+
+
 @router.get("/users/me", response_model=UserOut)
-def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+async def get_me(current_user: Principal = Depends(get_current_user), db=Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.id == current_user.id))
+    return result.scalars().first()
 
 
 from fastapi import Query
 
+# The directory is served from an in-process cache (app.core.directory_cache)
+# keyed by the normalized name filter. Every response carries a strong ETag;
+# clients revalidate with If-None-Match and get a 304 while nothing changed,
+# without a database query.
+DIRECTORY_CACHE_CONTROL = "no-cache"
+
 @router.get("/users/doctors")
-def get_all_doctors(db: Session = Depends(get_db), name: str = Query(None)):
-    print("Fetching doctors")
-    query = db.query(User).filter(User.user_type == "doctor")
-    if name:
-        query = query.filter(User.full_name.ilike(f"%{name}%"))
-
-    doctors = query.all()
-    print(f"Found {len(doctors)} doctors")
-    return [
-        {
-            "id": doc.id,
-            "full_name": doc.full_name,
-            "available_timeslots": doc.available_timeslots,
-            "consultation_fee": doc.consultation_fee,
-        }
-        for doc in doctors
-    ]
+async def get_all_doctors(
+    name: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db=Depends(get_async_db),
+):
+    cache = get_directory_cache()
+    key = normalize_name(name or "")
+    entry = cache.get(key)
+    if entry is None:
+        version = cache.version
+        query = select(
+            User.id, User.full_name, User.available_timeslots, User.consultation_fee
+        ).where(User.user_type == "doctor")
+        if key:
+            query = query.where(name_matches(User.id, key)).order_by(name_rank(User.full_name, key), User.id)
+        doctors = (await db.execute(query)).all()
+        logger.info(f"Doctor directory rebuilt for {key!r}: {len(doctors)} doctors")
+        body = json.dumps([doc._asdict() for doc in doctors], separators=(",", ":")).encode()
+        entry = cache.put(key, version, body)
+
+    headers = {"ETag": entry.etag, "Cache-Control": DIRECTORY_CACHE_CONTROL}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# Doctors whose name contains `q` (case-insensitive), best match first: the
+# whole name, then names and then words starting with `q`. Pass `next_offset`
+# back as `offset` for the following page.
+@router.get("/users/doctors/search", response_model=DoctorSearchPage)
+async def search_doctors(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db=Depends(get_async_db),
+):
+    items, next_offset = await search_users(
+        db, q, [User.id, User.full_name, User.division, User.district, User.consultation_fee],
+        user_type="doctor", limit=limit, offset=offset
+    )
+    return {"items": items, "next_offset": next_offset}
+
+
+@router.get("/users/doctors/{doctor_id}/slots", response_model=List[DoctorSlotOut])
+async def get_doctor_slots(doctor_id: int, weekday: Optional[int] = Query(None, ge=0, le=6), db=Depends(get_async_db)):
+    query = select(DoctorSlot).where(DoctorSlot.doctor_id == doctor_id)
+    if weekday is not None:
+        query = query.where(DoctorSlot.weekday == weekday)
+    result = await db.execute(query.order_by(DoctorSlot.weekday, DoctorSlot.start_time))
+    return result.scalars().all()
+
+
+# Open slots across many doctors, e.g. "who can see me in the next 14 days in
+# Dhaka for under 1000": up to `limit` doctors, each with their first
+# `per_doctor` open slots. Doctors without an open slot in the range are omitted.
+@router.get("/users/doctors/free-slots", response_model=List[DoctorFreeSlots])
+async def search_free_slots(
+    date_from: Optional[date] = Query(None),
+    days: int = Query(14, ge=1, le=31),
+    division: Optional[str] = Query(None),
+    district: Optional[str] = Query(None),
+    min_fee: Optional[float] = Query(None, ge=0),
+    max_fee: Optional[float] = Query(None, ge=0),
+    per_doctor: int = Query(10, ge=1, le=500),
+    limit: int = Query(500, ge=1, le=500),
+    db=Depends(get_async_db),
+):
+    now = datetime.now()
+    start = max(date_from or now.date(), now.date())
+
+    query = select(
+        User.id, User.full_name, User.division, User.district, User.consultation_fee
+    ).where(User.user_type == "doctor")
+    if division:
+        query = query.where(User.division == division)
+    if district:
+        query = query.where(User.district == district)
+    if min_fee is not None:
+        query = query.where(User.consultation_fee >= min_fee)
+    if max_fee is not None:
+        query = query.where(User.consultation_fee <= max_fee)
+    doctors = (await db.execute(query.order_by(User.id).limit(limit))).all()
+
+    free = await find_free_slots(db, [doctor.id for doctor in doctors], start, days, now, per_doctor)
+    # Already in response shape; skip re-validating tens of thousands of slots
+    return JSONResponse([
+        {**doctor._asdict(), "slots": free[doctor.id]}
+        for doctor in doctors if doctor.id in free
+    ])
+
+
+# Avatars are addressed by content hash, so a given URL (see UserOut.avatar_url)
+# never changes content and can be cached indefinitely. Public on purpose:
+# <img> tags cannot send a bearer token.
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.get("/{user_id}/avatar")
+async def get_avatar(
+    user_id: int,
+    if_none_match: Optional[str] = Header(None),
+    range: Optional[str] = Header(None),
+    db=Depends(get_async_db),
+):
+    key = await db.scalar(select(User.profile_image_key).where(User.id == user_id))
+    if not key:
+        raise HTTPException(status_code=404, detail="Avatar not found")
+
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": AVATAR_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    data = await run_in_threadpool(get_blob_store().get, key)
+    if data is None:
+        logger.error(f"Blob {key} for user {user_id} is missing from the blob store")
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    media_type = sniff_content_type(data)
+
+    try:
+        byte_range = parse_byte_range(range, len(data))
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": f"bytes */{len(data)}"}
+        )
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        return Response(
+            content=data[start:end + 1],
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=media_type,
+            headers=headers
+        )
+    return Response(content=data, media_type=media_type, headers=headers)
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import task_postrun, task_prerun
 from app.core.config import settings
 
 celery = Celery(
@@ -8,3 +9,19 @@ celery = Celery(
 )
 
 celery.conf.timezone = "UTC"
+
+# Watch each task's statements like a request's (app.db.query_log)
+_task_watches = {}
+
+@task_prerun.connect
+def _watch_task(task_id=None, task=None, **kwargs):
+    from app.db import query_log
+    watch = query_log.watch(f"task {task.name}")
+    watch.__enter__()
+    _task_watches[task_id] = watch
+
+@task_postrun.connect
+def _report_task(task_id=None, **kwargs):
+    watch = _task_watches.pop(task_id, None)
+    if watch is not None:
+        watch.__exit__(None, None, None)
@@ -1,17 +1,19 @@
+from datetime import timedelta
 from celery.schedules import crontab
 from app.celery_app import celery
+from app.core.config import settings
+
+REMINDER_INTERVAL = timedelta(minutes=settings.REMINDER_INTERVAL_MINUTES)
 
 celery.conf.beat_schedule = {
-    "send-reminders-every-morning": {
+    "send-due-reminders": {
         "task": "app.tasks.reminders.send_appointment_reminders",
-        "schedule": crontab(hour=7, minute=0),  # every day at 7AM UTC
+        "schedule": REMINDER_INTERVAL,  # rolling; see app.tasks.reminders
+        # A run still queued when the next is due is redundant: drop it
+        "options": {"expires": REMINDER_INTERVAL.total_seconds()},
     }
 }
 
-
-from celery.schedules import crontab
-from app.celery_app import celery
-
 celery.conf.beat_schedule.update({
     "monthly-doctor-report": {
         "task": "app.tasks.report.generate_monthly_doctor_report",
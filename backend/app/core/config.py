@@ -13,6 +13,22 @@ class Settings:
 
     # Database
     DB_URL = os.getenv("DATABASE_URL")
+    # Serve API routes through an async engine (aiosqlite/aiomysql/asyncpg).
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the matching async driver.
+    DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    ASYNC_DB_URL = os.getenv("ASYNC_DATABASE_URL")
+
+    # Connection pool (per engine, per process). Checkouts wait at most
+    # DB_POOL_TIMEOUT seconds; requests that time out get a 503.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+    # Recycle before MySQL's wait_timeout drops idle connections
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Requests allowed to hold a threaded (non DB_ASYNC) session at once; the
+    # rest wait on the event loop instead of in a threadpool worker
+    DB_THREADED_SESSIONS = int(os.getenv("DB_THREADED_SESSIONS", DB_POOL_SIZE + DB_MAX_OVERFLOW))
 
     # Redis (for Celery)
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
@@ -22,5 +38,88 @@ class Settings:
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
     SMTP_PORT = int(os.getenv("SMTP_PORT", 465))
+    # "ssl" (implicit TLS, port 465), "starttls" (port 587) or "none" (local relays)
+    SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl")
+    # "smtp", "file" (writes .eml files to MAIL_FILE_DIR) or "memory"
+    MAIL_BACKEND = os.getenv("MAIL_BACKEND", "smtp")
+    MAIL_FILE_DIR = os.getenv("MAIL_FILE_DIR", "outbox")
+    # Persistent SMTP connections per process; idle ones are checked with
+    # NOOP after SMTP_KEEPALIVE seconds. Transient failures are retried
+    # SMTP_RETRIES times, backing off from SMTP_RETRY_BACKOFF seconds.
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+    SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", 10))
+    SMTP_KEEPALIVE = float(os.getenv("SMTP_KEEPALIVE", 30))
+    SMTP_RETRIES = int(os.getenv("SMTP_RETRIES", 3))
+    SMTP_RETRY_BACKOFF = float(os.getenv("SMTP_RETRY_BACKOFF", 0.5))
+
+    # Messages per second over SMTP (0 = unlimited), counted per process
+    # ("local") or across all workers through REDIS_URL ("redis")
+    MAIL_RATE_LIMIT = float(os.getenv("MAIL_RATE_LIMIT", 0))
+    MAIL_RATE_LIMITER = os.getenv("MAIL_RATE_LIMITER", "redis")
+
+    # Rolling reminders: every REMINDER_INTERVAL_MINUTES, remind confirmed
+    # appointments starting within REMINDER_LEAD_HOURS that were not reminded
+    # yet. Unsent claims lapse after the lease and are retried up to
+    # REMINDER_MAX_ATTEMPTS times.
+    REMINDER_INTERVAL_MINUTES = int(os.getenv("REMINDER_INTERVAL_MINUTES", 5))
+    REMINDER_LEAD_HOURS = int(os.getenv("REMINDER_LEAD_HOURS", 24))
+    REMINDER_CLAIM_LEASE_MINUTES = int(os.getenv("REMINDER_CLAIM_LEASE_MINUTES", 15))
+    REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", 3))
+    # Due reminders are split into shards of REMINDER_SHARD_SIZE appointments,
+    # one Celery task each; a shard reads and sends REMINDER_CHUNK_SIZE at a time
+    REMINDER_SHARD_SIZE = int(os.getenv("REMINDER_SHARD_SIZE", 5000))
+    REMINDER_CHUNK_SIZE = int(os.getenv("REMINDER_CHUNK_SIZE", 500))
+
+    # Password hashing pool; bcrypt runs here instead of on the event loop.
+    # "thread" (bcrypt releases the GIL) or "process"
+    PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+    # Hashes allowed to wait for a worker before new ones are rejected with 503
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+
+    # Authenticated principal cache; "local", "redis" (uses REDIS_URL) or "none"
+    PRINCIPAL_CACHE_BACKEND = os.getenv("PRINCIPAL_CACHE_BACKEND", "local")
+    PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 10000))
+    PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+
+    # Idempotency-Key replay store for booking requests (per process)
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 10000))
+    IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 24 * 60 * 60))
+
+    # Doctor directory response cache (per process); entries also expire
+    # after the TTL so changes made by other workers show up
+    DIRECTORY_CACHE_SIZE = int(os.getenv("DIRECTORY_CACHE_SIZE", 256))
+    DIRECTORY_CACHE_TTL = int(os.getenv("DIRECTORY_CACHE_TTL", 60))
+
+    # Free-slot search: how often the in-memory slot index checks for slots
+    # that other workers added or removed
+    SLOT_INDEX_RECHECK_SECONDS = int(os.getenv("SLOT_INDEX_RECHECK_SECONDS", 10))
+
+    # Blob storage (profile images); "local" or "memory"
+    BLOB_STORE = os.getenv("BLOB_STORE", "local")
+    BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "uploads/blobs")
+
+    # Appointment exports: rows fetched per server-side cursor batch, rows per
+    # Parquet row group, and where the export task writes its files
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 2000))
+    EXPORT_PARQUET_ROW_GROUP = int(os.getenv("EXPORT_PARQUET_ROW_GROUP", 100000))
+    EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+
+    # Per-route request and SQL metrics, served at /metrics (app.core.metrics)
+    HTTP_METRICS = os.getenv("HTTP_METRICS", "true").lower() in ("1", "true", "yes")
+
+    # Statement monitoring (app.db.query_log); 0 turns a threshold off.
+    # Statements slower than SLOW_QUERY_MS are logged with their route or task
+    # and, unless SLOW_QUERY_LOG_PARAMS is off, their bind parameters. A
+    # statement shape run N_PLUS_ONE_THRESHOLD times in one request or task is
+    # logged as a likely N+1. QUERY_LOG_ORIGIN adds the line of app code that
+    # ran the statement (walks the stack per statement: for development).
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+    SLOW_QUERY_LOG_PARAMS = os.getenv("SLOW_QUERY_LOG_PARAMS", "true").lower() in ("1", "true", "yes")
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+    QUERY_LOG_ORIGIN = os.getenv("QUERY_LOG_ORIGIN", "false").lower() in ("1", "true", "yes")
+
+    # Bulk imports validate and insert this many rows per transaction
+    IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
 
 settings = Settings()
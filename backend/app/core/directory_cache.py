@@ -0,0 +1,108 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models.user import User
+from app.db.session_hooks import on_commit
+
+
+class DirectoryEntry(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class DirectoryCache:
+    """
+    Rendered doctor directory responses, keyed by filter parameters. Every
+    entry belongs to the current version; ``bump()`` (any committed doctor
+    change in this process) starts a new one. Entries also expire after
+    ``ttl`` seconds, which bounds how stale changes made by other processes
+    can get.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, DirectoryEntry)
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[DirectoryEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version: int, body: bytes) -> DirectoryEntry:
+        """
+        Store ``body``, rendered from data read at ``version``. If a change was
+        committed meanwhile the body may predate it, so it is returned but
+        not cached.
+        """
+        entry = DirectoryEntry(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = (self.clock() + self.ttl, entry)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def clear(self):
+        self.bump()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "version": self.version}
+
+
+_cache = None
+
+def get_directory_cache() -> DirectoryCache:
+    global _cache
+    if _cache is None:
+        _cache = DirectoryCache(settings.DIRECTORY_CACHE_SIZE, settings.DIRECTORY_CACHE_TTL)
+    return _cache
+
+def set_directory_cache(cache):
+    global _cache
+    _cache = cache
+
+
+# Invalidation: a doctor registering, leaving, or changing a field the
+# directory shows starts a new version once the change is committed.
+DIRECTORY_FIELDS = ("full_name", "user_type", "consultation_fee", "available_timeslots")
+
+def _mark_stale(target):
+    on_commit(Session.object_session(target), "directory", lambda: get_directory_cache().bump())
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_delete")
+def _doctor_added_or_removed(mapper, connection, target):
+    if target.user_type == "doctor":
+        _mark_stale(target)
+
+@event.listens_for(User, "after_update")
+def _doctor_changed(mapper, connection, target):
+    state = inspect(target)
+    if target.user_type != "doctor" and not state.attrs.user_type.history.has_changes():
+        return
+    if any(state.attrs[field].history.has_changes() for field in DIRECTORY_FIELDS):
+        _mark_stale(target)
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from fastapi import HTTPException, status
+from app.core.config import settings
+
+
+def request_fingerprint(payload: str) -> str:
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Bounded in-process LRU of Idempotency-Key outcomes with a per-entry TTL.
+
+    ``begin`` reserves a key before the work runs; ``complete`` records the
+    response a retry should replay and ``release`` forgets the key so the
+    request can be tried again (used for server-side failures).
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 86400, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> [expires_at, fingerprint, response or None]
+        self._lock = threading.Lock()
+
+    def begin(self, key: str, fingerprint: str) -> Optional[Tuple[int, Any]]:
+        """Reserve ``key``; returns the stored (status_code, body) if it already completed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= self.clock():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._entries[key] = [self.clock() + self.ttl, fingerprint, None]
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                return None
+
+            self._entries.move_to_end(key)
+            if entry[1] != fingerprint:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used for a different request"
+                )
+            if entry[2] is None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still being processed",
+                    headers={"Retry-After": "1"}
+                )
+            return entry[2]
+
+    def complete(self, key: str, status_code: int, body: Any):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[2] = (status_code, body)
+
+    def release(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_store = None
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        _store = IdempotencyStore(settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_TTL)
+    return _store
+
+def set_idempotency_store(store: IdempotencyStore):
+    global _store
+    _store = store
@@ -1,13 +1,304 @@
+import logging
+import os
 import smtplib
+import threading
+import time
+from email.header import Header
 from email.mime.text import MIMEText
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
 from app.core.config import settings
+from app.core.ratelimit import LocalRateLimiter, NullRateLimiter, RedisRateLimiter
 
-def send_email(to: str, subject: str, body: str):
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=64)
+def _encoded_subject(subject: str) -> str:
+    # Encode (and fold) a non-ASCII subject once, not once per message
+    return subject if subject.isascii() else Header(subject, "utf-8").encode()
+
+def build_message(to: str, subject: str, body: str) -> MIMEText:
     msg = MIMEText(body)
-    msg["Subject"] = subject
+    msg["Subject"] = _encoded_subject(subject)
     msg["From"] = settings.EMAIL_FROM
     msg["To"] = to
+    return msg
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether ``error`` is a 5xx refusal, which sending again will not change."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+class SendReport:
+    """Outcome of a ``send_many`` batch."""
+
+    def __init__(self):
+        self.delivered = []  # the messages accepted by the server
+        self.refused = []  # the failed messages the server refused for good (5xx)
+        self.failed: List[Tuple[str, Exception]] = []  # (recipient, error)
+
+    @property
+    def sent(self) -> int:
+        return len(self.delivered)
+
+    def record(self, message, error: Optional[Exception]):
+        if error is None:
+            self.delivered.append(message)
+        else:
+            self.failed.append((message["To"], error))
+            if is_permanent(error):
+                self.refused.append(message)
+
+
+class MailBackend:
+    def send(self, message):
+        raise NotImplementedError
+
+    def send_many(self, messages: Iterable) -> SendReport:
+        report = SendReport()
+        for message in messages:
+            try:
+                self.send(message)
+                report.record(message, None)
+            except (smtplib.SMTPException, OSError) as exc:
+                report.record(message, exc)
+        return report
+
+    def close(self):
+        pass
+
+
+class SMTPBackend(MailBackend):
+    """
+    Sends over up to ``pool_size`` persistent, logged-in SMTP connections.
+
+    A connection idle for ``keepalive`` seconds or more is probed with NOOP
+    before reuse and replaced if the server has dropped it. A lost connection,
+    timeout or 4xx reply is retried on a fresh connection up to ``retries``
+    times with exponential backoff; 5xx replies and other SMTP errors (say, no
+    STARTTLS support) fail the message at once.
+    Every attempt first takes a token from ``limiter``, if given.
+    """
+
+    def __init__(self, host: str, port: int, security: str = "ssl", username: Optional[str] = None,
+                 password: Optional[str] = None, pool_size: int = 2, timeout: float = 10,
+                 keepalive: float = 30, retries: int = 3, backoff: float = 0.5, limiter=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        if security not in ("ssl", "starttls", "none"):
+            raise ValueError(f"Unknown SMTP_SECURITY: {security}")
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter or NullRateLimiter()
+        self.clock = clock
+        self.sleep = sleep
+        self.connects = 0
+        self._idle = []  # (last_used, connection), most recent last
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.security == "ssl":
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.security == "starttls":
+                server.starttls()
+            if self.password:
+                server.login(self.username, self.password)
+        except BaseException:
+            server.close()
+            raise
+        self.connects += 1
+        return server
+
+    @staticmethod
+    def _drop(server):
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                last_used, server = self._idle.pop()
+            if self.clock() - last_used < self.keepalive:
+                return server
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            server.close()
+        return self._connect()
+
+    def _checkin(self, server):
+        with self._lock:
+            self._idle.append((self.clock(), server))
+
+    def _send_one(self, server, message):
+        """
+        Deliver ``message`` over ``server`` (or a pooled one when None).
+        Returns the connection to keep using (None once dropped) and the
+        error that failed the message, if any.
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            try:
+                if server is None:
+                    server = self._checkout()
+                server.send_message(message)
+                return server, None
+            except smtplib.SMTPRecipientsRefused as exc:
+                # The connection is fine (smtplib reset the transaction)
+                error = exc
+                transient = all(400 <= code < 500 for code, _ in exc.recipients.values())
+            except smtplib.SMTPResponseException as exc:
+                error = exc
+                transient = 400 <= exc.smtp_code < 500
+                if exc.smtp_code == 421 and server is not None:
+                    # Server is closing the connection
+                    server.close()
+                    server = None
+            except smtplib.SMTPServerDisconnected as exc:
+                error = exc
+                transient = True
+                if server is not None:
+                    server.close()
+                    server = None
+            except smtplib.SMTPException as exc:
+                # Not a server reply (SMTPException is an OSError, so this
+                # comes first), e.g. STARTTLS or no auth method supported
+                error = exc
+                transient = False
+                if server is not None:
+                    server.close()
+                    server = None
+            except OSError as exc:
+                error = exc
+                transient = True
+                if server is not None:
+                    server.close()
+                    server = None
+            if not transient or attempt == self.retries:
+                return server, error
+            delay = self.backoff * 2 ** attempt
+            logger.warning(f"Mail to {message['To']} failed ({error!r}); retrying in {delay:.1f}s")
+            self.sleep(delay)
+
+    def send(self, message):
+        with self._slots:
+            server, error = self._send_one(None, message)
+            if server is not None:
+                self._checkin(server)
+        if error is not None:
+            raise error
+
+    def send_many(self, messages: Iterable) -> SendReport:
+        """Send a batch over one connection, reconnecting as needed; failures are reported, not raised."""
+        report = SendReport()
+        with self._slots:
+            server = None
+            try:
+                for message in messages:
+                    server, error = self._send_one(server, message)
+                    report.record(message, error)
+            finally:
+                if server is not None:
+                    self._checkin(server)
+        return report
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, server in idle:
+            self._drop(server)
+
+
+class FileBackend(MailBackend):
+    """Writes each message to ``directory`` as an .eml file instead of sending it (local development)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._count += 1
+            name = f"{time.time_ns()}-{os.getpid()}-{self._count}.eml"
+        with open(os.path.join(self.directory, name), "wb") as f:
+            f.write(message.as_bytes())
+
+
+class MemoryBackend(MailBackend):
+    """Keeps sent messages in ``outbox``; used by tests."""
+
+    def __init__(self):
+        self.outbox = []
+
+    def send(self, message):
+        self.outbox.append(message)
+
+
+def build_rate_limiter():
+    """The MAIL_RATE_LIMIT limiter: shared by all workers with "redis", per process with "local"."""
+    if settings.MAIL_RATE_LIMIT <= 0:
+        return NullRateLimiter()
+    if settings.MAIL_RATE_LIMITER == "redis":
+        import redis
+        return RedisRateLimiter(redis.Redis.from_url(settings.REDIS_URL), settings.MAIL_RATE_LIMIT)
+    if settings.MAIL_RATE_LIMITER == "local":
+        return LocalRateLimiter(settings.MAIL_RATE_LIMIT)
+    raise ValueError(f"Unknown MAIL_RATE_LIMITER: {settings.MAIL_RATE_LIMITER}")
+
+
+_backend: Optional[MailBackend] = None
+
+def get_mail_backend() -> MailBackend:
+    global _backend
+    if _backend is None:
+        if settings.MAIL_BACKEND == "smtp":
+            _backend = SMTPBackend(
+                settings.SMTP_SERVER, settings.SMTP_PORT, settings.SMTP_SECURITY,
+                settings.EMAIL_FROM, settings.EMAIL_PASSWORD,
+                pool_size=settings.SMTP_POOL_SIZE, timeout=settings.SMTP_TIMEOUT,
+                keepalive=settings.SMTP_KEEPALIVE, retries=settings.SMTP_RETRIES,
+                backoff=settings.SMTP_RETRY_BACKOFF, limiter=build_rate_limiter()
+            )
+        elif settings.MAIL_BACKEND == "file":
+            _backend = FileBackend(settings.MAIL_FILE_DIR)
+        elif settings.MAIL_BACKEND == "memory":
+            _backend = MemoryBackend()
+        else:
+            raise ValueError(f"Unknown MAIL_BACKEND: {settings.MAIL_BACKEND}")
+    return _backend
+
+def set_mail_backend(backend: Optional[MailBackend]):
+    global _backend
+    _backend = backend
+
+
+def send_email(to: str, subject: str, body: str):
+    get_mail_backend().send(build_message(to, subject, body))
 
-    with smtplib.SMTP_SSL(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
-        server.login(settings.EMAIL_FROM, settings.EMAIL_PASSWORD)
-        server.sendmail(settings.EMAIL_FROM, to, msg.as_string())
+def send_many(messages: Iterable) -> SendReport:
+    """Send messages from build_message() as one batch."""
+    return get_mail_backend().send_many(messages)
@@ -0,0 +1,216 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+MetricsMiddleware times every HTTP request and records, per method and route
+template (``/api/v1/users/users/doctors/{doctor_id}/slots``, never the raw
+path, so the number of series stays bounded):
+
+- http_requests_total: requests by status code
+- http_request_duration_seconds: latency histogram
+- http_response_size_bytes: response body size histogram
+- http_request_db_statements: SQL statements executed per request
+- http_request_db_duration_seconds: time spent in those statements per request
+
+plus http_requests_in_flight by method (the route is only known once the
+request has been routed). SQL statements are counted by the request's
+app.db.query_log watch (QueryWatchMiddleware, installed outside this one),
+which also reports its slow queries and N+1s.
+
+Metrics are kept per process, like the local caches: with several workers,
+scrape each one or aggregate in Prometheus. Requests that match no route
+share the "unmatched" route label.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, Optional, Tuple
+from app.db import query_log
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED = query_log.UNMATCHED
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def header(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        super().__init__(name, help, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple) -> float:
+        return self._values.get(labels, 0)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> Iterator[str]:
+        yield from self.header()
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple, amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """Observations counted into fixed buckets (upper bounds, inclusive), with their sum."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}  # labels -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, labels: tuple) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def sum(self, labels: tuple) -> float:
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> Iterator[str]:
+        yield from self.header()
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values):
+                cumulative += count
+                le = f'le="{bound if bound == "+Inf" else _number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(values[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+class HTTPMetrics:
+    """The request metrics of this process."""
+
+    def __init__(self):
+        route = ("method", "route")
+        self.requests = Counter("http_requests_total", "HTTP requests handled.", route + ("status",))
+        self.in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled.", ("method",))
+        self.latency = Histogram("http_request_duration_seconds", "HTTP request latency.", route,
+                                 LATENCY_BUCKETS)
+        self.response_size = Histogram("http_response_size_bytes", "HTTP response body size.", route,
+                                       SIZE_BUCKETS)
+        self.db_statements = Histogram("http_request_db_statements", "SQL statements executed per request.",
+                                       route, STATEMENT_BUCKETS)
+        self.db_time = Histogram("http_request_db_duration_seconds", "Time spent in SQL statements per request.",
+                                 route, LATENCY_BUCKETS)
+        self.metrics = [self.requests, self.in_flight, self.latency, self.response_size, self.db_statements,
+                        self.db_time]
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int, queries: query_log.QueryWatch):
+        self.requests.inc((method, route, status))
+        self.latency.observe((method, route), seconds)
+        self.response_size.observe((method, route), size)
+        self.db_statements.observe((method, route), queries.statements)
+        self.db_time.observe((method, route), queries.seconds)
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+    def render(self) -> Iterator[str]:
+        for metric in self.metrics:
+            yield from metric.render()
+
+
+_metrics = HTTPMetrics()
+
+def get_http_metrics() -> HTTPMetrics:
+    return _metrics
+
+
+# ----------------------------------------------------------
+# Middleware
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (no per-request task or body buffering, unlike BaseHTTPMiddleware)."""
+
+    def __init__(self, app, metrics: Optional[HTTPMetrics] = None):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = self.metrics or get_http_metrics()
+        method = scope["method"]
+        status, size = 500, 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        # Without QueryWatchMiddleware around it, no statements are counted
+        queries = query_log.current_watch() or query_log.QueryWatch(UNMATCHED)
+        metrics.in_flight.inc((method,))
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.in_flight.dec((method,))
+            metrics.observe(method, query_log.route_template(scope), status, elapsed, size, queries)
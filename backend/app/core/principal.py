@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models.user import User
+from app.db.session_hooks import on_commit
+
+logger = logging.getLogger(__name__)
+
+
+class Principal(BaseModel):
+    """The authenticated caller, as seen by route handlers (never carries the profile image)."""
+    id: int
+    email: str
+    user_type: str
+
+
+class LocalPrincipalCache:
+    """Bounded in-process LRU cache of principals with a per-entry TTL."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # user_id -> (expires_at, principal)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, principal: Principal):
+        with self._lock:
+            self._entries[principal.id] = (self.clock() + self.ttl, principal)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class RedisPrincipalCache:
+    """
+    Principal cache shared by all workers. ``client`` only needs the redis-py
+    ``get``/``setex``/``delete`` methods. Redis errors degrade to cache misses
+    so authentication keeps working off the database.
+    """
+
+    def __init__(self, client, ttl: float = 60, prefix: str = "principal:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        try:
+            raw = self.client.get(self._key(user_id))
+        except Exception:
+            logger.warning("Principal cache read failed", exc_info=True)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return Principal.model_validate_json(raw)
+
+    def set(self, principal: Principal):
+        try:
+            self.client.setex(self._key(principal.id), int(self.ttl), principal.model_dump_json())
+        except Exception:
+            logger.warning("Principal cache write failed", exc_info=True)
+
+    def invalidate(self, user_id: int):
+        try:
+            self.client.delete(self._key(user_id))
+        except Exception:
+            logger.warning(f"Principal cache invalidation failed for user {user_id}", exc_info=True)
+
+    def clear(self):
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class NullPrincipalCache:
+    """Disables caching: every lookup goes to the database."""
+    hits = 0
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        self.misses += 1
+        return None
+
+    def set(self, principal: Principal):
+        pass
+
+    def invalidate(self, user_id: int):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"hits": 0, "misses": self.misses}
+
+
+_cache = None
+
+def get_principal_cache():
+    global _cache
+    if _cache is None:
+        backend = settings.PRINCIPAL_CACHE_BACKEND
+        if backend == "local":
+            _cache = LocalPrincipalCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL)
+        elif backend == "redis":
+            import redis
+            _cache = RedisPrincipalCache(redis.Redis.from_url(settings.REDIS_URL), settings.PRINCIPAL_CACHE_TTL)
+        elif backend == "none":
+            _cache = NullPrincipalCache()
+        else:
+            raise ValueError(f"Unknown PRINCIPAL_CACHE_BACKEND: {backend}")
+    return _cache
+
+def set_principal_cache(cache):
+    global _cache
+    _cache = cache
+
+
+# Invalidation: drop a changed user's cached principal once the change is committed
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_changed(mapper, connection, target):
+    user_id = target.id
+    on_commit(Session.object_session(target), ("principal", user_id),
+              lambda: get_principal_cache().invalidate(user_id))
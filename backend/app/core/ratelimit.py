@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LocalRateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second in this process (bursts up to ``rate``)."""
+
+    def __init__(self, rate: float, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = rate
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1 - 1e-9:  # float drift
+                    self._tokens = max(self._tokens - 1, 0)
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self.sleep(wait)
+
+
+class RedisRateLimiter:
+    """
+    At most ``rate`` acquisitions per wall-clock second across every process
+    sharing ``client`` (one counter key per second). ``client`` only needs the
+    redis-py ``incr``/``expire`` methods. If Redis is unreachable the limit
+    falls back to ``fallback`` (a per-process limiter) rather than stopping mail.
+    """
+
+    def __init__(self, client, rate: float, key: str = "mail-rate", fallback=None,
+                 clock=time.time, sleep=time.sleep):
+        self.client = client
+        self.rate = rate
+        self.key = key
+        self.fallback = fallback or LocalRateLimiter(rate, sleep=sleep)
+        self.clock = clock
+        self.sleep = sleep
+
+    def acquire(self):
+        while True:
+            now = self.clock()
+            window = f"{self.key}:{int(now)}"
+            try:
+                count = self.client.incr(window)
+                if count == 1:
+                    self.client.expire(window, 2)
+            except Exception:
+                logger.warning("Rate limiter unavailable, limiting per process", exc_info=True)
+                self.fallback.acquire()
+                return
+            if count <= self.rate:
+                return
+            self.sleep(int(now) + 1 - now)
+
+
+class NullRateLimiter:
+    def acquire(self):
+        pass
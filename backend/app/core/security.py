@@ -1,4 +1,10 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
@@ -11,6 +17,116 @@ def hash_password(password: str) -> str:
 def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
+
+class PasswordHashPool:
+    """
+    Runs bcrypt on a fixed number of workers. At most ``workers + max_queue``
+    jobs may be pending; beyond that callers get an immediate 503 instead of
+    queueing without bound behind a registration burst.
+    """
+
+    def __init__(self, workers: int, max_queue: int, executor: str = "thread"):
+        self.workers = workers
+        self.capacity = workers + max_queue
+        self.executor_kind = executor
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self.pending >= self.capacity:
+                return False
+            self.pending += 1
+            return True
+
+    def submit(self, fn, *args) -> Future:
+        if not self._reserve():
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        return self._start(fn, *args)
+
+    def _start(self, fn, *args) -> Future:
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future=None):
+        with self._lock:
+            self.pending -= 1
+
+    def run(self, fn, *args):
+        """Blocking call for sync routes (which already run off the event loop)."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def map(self, fn, items) -> list:
+        """
+        ``fn`` over ``items`` for batch jobs (bulk imports). At most
+        ``workers`` of them are pending at once, leaving the rest of the queue
+        to requests, and a full queue is waited out rather than rejected.
+        """
+        results = [None] * len(items)
+        in_flight = deque()
+        for index, item in enumerate(items):
+            if len(in_flight) >= self.workers:
+                done, future = in_flight.popleft()
+                results[done] = future.result()
+            while not self._reserve():
+                if in_flight:
+                    done, future = in_flight.popleft()
+                    results[done] = future.result()
+                else:
+                    time.sleep(0.01)
+            in_flight.append((index, self._start(fn, item)))
+        for done, future in in_flight:
+            results[done] = future.result()
+        return results
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_password_pool = None
+
+def get_password_pool() -> PasswordHashPool:
+    global _password_pool
+    if _password_pool is None:
+        _password_pool = PasswordHashPool(
+            settings.PASSWORD_HASH_WORKERS,
+            settings.PASSWORD_HASH_MAX_QUEUE,
+            settings.PASSWORD_HASH_EXECUTOR,
+        )
+    return _password_pool
+
+async def hash_password_async(password: str) -> str:
+    return await get_password_pool().run_async(hash_password, password)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await get_password_pool().run_async(verify_password, plain, hashed)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -19,23 +135,16 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 
-from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from app.db.database import SessionLocal
+from sqlalchemy import select
+from app.db.database import get_async_db
 from app.db.models.user import User  # adjust import if needed
+from app.core.principal import Principal, get_principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_async_db)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,8 +158,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    # The session only checks out a connection on first query, so a cache hit
+    # serves the request's auth without touching the database at all
+    cache = get_principal_cache()
+    principal = cache.get(user_id)
+    if principal is None:
+        result = await db.execute(select(User.id, User.email, User.user_type).where(User.id == user_id))
+        row = result.first()
+        if row is None:
+            raise credentials_exception
+        user_type = row.user_type.value if hasattr(row.user_type, "value") else row.user_type
+        principal = Principal(id=row.id, email=row.email, user_type=user_type)
+        cache.set(principal)
+    return principal
 
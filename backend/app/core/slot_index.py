@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import Optional, Tuple
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.models.availability import DoctorSlot
+from app.db.session_hooks import on_commit
+
+
+def minutes(t) -> int:
+    return t.hour * 60 + t.minute
+
+
+class SlotIndex:
+    """
+    Every doctor's weekly slots as parallel numpy arrays, sorted by
+    (doctor, weekday, start). Start/end are minutes since midnight.
+    """
+
+    def __init__(self, rows, version: Tuple):
+        self.version = version
+        self.checked_at = time.monotonic()
+        rows = sorted(rows, key=lambda row: (row.doctor_id, row.weekday, row.start_time))
+        count = len(rows)
+        self.doctor_id = np.fromiter((row.doctor_id for row in rows), dtype=np.int64, count=count)
+        self.weekday = np.fromiter((row.weekday for row in rows), dtype=np.int64, count=count)
+        self.start = np.fromiter((minutes(row.start_time) for row in rows), dtype=np.int64, count=count)
+        self.end = np.fromiter((minutes(row.end_time) for row in rows), dtype=np.int64, count=count)
+        self.capacity = np.fromiter((row.capacity for row in rows), dtype=np.int32, count=count)
+        # Sorted lookup key for (doctor, weekday, start)
+        self.key = self.key_of(self.doctor_id, self.weekday, self.start)
+
+    @staticmethod
+    def key_of(doctor_id, weekday, start):
+        return (doctor_id * 7 + weekday) * 1440 + start
+
+    def rows_of(self, doctor_ids) -> np.ndarray:
+        """Row numbers of the given doctors' slots, in index order."""
+        return np.flatnonzero(np.isin(self.doctor_id, np.asarray(doctor_ids, dtype=np.int64)))
+
+    def find(self, doctor_id, weekday, start) -> np.ndarray:
+        """Row number of each (doctor, weekday, start) slot, or -1 where there is none."""
+        key = self.key_of(doctor_id, weekday, start)
+        if not len(self.key):
+            return np.full(len(key), -1)
+        rows = np.minimum(np.searchsorted(self.key, key), len(self.key) - 1)
+        return np.where(self.key[rows] == key, rows, -1)
+
+
+# Slots change only on registration and migrations. Changes committed in this
+# process (including in-place updates) drop the index right away. A
+# count/max(id) query notices rows added or removed by other processes; it
+# runs at most every SLOT_INDEX_RECHECK_SECONDS rather than on every search.
+VERSION_QUERY = select(func.count(), func.max(DoctorSlot.id))
+
+_index: Optional[SlotIndex] = None
+_lock = threading.Lock()
+
+async def get_slot_index(db) -> SlotIndex:
+    global _index
+    index = _index
+    if index is not None and time.monotonic() - index.checked_at < settings.SLOT_INDEX_RECHECK_SECONDS:
+        return index
+    version = tuple((await db.execute(VERSION_QUERY)).one())
+    if index is not None and index.version == version:
+        index.checked_at = time.monotonic()
+    else:
+        rows = (await db.execute(
+            select(DoctorSlot.doctor_id, DoctorSlot.weekday, DoctorSlot.start_time,
+                   DoctorSlot.end_time, DoctorSlot.capacity)
+        )).all()
+        index = SlotIndex(rows, version)
+        with _lock:
+            _index = index
+    return index
+
+def clear_slot_index():
+    global _index
+    with _lock:
+        _index = None
+
+@event.listens_for(DoctorSlot, "after_insert")
+@event.listens_for(DoctorSlot, "after_update")
+@event.listens_for(DoctorSlot, "after_delete")
+def _mark_stale(mapper, connection, target):
+    on_commit(Session.object_session(target), "slot_index", clear_slot_index)
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, Optional
+from app.core.config import settings
+
+
+class BlobStore:
+    """Content-addressed blob storage: identical bytes are stored once, keyed by SHA-256."""
+
+    @staticmethod
+    def key_for(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+
+class LocalBlobStore(BlobStore):
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        # Fan out into sub-directories so no single directory grows unbounded
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def put(self, data: bytes) -> str:
+        key = self.key_for(data)
+        path = self._path(key)
+        if os.path.exists(path):
+            return key
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never observe a partially written blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+
+class MemoryBlobStore(BlobStore):
+    """Process-local store, used by tests."""
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+
+    def put(self, data: bytes) -> str:
+        key = self.key_for(data)
+        self.blobs.setdefault(key, data)
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.blobs.get(key)
+
+
+_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        if settings.BLOB_STORE == "local":
+            _store = LocalBlobStore(settings.BLOB_STORE_DIR)
+        elif settings.BLOB_STORE == "memory":
+            _store = MemoryBlobStore()
+        else:
+            raise ValueError(f"Unknown BLOB_STORE backend: {settings.BLOB_STORE}")
+    return _store
+
+def set_blob_store(store: BlobStore):
+    global _store
+    _store = store
+
+
+def sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
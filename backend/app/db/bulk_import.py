@@ -0,0 +1,352 @@
+"""
+Bulk import of users (doctors, patients, admins) and appointments from CSV or
+NDJSON, for onboarding a clinic.
+
+Rows are read and validated IMPORT_CHUNK_SIZE at a time; each chunk is checked
+against the database with one query and inserted with one executemany in its
+own transaction. Invalid rows are reported by line number and skipped, the
+rest of the chunk is still imported.
+
+Users need a ``password`` (hashed on the shared password pool, a few at a
+time so logins and registrations keep their share) or a bcrypt
+``hashed_password`` carried over from another system, which skips bcrypt
+entirely. Doctors get their weekly slots and name search entries, as on
+registration. Appointments name their doctor and patient by email, so import
+users first; the daily stats of the doctors involved are rebuilt at the end.
+Upcoming Pending and Confirmed appointments claim a seat of their doctor's
+slot in the same transaction, as bookings do (these are inserted one by
+one, as the claims need their ids); rows outside every slot or beyond its
+capacity are reported and skipped.
+
+    python -m app.db.bulk_import users doctors.csv
+    python -m app.db.bulk_import appointments history.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+from datetime import datetime, time
+from itertools import islice
+from typing import Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.core.directory_cache import get_directory_cache
+from app.core.security import get_password_pool, hash_password, pwd_context
+from app.core.slot_index import clear_slot_index
+from app.db.crud.availability import build_slots
+from app.db.database import engine
+from app.db.models.appointment import Appointment, AppointmentStatus, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.models.search import index_names
+from app.db.models.stats import rebuild_daily_stats
+from app.db.models.user import User
+from app.db.schemas.appointment import AppointmentImport
+from app.db.schemas.user import UserImport
+
+FORMATS = ("csv", "ndjson")
+# Rows listed in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+USER_COLUMNS = [
+    "full_name", "email", "mobile_number", "user_type", "division", "district", "thana",
+    "license_number", "experience_years", "consultation_fee", "available_timeslots"
+]
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors: List[dict] = []  # {"line": n, "error": "..."}, first MAX_REPORTED_ERRORS
+
+    def error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict:
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
+
+
+def read_rows(stream: IO[str], format: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    (line, fields, error) per record; empty fields are left out, so they take
+    their defaults. Lines are 1-based and count the CSV header.
+    """
+    if format == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, "more fields than columns"
+                continue
+            yield reader.line_num, {key: value for key, value in record.items() if value not in ("", None)}, None
+    elif format == "ndjson":
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as exc:
+                yield line, None, f"invalid JSON: {exc}"
+                continue
+            if not isinstance(record, dict):
+                yield line, None, "expected a JSON object"
+                continue
+            yield line, {key: value for key, value in record.items() if value not in ("", None)}, None
+    else:
+        raise ValueError(f"Unknown import format: {format}")
+
+
+def read_upload(stream: IO[bytes], format: str):
+    """read_rows() over a binary stream such as an uploaded file (UTF-8, with or without BOM)."""
+    return read_rows(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""), format)
+
+def format_of(filename: Optional[str], format: Optional[str]) -> str:
+    """The explicit ``format``, else the file extension; ValueError if neither is supported."""
+    format = format or (filename or "").rsplit(".", 1)[-1].lower()
+    if format not in FORMATS:
+        raise ValueError(f"Unsupported import format {format!r}; use one of {', '.join(FORMATS)}")
+    return format
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+    )
+
+def _validated(chunk, schema, report: ImportReport) -> list:
+    valid = []
+    for line, fields, error in chunk:
+        if error is None:
+            try:
+                valid.append((line, schema.model_validate(fields)))
+                continue
+            except ValidationError as exc:
+                error = _describe(exc)
+        report.error(line, error)
+    return valid
+
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+# ----------------------------------------------------------
+# Users
+
+def _unique_users(bind, candidates, report: ImportReport) -> list:
+    """Drop rows whose email or mobile number is taken, in the database or earlier in the chunk."""
+    emails = {user.email for _, user in candidates}
+    mobiles = {user.mobile_number for _, user in candidates}
+    with bind.connect() as conn:
+        taken_emails = set(conn.execute(select(User.email).where(User.email.in_(emails))).scalars())
+        taken_mobiles = set(conn.execute(
+            select(User.mobile_number).where(User.mobile_number.in_(mobiles))
+        ).scalars())
+    unique = []
+    for line, user in candidates:
+        if user.email in taken_emails:
+            report.error(line, f"email {user.email} is already registered")
+        elif user.mobile_number in taken_mobiles:
+            report.error(line, f"mobile_number {user.mobile_number} is already registered")
+        elif user.hashed_password is not None and pwd_context.identify(user.hashed_password) is None:
+            report.error(line, "hashed_password is not a bcrypt hash")
+        else:
+            taken_emails.add(user.email)
+            taken_mobiles.add(user.mobile_number)
+            unique.append((line, user))
+    return unique
+
+def _insert_users(conn, users) -> int:
+    """Insert validated users with their slots and name index entries; returns how many are doctors."""
+    conn.execute(insert(User), [
+        {**user.model_dump(include=set(USER_COLUMNS)), "hashed_password": hashed} for user, hashed in users
+    ])
+    ids = dict(conn.execute(
+        select(User.email, User.id).where(User.email.in_([user.email for user, _ in users]))
+    ).all())
+    doctors = [user for user, _ in users if user.user_type == "doctor"]
+    slots = [
+        {"doctor_id": ids[user.email], "weekday": slot.weekday, "start_time": slot.start_time,
+         "end_time": slot.end_time, "capacity": slot.capacity}
+        for user in doctors for slot in build_slots(user.available_timeslots)
+    ]
+    if slots:
+        conn.execute(insert(DoctorSlot), slots)
+    index_names(conn, [(ids[user.email], user.full_name) for user, _ in users])
+    return len(doctors)
+
+def import_users(rows: Iterable, bind=engine, chunk_size: Optional[int] = None) -> ImportReport:
+    """Import (line, fields, error) rows from read_rows()."""
+    report = ImportReport()
+    doctors = 0
+    for chunk in _chunks(rows, chunk_size or settings.IMPORT_CHUNK_SIZE):
+        candidates = _unique_users(bind, _validated(chunk, UserImport, report), report)
+        if not candidates:
+            continue
+        to_hash = [user.password for _, user in candidates if user.hashed_password is None]
+        hashes = iter(get_password_pool().map(hash_password, to_hash))
+        users = [(line, user, user.hashed_password or next(hashes)) for line, user in candidates]
+        doctors += _insert_chunk(
+            bind, users, lambda conn, batch: _insert_users(conn, [(user, hashed) for _, user, hashed in batch]),
+            report
+        )
+    if doctors:
+        get_directory_cache().bump()
+        clear_slot_index()
+    return report
+
+
+# ----------------------------------------------------------
+# Appointments
+
+def _resolve_parties(bind, candidates, report: ImportReport) -> list:
+    """(line, row values) for rows whose doctor and patient exist, with their ids filled in."""
+    emails = {email for _, row in candidates for email in (row.doctor_email, row.patient_email)}
+    with bind.connect() as conn:
+        users: Dict[str, Tuple[int, str]] = {
+            email: (user_id, getattr(user_type, "value", user_type))
+            for email, user_id, user_type in conn.execute(
+                select(User.email, User.id, User.user_type).where(User.email.in_(emails))
+            )
+        }
+    resolved = []
+    for line, row in candidates:
+        doctor, patient = users.get(row.doctor_email), users.get(row.patient_email)
+        if doctor is None or doctor[1] != "doctor":
+            report.error(line, f"no doctor with email {row.doctor_email}")
+        elif patient is None or patient[1] != "patient":
+            report.error(line, f"no patient with email {row.patient_email}")
+        else:
+            resolved.append((line, {
+                "doctor_id": doctor[0], "patient_id": patient[0], "appointment_time": row.appointment_time,
+                "status": AppointmentStatus(row.status), "notes": row.notes
+            }))
+    return resolved
+
+# Statuses whose appointments hold a seat of their slot
+SEATED = (AppointmentStatus.pending, AppointmentStatus.confirmed)
+
+def _assign_seats(bind, resolved, report: ImportReport, now: datetime) -> list:
+    """
+    Give upcoming Pending and Confirmed rows the first free seat of their
+    slot (``values["seat"]`` as (slot_start, seat)); rows outside every slot
+    or beyond its capacity are reported and dropped.
+    """
+    seated = [(line, values) for line, values in resolved
+              if values["status"] in SEATED and values["appointment_time"] >= now]
+    if not seated:
+        return resolved
+    doctor_ids = {values["doctor_id"] for _, values in seated}
+    with bind.connect() as conn:
+        slots: Dict[Tuple[int, int], list] = {}
+        for slot in conn.execute(select(DoctorSlot).where(DoctorSlot.doctor_id.in_(doctor_ids))):
+            slots.setdefault((slot.doctor_id, slot.weekday), []).append(slot)
+        taken = set(conn.execute(
+            select(SlotClaim.doctor_id, SlotClaim.slot_start, SlotClaim.seat).where(
+                SlotClaim.doctor_id.in_(doctor_ids),
+                # Seated rows are upcoming, so their slots start today at the earliest
+                SlotClaim.slot_start >= datetime.combine(now.date(), time.min),
+            )
+        ).all())
+    dropped = set()
+    for line, values in seated:
+        at = values["appointment_time"]
+        slot = next((slot for slot in slots.get((values["doctor_id"], at.weekday()), ())
+                     if slot.start_time <= at.time() < slot.end_time), None)
+        if slot is None:
+            report.error(line, f"no slot of the doctor covers {at.isoformat()}")
+            dropped.add(line)
+            continue
+        slot_start = datetime.combine(at.date(), slot.start_time)
+        seat = next((seat for seat in range(slot.capacity)
+                     if (values["doctor_id"], slot_start, seat) not in taken), None)
+        if seat is None:
+            report.error(line, f"the slot at {slot_start.isoformat()} is already fully booked")
+            dropped.add(line)
+            continue
+        taken.add((values["doctor_id"], slot_start, seat))
+        values["seat"] = (slot_start, seat)
+    return [(line, values) for line, values in resolved if line not in dropped]
+
+def _insert_appointments(conn, batch):
+    plain = [values for _, values in batch if "seat" not in values]
+    if plain:
+        conn.execute(insert(Appointment), plain)
+    # Seated rows need their ids for the claims, and MySQL has no INSERT ..
+    # RETURNING: insert them one by one (they are only the upcoming few)
+    claims = []
+    for _, values in batch:
+        if "seat" not in values:
+            continue
+        [appointment_id] = conn.execute(
+            insert(Appointment), {key: value for key, value in values.items() if key != "seat"}
+        ).inserted_primary_key
+        claims.append({"doctor_id": values["doctor_id"], "slot_start": values["seat"][0],
+                       "seat": values["seat"][1], "appointment_id": appointment_id})
+    if claims:
+        conn.execute(insert(SlotClaim), claims)
+
+def import_appointments(rows: Iterable, bind=engine, chunk_size: Optional[int] = None) -> ImportReport:
+    """Import (line, fields, error) rows from read_rows(), then rebuild the doctors' daily stats."""
+    report = ImportReport()
+    doctor_ids = set()
+    now = datetime.utcnow()
+    for chunk in _chunks(rows, chunk_size or settings.IMPORT_CHUNK_SIZE):
+        resolved = _resolve_parties(bind, _validated(chunk, AppointmentImport, report), report)
+        resolved = _assign_seats(bind, resolved, report, now)
+        if not resolved:
+            continue
+        _insert_chunk(bind, resolved, _insert_appointments, report)
+        doctor_ids.update(values["doctor_id"] for _, values in resolved)
+    doctor_ids = sorted(doctor_ids)
+    for start in range(0, len(doctor_ids), settings.IMPORT_CHUNK_SIZE):
+        with bind.begin() as conn:
+            rebuild_daily_stats(conn, doctor_ids[start:start + settings.IMPORT_CHUNK_SIZE])
+    return report
+
+
+def _insert_chunk(bind, batch: list, insert_rows, report: ImportReport):
+    """
+    Run ``insert_rows(conn, batch)`` in one transaction. If a constraint
+    fails (say, a row inserted concurrently), retry row by row so only the
+    offending rows are reported. Returns what ``insert_rows`` returned,
+    summed over the row-by-row retries.
+    """
+    try:
+        with bind.begin() as conn:
+            result = insert_rows(conn, batch)
+        report.imported += len(batch)
+        return result or 0
+    except IntegrityError:
+        pass
+    total = 0
+    for row in batch:
+        try:
+            with bind.begin() as conn:
+                total += insert_rows(conn, [row]) or 0
+            report.imported += 1
+        except IntegrityError as exc:
+            report.error(row[0], f"rejected by the database: {exc.orig}")
+    return total
+
+
+IMPORTERS = {"users": import_users, "appointments": import_appointments}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(IMPORTERS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    args = parser.parse_args()
+
+    with open(args.path, "rb") as f:
+        report = IMPORTERS[args.kind](read_upload(f, format_of(args.path, args.format)))
+    print(f"✅ Imported {report.imported} {args.kind}")
+    if report.failed:
+        print(f"⚠️ {report.failed} rows failed:")
+        for error in report.errors:
+            print(f"  line {error['line']}: {error['error']}")
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased, joinedload, load_only
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.schemas.user import UserSummary
+
+# Only the user columns that AppointmentOut actually serializes
+SUMMARY_COLUMNS = [getattr(User, name) for name in UserSummary.model_fields]
+
+def with_parties(query):
+    """Eager-load doctor and patient in the same statement, skipping unused (and blob) columns."""
+    return query.options(
+        joinedload(Appointment.doctor).load_only(*SUMMARY_COLUMNS),
+        joinedload(Appointment.patient).load_only(*SUMMARY_COLUMNS),
+    )
+
+def export_query(date_from: Optional[date] = None, date_to: Optional[date] = None,
+                 status: Optional[AppointmentStatus] = None):
+    """
+    Flat export rows, oldest first: the appointment's columns and both
+    parties' names, read without building ORM objects. ``date_to`` is
+    inclusive.
+    """
+    doctor, patient = aliased(User, name="doctor"), aliased(User, name="patient")
+    query = (
+        select(
+            Appointment.id, Appointment.appointment_time, Appointment.status,
+            Appointment.doctor_id, doctor.full_name.label("doctor_name"),
+            Appointment.patient_id, patient.full_name.label("patient_name"),
+            Appointment.notes
+        )
+        .outerjoin(doctor, doctor.id == Appointment.doctor_id)
+        .outerjoin(patient, patient.id == Appointment.patient_id)
+        .order_by(Appointment.appointment_time, Appointment.id)
+    )
+    if date_from:
+        query = query.where(Appointment.appointment_time >= date_from)
+    if date_to:
+        query = query.where(Appointment.appointment_time < date_to + timedelta(days=1))
+    if status:
+        query = query.where(Appointment.status == status)
+    return query
+
+async def get_appointment_with_parties(db, appointment_id: int):
+    """(Re)load one appointment ready for AppointmentOut, e.g. after a commit."""
+    result = await db.execute(
+        with_parties(select(Appointment))
+        .where(Appointment.id == appointment_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def book_seat(db, appointment: Appointment, slot: DoctorSlot) -> Optional[int]:
+    """
+    Commit ``appointment`` together with a free seat of ``slot`` on its day.
+
+    Seats already taken are skipped up front; a seat claimed concurrently
+    makes the commit fail on the slot_claims primary key, after which the
+    next seat is tried. Returns the id of the patient's appointment in the
+    slot -- an earlier booking of theirs counts, so a retried request never
+    books twice -- or None when every seat is taken.
+    """
+    # Read before any rollback expires the slot
+    doctor_id, capacity = slot.doctor_id, slot.capacity
+    slot_start = datetime.combine(appointment.appointment_time.date(), slot.start_time)
+    claims = (await db.execute(
+        select(SlotClaim.seat, Appointment.id, Appointment.patient_id)
+        .join(SlotClaim.appointment)
+        .where(SlotClaim.doctor_id == doctor_id, SlotClaim.slot_start == slot_start)
+    )).all()
+    for claim in claims:
+        if claim.patient_id == appointment.patient_id:
+            return claim.id
+
+    taken = {claim.seat for claim in claims}
+    for seat in range(capacity):
+        if seat in taken:
+            continue
+        db.add(SlotClaim(doctor_id=doctor_id, slot_start=slot_start, seat=seat, appointment=appointment))
+        try:
+            await db.commit()
+            return appointment.id
+        except IntegrityError:
+            await db.rollback()
+            # The failed flush assigned an id, which a concurrent booking may
+            # have been given since; let the next attempt get a fresh one
+            appointment.id = None
+    return None
+
+async def release_seat(db, appointment_id: int):
+    """Free the seat held by an appointment (flushed with the caller's commit)."""
+    await db.execute(delete(SlotClaim).where(SlotClaim.appointment_id == appointment_id))
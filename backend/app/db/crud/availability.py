@@ -0,0 +1,145 @@
+import math
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import String, func, select, type_coerce
+from app.db.models.appointment import SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.core.slot_index import SlotIndex, get_slot_index, minutes
+from app.utils.validators import parse_timeslots
+
+def build_slots(available_timeslots: Optional[str]) -> List[DoctorSlot]:
+    if not available_timeslots:
+        return []
+    return [
+        DoctorSlot(weekday=weekday, start_time=start, end_time=end, capacity=1)
+        for weekday, start, end in parse_timeslots(available_timeslots)
+    ]
+
+def slot_covering(doctor_id: int, at: datetime):
+    """Statement selecting the doctor's slot that contains ``at``, if any."""
+    at = at.replace(tzinfo=None)
+    return select(DoctorSlot).where(
+        DoctorSlot.doctor_id == doctor_id,
+        DoctorSlot.weekday == at.weekday(),
+        DoctorSlot.start_time <= at.time(),
+        DoctorSlot.end_time > at.time(),
+    ).limit(1)
+
+
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def as_datetime64(values) -> np.ndarray:
+    """Minute-resolution datetime64 array from ISO strings or datetime objects."""
+    if values and isinstance(values[0], str):
+        return np.array(values, dtype="datetime64[m]")
+    return np.fromiter(
+        ((value.toordinal() - EPOCH_ORDINAL) * 1440 + value.hour * 60 + value.minute for value in values),
+        dtype=np.int64, count=len(values)
+    ).astype("datetime64[m]")
+
+def seats_left(index: SlotIndex, rows: np.ndarray, claims, start: date, days: int) -> np.ndarray:
+    """
+    Free seats of the index ``rows`` per day, as a ``len(rows) x days``
+    matrix; day ``d`` is ``start + d`` and a slot only has seats on its
+    weekday. ``claims`` are (doctor_id, slot_start) rows, one per taken seat.
+    """
+    day_weekdays = (start.weekday() + np.arange(days)) % 7
+    seats = np.where(index.weekday[rows, None] == day_weekdays[None, :], index.capacity[rows, None], 0)
+    if not claims:
+        return seats
+
+    doctor_ids = [claim[0] for claim in claims]
+    offset = (as_datetime64([claim[1] for claim in claims]) - np.datetime64(start, "m")).astype(np.int64)
+    day, minute = np.divmod(offset, 1440)
+    found = index.find(np.asarray(doctor_ids, dtype=np.int64), (start.weekday() + day) % 7, minute)
+    # Index row -> row of the matrix; claims on removed slots have none
+    position = np.full(len(index.key) + 1, -1)
+    position[rows] = np.arange(len(rows))
+    matrix_row = position[found]
+    hit = (matrix_row >= 0) & (day >= 0) & (day < days)
+    np.subtract.at(seats, (matrix_row[hit], day[hit]), 1)
+    return np.maximum(seats, 0, out=seats)
+
+async def find_free_slots(db, doctor_ids: List[int], start: date, days: int, now: datetime, per_doctor: int) -> dict:
+    """
+    The first ``per_doctor`` open slots of each given doctor over ``days``
+    days from ``start``, skipping slots that begin before ``now``. The weekly
+    slots come from the in-memory SlotIndex. The range is searched in two
+    windows of days: the first long enough to hold twice ``per_doctor``
+    slots of the average doctor if none were booked, the second the rest of
+    the range for the doctors still short of ``per_doctor``. Each window
+    loads those doctors' booked seats in one query, so the claims of days
+    past the first window are read only for doctors that need them.
+
+    Returns ``{doctor_id: [{"start", "end", "seats_left"}, ...]}`` with ISO
+    timestamps, in chronological order; doctors without open slots are left out.
+    """
+    index = await get_slot_index(db)
+    rows = index.rows_of(doctor_ids)
+    free = {}
+    if not len(rows):
+        return free
+    weekly = len(rows) / len(np.unique(index.doctor_id[rows]))
+    first = min(math.ceil(2 * per_doctor * 7 / weekly), days)
+    for offset, span in ((0, first), (first, days - first)):
+        if not len(rows) or not span:
+            break
+        window_start = start + timedelta(days=offset)
+        claims = await _claims(db, index, rows, window_start, span)
+        _add_free_slots(free, index, rows, claims, window_start, span, now, per_doctor)
+        # Only doctors still short of per_doctor go on to the second window
+        full = [doctor_id for doctor_id, slots in free.items() if len(slots) >= per_doctor]
+        rows = rows[~np.isin(index.doctor_id[rows], full)]
+    return free
+
+async def _claims(db, index: SlotIndex, rows: np.ndarray, start: date, days: int):
+    range_start = datetime.combine(start, datetime.min.time())
+    # Table columns rather than the mapped class: a plain Core statement
+    # skips ORM row processing, which dominates for tens of thousands of rows
+    claim = SlotClaim.__table__.c
+    return (await db.execute(
+        # The raw column value: on SQLite that is the stored ISO text, which
+        # numpy parses in bulk much faster than per-row datetime conversion
+        select(claim.doctor_id, type_coerce(claim.slot_start, String))
+        .where(
+            claim.doctor_id.in_(np.unique(index.doctor_id[rows]).tolist()),
+            claim.slot_start >= range_start,
+            claim.slot_start < range_start + timedelta(days=days),
+        )
+    )).all()
+
+def _add_free_slots(free: dict, index: SlotIndex, rows: np.ndarray, claims, start: date, days: int,
+                    now: datetime, per_doctor: int):
+    """Append the open slots of ``days`` days from ``start`` to ``free``, up to ``per_doctor`` per doctor."""
+    seats = seats_left(index, rows, claims, start, days)
+
+    starts, ends = index.start[rows], index.end[rows]
+    today = (now.date() - start).days
+    if 0 <= today < days:
+        seats[starts < minutes(now), today] = 0
+    if today > 0:
+        seats[:, :min(today, days)] = 0
+
+    # Open cells in (doctor, day, time) order, cut to what each doctor still lacks
+    matrix_rows, cols = np.nonzero(seats)
+    doctor = index.doctor_id[rows][matrix_rows]
+    order = np.lexsort((starts[matrix_rows], cols, doctor))
+    matrix_rows, cols, doctor = matrix_rows[order], cols[order], doctor[order]
+    doctors, first, count = np.unique(doctor, return_index=True, return_counts=True)
+    wanted = np.array([per_doctor - len(free.get(doctor_id, ())) for doctor_id in doctors.tolist()], dtype=np.int64)
+    keep = np.arange(len(doctor)) - np.repeat(first, count) < np.repeat(wanted, count)
+    matrix_rows, cols, doctor = matrix_rows[keep], cols[keep], doctor[keep]
+
+    day_labels = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+    time_labels = {value: f"{value // 60:02d}:{value % 60:02d}:00" for value in np.unique(np.concatenate([starts, ends])).tolist()}
+    for doctor_id, col, begin, end, left in zip(
+        doctor.tolist(), cols.tolist(), starts[matrix_rows].tolist(),
+        ends[matrix_rows].tolist(), seats[matrix_rows, cols].tolist()
+    ):
+        free.setdefault(doctor_id, []).append({
+            "start": f"{day_labels[col]}T{time_labels[begin]}",
+            "end": f"{day_labels[col]}T{time_labels[end]}",
+            "seats_left": left,
+        })
@@ -0,0 +1,68 @@
+"""
+Name search over users.full_name.
+
+``ILIKE '%term%'`` cannot use an index, so the term's grams are first looked
+up in user_name_grams (one index probe each) and only the users holding all
+of them are checked with the LIKE. Terms shorter than a gram match every
+gram they prefix, which is still a range scan on the index.
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import case, func, select, true
+from sqlalchemy.orm import aliased
+from app.db.models.user import User
+from app.db.models.search import GRAM_SIZE, UserNameGram, normalize_name
+
+
+def _candidates(term: str):
+    """Ids of users whose name holds every gram of ``term`` (a superset of the matches)."""
+    if len(term) < GRAM_SIZE:
+        upper = term[:-1] + chr(ord(term[-1]) + 1)
+        return select(UserNameGram.user_id).where(UserNameGram.gram >= term, UserNameGram.gram < upper)
+    grams = {term[i:i + GRAM_SIZE] for i in range(len(term) - GRAM_SIZE + 1)}
+    return (
+        select(UserNameGram.user_id)
+        .where(UserNameGram.gram.in_(grams))
+        .group_by(UserNameGram.user_id)
+        .having(func.count() == len(grams))
+    )
+
+def name_matches(id_column, term: str):
+    """
+    Condition that the user referenced by ``id_column`` (User.id,
+    Appointment.doctor_id, ...) has ``term`` anywhere in their name. Each call
+    uses its own alias, so doctor and patient conditions can be combined.
+    """
+    term = normalize_name(term)
+    if not term:
+        return true()
+    matched = aliased(User)
+    return id_column.in_(
+        select(matched.id).where(
+            matched.id.in_(_candidates(term)),
+            matched.full_name.icontains(term, autoescape=True)
+        )
+    )
+
+def name_rank(name_column, term: str):
+    """Sort key for matches: whole name, then name prefix, then word prefix, then anywhere."""
+    term = normalize_name(term)
+    name = func.lower(name_column)
+    return case(
+        (name == term, 0),
+        (name.startswith(term, autoescape=True), 1),
+        (name.contains(" " + term, autoescape=True), 2),
+        else_=3
+    )
+
+async def search_users(db, term: str, columns, user_type: Optional[str] = None,
+                       limit: int = 20, offset: int = 0) -> Tuple[List, Optional[int]]:
+    """
+    One page of users matching ``term``, best match first (then shorter
+    names, then id). Returns the rows and the offset of the next page, if any.
+    """
+    query = select(*columns).where(name_matches(User.id, term))
+    if user_type:
+        query = query.where(User.user_type == user_type)
+    query = query.order_by(name_rank(User.full_name, term), func.length(User.full_name), User.id)
+    rows = (await db.execute(query.offset(offset).limit(limit + 1))).all()
+    return rows[:limit], (offset + limit if len(rows) > limit else None)
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from app.db.models.user import User
 from app.core.security import hash_password, verify_password
+from app.core.storage import get_blob_store
+from app.db.crud.availability import build_slots
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -10,21 +12,23 @@ def get_user_by_mobile(db: Session, mobile_number: str):
 
 from typing import Optional
 
-def create_user(db: Session, user_data, image_data: Optional[bytes]):
+def create_user(db: Session, user_data, image_data: Optional[bytes], hashed_password: Optional[str] = None):
+    # Async callers hash through the password pool first and pass the result in
     user = User(
         full_name=user_data.full_name,
         email=user_data.email,
         mobile_number=user_data.mobile_number,
-        hashed_password=hash_password(user_data.password),
+        hashed_password=hashed_password or hash_password(user_data.password),
         user_type=user_data.user_type,
         division=user_data.division,
         district=user_data.district,
         thana=user_data.thana,
-        profile_image=image_data,
+        profile_image_key=get_blob_store().put(image_data) if image_data else None,
         license_number=user_data.license_number,
         experience_years=user_data.experience_years,
         consultation_fee=user_data.consultation_fee,
-        available_timeslots=user_data.available_timeslots
+        available_timeslots=user_data.available_timeslots,
+        slots=build_slots(user_data.available_timeslots) if user_data.user_type == "doctor" else []
     )
     db.add(user)
     db.commit()
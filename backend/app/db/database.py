@@ -1,20 +1,164 @@
-from sqlalchemy import create_engine
+import asyncio
+import logging
+import weakref
+from fastapi import Depends
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 from app.core.config import settings
+from app.db.pool import async_pool_metrics, pool_options, sync_pool_metrics
+# Hooks every engine: slow-query log and N+1 detection
+from app.db import query_log  # noqa: F401
 
-engine = create_engine(settings.DB_URL)
+logger = logging.getLogger(__name__)
+
+engine = create_engine(settings.DB_URL, **pool_options(settings.DB_URL, QueuePool, sync_pool_metrics))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 def create_db_and_tables():
     from app.db.models import user
+    from app.db import migrate
+    fresh = not inspect(engine).has_table("users")
     Base.metadata.create_all(bind=engine)
+    if fresh:
+        # Built from the current models: nothing to migrate
+        migrate.stamp(engine)
+    elif todo := migrate.pending(engine):
+        logger.warning(f"Pending schema migrations {todo}; run: python -m app.db.migrate")
 
+# Request-scoped session. Every dependency (routes, get_current_user, ...) must
+# depend on this exact function: FastAPI then resolves it once per request and
+# hands the same session to all of them, and tests only need to override it here.
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# ----------------------------------------------------------
+# Async API layer
+#
+# Routes are written against the AsyncSession API and depend on get_async_db.
+# With DB_ASYNC enabled they get a real AsyncSession on an async driver and no
+# longer occupy a threadpool thread while waiting on the database. Otherwise
+# (the default) the request's sync session from get_db is wrapped so each call
+# runs in the threadpool. Celery tasks keep using SessionLocal directly.
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url() -> str:
+    if settings.ASYNC_DB_URL:
+        return settings.ASYNC_DB_URL
+    url = make_url(settings.DB_URL)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_sessionmaker():
+    # Built on first use so processes that never serve requests (Celery) don't
+    # need an async driver installed
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **pool_options(url, AsyncAdaptedQueuePool, async_pool_metrics))
+        # Objects stay usable after commit; async code cannot lazily refresh them
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+
+class ThreadedSession:
+    """The subset of AsyncSession used by routes, backed by a sync Session in the threadpool."""
+
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def stream_scalars(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+        return _iterate_partitions(result)
+
+    async def stream(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+        return ThreadedResult(result)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+class ThreadedResult:
+    """The subset of AsyncResult used by routes, fetching in the threadpool."""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        async for partition in iterate_in_threadpool(self.result.partitions(size)):
+            yield partition
+
+async def _iterate_partitions(result):
+    # One threadpool hop per yield_per batch rather than per row
+    async for partition in iterate_in_threadpool(result.partitions()):
+        for item in partition:
+            yield item
+
+def pool_stats() -> dict:
+    stats = {"sync": sync_pool_metrics.snapshot(engine.pool)}
+    if _async_engine is not None:
+        stats["async"] = async_pool_metrics.snapshot(_async_engine.pool)
+    return stats
+
+# A threaded session keeps its connection between awaits. Uncapped, requests
+# blocked in pool checkout can occupy every threadpool worker while the
+# requests holding connections wait for a worker to continue.
+_session_slots = weakref.WeakKeyDictionary()  # event loop -> Semaphore
+
+def threaded_session_slots() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    slots = _session_slots.get(loop)
+    if slots is None:
+        slots = _session_slots[loop] = asyncio.Semaphore(settings.DB_THREADED_SESSIONS)
+    return slots
+
+async def get_async_db(db: Session = Depends(get_db)):
+    if not settings.DB_ASYNC:
+        async with threaded_session_slots():
+            try:
+                yield ThreadedSession(db)
+            finally:
+                # Hand the connection back before the next request is admitted
+                await run_in_threadpool(db.close)
+        return
+    async with get_async_sessionmaker()() as session:
+        yield session
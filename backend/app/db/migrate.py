@@ -0,0 +1,153 @@
+"""
+Versioned schema migrations.
+
+``create_all()`` only creates missing tables; it never adds columns or
+indexes to a table that already exists. Those changes (and their data
+backfills) are steps here, applied in order and recorded in
+``schema_migrations``. Every step is safe to rerun. A database created from
+scratch already has the latest schema, so create_db_and_tables() stamps it
+with every version instead of running them.
+
+    python -m app.db.migrate           # apply pending migrations
+    python -m app.db.migrate --list    # show applied/pending
+"""
+import argparse
+import logging
+from datetime import datetime
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.orm import sessionmaker
+from app.db.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def create_missing_indexes(bind, table):
+    """Create the indexes declared on ``table`` that the database does not have yet."""
+    existing = {index["name"] for index in inspect(bind).get_indexes(table.name)}
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        if index.name not in existing:
+            logger.info(f"Creating index {index.name}")
+            index.create(bind=bind)
+
+
+def _profile_image_blobs(bind, session_factory):
+    from app.db import migrate_profile_images
+    migrate_profile_images.migrate(bind=bind, session_factory=session_factory)
+
+def _doctor_slots(bind, session_factory):
+    from app.db import migrate_availability_slots
+    migrate_availability_slots.migrate(bind=bind, session_factory=session_factory)
+
+def _slot_claims(bind, session_factory):
+    from app.db import migrate_slot_claims
+    migrate_slot_claims.migrate(bind=bind, session_factory=session_factory)
+
+def _appointment_indexes(bind, session_factory):
+    from app.db.models.appointment import Appointment
+    create_missing_indexes(bind, Appointment.__table__)
+
+def _user_name_grams(bind, session_factory):
+    from app.db.models.search import UserNameGram, index_names
+    from app.db.models.user import User
+    UserNameGram.__table__.create(bind=bind, checkfirst=True)
+    last_id = 0
+    while True:
+        with bind.begin() as conn:
+            users = conn.execute(
+                select(User.id, User.full_name).where(User.id > last_id).order_by(User.id).limit(BATCH_SIZE)
+            ).all()
+            index_names(conn, users)
+        if not users:
+            break
+        last_id = users[-1].id
+
+def _reminder_ledger(bind, session_factory):
+    from app.db.models.appointment import ReminderLedger
+    ReminderLedger.__table__.create(bind=bind, checkfirst=True)
+
+def _doctor_daily_stats(bind, session_factory):
+    from app.db import rebuild_daily_stats
+    rebuild_daily_stats.rebuild(bind=bind)
+
+def _reminder_failures(bind, session_factory):
+    from app.db.models.appointment import ReminderLedger
+    columns = {column["name"] for column in inspect(bind).get_columns("reminder_ledger")}
+    if "failed_at" not in columns:
+        # The model's type as create_all() renders it: DATETIME, not MySQL's TIMESTAMP
+        column_type = ReminderLedger.__table__.c.failed_at.type.compile(dialect=bind.dialect)
+        with bind.begin() as conn:
+            conn.execute(text(f"ALTER TABLE reminder_ledger ADD COLUMN failed_at {column_type} NULL"))
+
+
+MIGRATIONS = [
+    ("0001_profile_image_blobs", _profile_image_blobs),
+    ("0002_doctor_slots", _doctor_slots),
+    ("0003_slot_claims", _slot_claims),
+    ("0004_appointment_indexes", _appointment_indexes),
+    ("0005_user_name_grams", _user_name_grams),
+    ("0006_reminder_ledger", _reminder_ledger),
+    ("0007_doctor_daily_stats", _doctor_daily_stats),
+    ("0008_reminder_failures", _reminder_failures),
+]
+
+
+def applied_versions(bind) -> set:
+    schema_migrations.create(bind=bind, checkfirst=True)
+    with bind.connect() as conn:
+        return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def pending(bind=engine) -> list:
+    applied = applied_versions(bind)
+    return [version for version, _ in MIGRATIONS if version not in applied]
+
+def _record(bind, version):
+    with bind.begin() as conn:
+        conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+
+def stamp(bind=engine):
+    """Mark every migration as applied without running it (fresh databases)."""
+    for version in pending(bind):
+        _record(bind, version)
+
+def upgrade(bind=engine, session_factory=None) -> list:
+    """Apply pending migrations in order; returns the versions applied."""
+    from app.db.models import user  # register every model
+    if not inspect(bind).has_table("users"):
+        # Empty database: build the current schema directly
+        Base.metadata.create_all(bind=bind)
+        stamp(bind)
+        return []
+    session_factory = session_factory or sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    todo = set(pending(bind))
+    done = []
+    for version, step in MIGRATIONS:
+        if version not in todo:
+            continue
+        logger.info(f"Applying migration {version}")
+        step(bind, session_factory)
+        _record(bind, version)
+        done.append(version)
+    return done
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--list", action="store_true", help="show migration status and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.list:
+        todo = set(pending())
+        for version, _ in MIGRATIONS:
+            print(f"{'⏳ pending' if version in todo else '✅ applied'}  {version}")
+    else:
+        done = upgrade()
+        print(f"✅ Applied {len(done)} migrations" + (f": {', '.join(done)}" if done else ""))
@@ -0,0 +1,58 @@
+"""
+Populate ``doctor_slots`` from the free-text ``users.available_timeslots``.
+
+Creates the table when it is missing, then parses the timeslots of every
+doctor that has none yet. Doctors whose text cannot be parsed are reported
+and left without slots (they cannot be booked until fixed). Safe to rerun.
+
+    python -m app.db.migrate_availability_slots
+"""
+import logging
+from sqlalchemy import exists
+from app.db.database import SessionLocal, engine
+from app.db.models.user import User
+from app.db.models.availability import DoctorSlot
+from app.db.crud.availability import build_slots
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+def migrate(bind=engine, session_factory=SessionLocal):
+    DoctorSlot.__table__.create(bind=bind, checkfirst=True)
+    db = session_factory()
+    migrated, invalid = 0, []
+    last_id = 0
+    try:
+        while True:
+            doctors = db.query(User.id, User.available_timeslots).filter(
+                User.id > last_id,
+                User.user_type == "doctor",
+                User.available_timeslots.isnot(None),
+                ~exists().where(DoctorSlot.doctor_id == User.id)
+            ).order_by(User.id).limit(BATCH_SIZE).all()
+            if not doctors:
+                break
+
+            for doctor_id, timeslots in doctors:
+                try:
+                    slots = build_slots(timeslots)
+                except ValueError as e:
+                    logger.warning(f"Doctor {doctor_id}: cannot parse available_timeslots {timeslots!r}: {e}")
+                    invalid.append(doctor_id)
+                    continue
+                for slot in slots:
+                    slot.doctor_id = doctor_id
+                db.add_all(slots)
+                migrated += 1
+            db.commit()
+            last_id = doctors[-1].id
+        return migrated, invalid
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrated, invalid = migrate()
+    print(f"✅ Created slots for {migrated} doctors")
+    if invalid:
+        print(f"⚠️ Could not parse timeslots for doctor ids: {invalid}")
@@ -0,0 +1,51 @@
+"""
+Move profile images out of ``users.profile_image`` into the blob store.
+
+Adds the ``profile_image_key`` column when it is missing, copies every inline
+image into the configured blob store and clears the inline copy. Safe to rerun:
+rows that already have a key are skipped.
+
+    python -m app.db.migrate_profile_images
+"""
+from sqlalchemy import inspect, text
+from app.db.database import SessionLocal, engine
+from app.db.models.user import User
+from app.core.storage import get_blob_store
+
+BATCH_SIZE = 200
+
+def add_key_column(bind):
+    columns = {column["name"] for column in inspect(bind).get_columns("users")}
+    if "profile_image_key" not in columns:
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN profile_image_key VARCHAR(64)"))
+
+def migrate(bind=engine, session_factory=SessionLocal, store=None):
+    add_key_column(bind)
+    store = store or get_blob_store()
+    db = session_factory()
+    moved = 0
+    try:
+        while True:
+            # Re-query each batch: migrated rows drop out of the filter
+            rows = db.query(User.id, User.profile_image).filter(
+                User.profile_image.isnot(None),
+                User.profile_image_key.is_(None)
+            ).order_by(User.id).limit(BATCH_SIZE).all()
+            if not rows:
+                break
+
+            for user_id, image in rows:
+                db.query(User).filter(User.id == user_id).update(
+                    {User.profile_image_key: store.put(image), User.profile_image: None},
+                    synchronize_session=False
+                )
+            db.commit()
+            moved += len(rows)
+        return moved
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    count = migrate()
+    print(f"✅ Moved {count} profile images to the blob store")
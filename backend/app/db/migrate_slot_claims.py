@@ -0,0 +1,64 @@
+"""
+Give existing appointments the slot seat they would have claimed when booked.
+
+Creates ``slot_claims`` when it is missing, then walks every non-cancelled
+appointment without a claim (oldest first) and assigns it the first free seat
+of its covering slot. Appointments outside every slot, or beyond a slot's
+capacity (double bookings made before claims existed), are reported and left
+unclaimed. Run after ``migrate_availability_slots``. Safe to rerun.
+
+    python -m app.db.migrate_slot_claims
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import exists
+from app.db.database import SessionLocal, engine
+from app.db.models.appointment import Appointment, AppointmentStatus, SlotClaim
+from app.db.crud.availability import slot_covering
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+def migrate(bind=engine, session_factory=SessionLocal):
+    SlotClaim.__table__.create(bind=bind, checkfirst=True)
+    db = session_factory()
+    claimed, unclaimed = 0, []
+    last_id = 0
+    try:
+        while True:
+            appointments = db.query(Appointment).filter(
+                Appointment.id > last_id,
+                Appointment.status != AppointmentStatus.cancelled,
+                ~exists().where(SlotClaim.appointment_id == Appointment.id)
+            ).order_by(Appointment.id).limit(BATCH_SIZE).all()
+            if not appointments:
+                break
+
+            for appointment in appointments:
+                slot = db.execute(slot_covering(appointment.doctor_id, appointment.appointment_time)).scalars().first()
+                if slot is None:
+                    logger.warning(f"Appointment {appointment.id}: no slot covers {appointment.appointment_time}")
+                    unclaimed.append(appointment.id)
+                    continue
+                slot_start = datetime.combine(appointment.appointment_time.date(), slot.start_time)
+                taken = {seat for (seat,) in db.query(SlotClaim.seat).filter_by(doctor_id=slot.doctor_id, slot_start=slot_start)}
+                free = next((seat for seat in range(slot.capacity) if seat not in taken), None)
+                if free is None:
+                    logger.warning(f"Appointment {appointment.id}: slot at {slot_start} is already full")
+                    unclaimed.append(appointment.id)
+                    continue
+                db.add(SlotClaim(doctor_id=slot.doctor_id, slot_start=slot_start, seat=free, appointment_id=appointment.id))
+                db.flush()
+                claimed += 1
+            db.commit()
+            last_id = appointments[-1].id
+        return claimed, unclaimed
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    claimed, unclaimed = migrate()
+    print(f"✅ Claimed slot seats for {claimed} appointments")
+    if unclaimed:
+        print(f"⚠️ Left without a seat (no matching slot or slot full): {unclaimed}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -22,3 +22,49 @@ class Appointment(Base):
 
     patient = relationship("User", foreign_keys=[patient_id], back_populates="patient_appointments")
     doctor = relationship("User", foreign_keys=[doctor_id], back_populates="doctor_appointments")
+
+    # Existing databases get these from app.db.migrate (0004). Each index ends
+    # in appointment_time so the (appointment_time, id) ordering of
+    # list_appointments comes straight off the index.
+    __table_args__ = (
+        # A doctor's or patient's appointments, newest first; monthly doctor reports
+        Index("ix_appointments_doctor_time", "doctor_id", "appointment_time"),
+        Index("ix_appointments_patient_time", "patient_id", "appointment_time"),
+        # Reminders: appointments with a given status in a time window
+        Index("ix_appointments_status_time", "status", "appointment_time"),
+        # Admin listing, newest first
+        Index("ix_appointments_time", "appointment_time"),
+    )
+
+class SlotClaim(Base):
+    """
+    One booked seat of a doctor's slot on a given day. The primary key makes
+    a seat claimable exactly once, so concurrent bookings cannot oversell a
+    slot; seats run from 0 to the slot's capacity - 1.
+    """
+    __tablename__ = "slot_claims"
+
+    doctor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    slot_start = Column(DateTime, primary_key=True)
+    seat = Column(Integer, primary_key=True, default=0)
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), nullable=False, unique=True)
+
+    appointment = relationship("Appointment")
+
+class ReminderLedger(Base):
+    """
+    Reminder bookkeeping, one row per appointment (see app.tasks.reminders).
+    Inserting the row claims the reminder, so only one worker sends it;
+    ``sent_at`` records delivery. A claim that is neither sent nor refreshed
+    within the lease (a crashed worker, a failed send) can be claimed again,
+    up to the attempt limit. ``failed_at`` marks a reminder the mail server
+    refused for good (5xx), which is never retried.
+    """
+    __tablename__ = "reminder_ledger"
+
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="CASCADE"), primary_key=True)
+    claim_token = Column(String(32), nullable=False)
+    claimed_at = Column(DateTime, nullable=False)
+    attempts = Column(Integer, nullable=False, default=1)
+    sent_at = Column(DateTime, nullable=True)
+    failed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, SmallInteger, Time, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+class DoctorSlot(Base):
+    """One weekly recurring window in which a doctor takes appointments."""
+    __tablename__ = "doctor_slots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    weekday = Column(SmallInteger, nullable=False)  # datetime.weekday(): Monday is 0
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    capacity = Column(Integer, nullable=False, default=1)
+
+    doctor = relationship("User", back_populates="slots")
+
+    __table_args__ = (
+        # Booking validation: doctor + weekday, then a range check on start_time
+        Index("ix_doctor_slots_doctor_weekday_start", "doctor_id", "weekday", "start_time"),
+    )
@@ -0,0 +1,48 @@
+import re
+from typing import Iterable, Set, Tuple
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, delete, insert
+from sqlalchemy.dialects import mysql
+from app.db.database import Base
+
+GRAM_SIZE = 3
+
+
+def normalize_name(text: str) -> str:
+    """Case- and whitespace-insensitive form of a name or search term."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def name_grams(name: str) -> Set[str]:
+    """
+    Every 3-character window of the normalized name, padded so that each
+    character (the last ones included) starts at least one gram.
+    """
+    padded = f" {normalize_name(name)}  "
+    return {padded[i:i + GRAM_SIZE] for i in range(len(padded) - GRAM_SIZE + 1)}
+
+
+class UserNameGram(Base):
+    """Trigram index over users.full_name for substring search (see app.db.crud.search)."""
+    __tablename__ = "user_name_grams"
+
+    # Binary collation on MySQL: its default one would treat "é" and "e" grams
+    # of the same user as a duplicate key
+    gram = Column(String(GRAM_SIZE).with_variant(mysql.VARCHAR(GRAM_SIZE, collation="utf8mb4_bin"), "mysql"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        # Re-indexing a renamed user
+        Index("ix_user_name_grams_user_id", "user_id"),
+    )
+
+
+def index_names(connection, users: Iterable[Tuple[int, str]]):
+    """(Re)write the grams of the given (user_id, full_name) pairs."""
+    users = list(users)
+    if not users:
+        return
+    table = UserNameGram.__table__
+    connection.execute(delete(table).where(table.c.user_id.in_([user_id for user_id, _ in users])))
+    rows = [{"gram": gram, "user_id": user_id} for user_id, name in users for gram in name_grams(name or "")]
+    if rows:
+        connection.execute(insert(table), rows)
@@ -0,0 +1,152 @@
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import Column, Date, Enum, Float, ForeignKey, Index, Integer, delete, event, func, insert, inspect, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from app.db.database import Base
+from app.db.models.appointment import Appointment, AppointmentStatus
+
+
+class DoctorDailyStats(Base):
+    """
+    Appointments per doctor, day and status, with their revenue. Kept
+    current by the Appointment listeners at the end of this module
+    (registered when app.db.models.user imports it); rebuild_daily_stats()
+    recomputes it.
+
+    A booking adds the doctor's consultation fee at that moment, and an
+    appointment changing bucket takes its bucket's revenue per appointment
+    along. Fee changes therefore never leave a bucket with negative revenue,
+    or with revenue but no appointments; only a rebuild reprices existing
+    appointments at the current fees.
+    """
+    __tablename__ = "doctor_daily_stats"
+
+    doctor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    status = Column(Enum(AppointmentStatus), primary_key=True)
+    appointments = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        # Dashboards across all doctors for a range of days
+        Index("ix_doctor_daily_stats_day", "day"),
+    )
+
+
+# (doctor_id, appointment_time, status, +1 or -1)
+Change = Tuple[int, datetime, Optional[str], int]
+
+def _fee(doctor_id: int):
+    from app.db.models.user import User
+    return func.coalesce(select(User.consultation_fee).where(User.id == doctor_id).scalar_subquery(), 0)
+
+def _upsert(connection, table, values, increments):
+    """INSERT ``values``, or add the ``increments`` columns to the existing row."""
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        stmt = (sqlite if dialect == "sqlite" else postgresql).insert(table).values(values)
+        return stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_={name: table.c[name] + stmt.excluded[name] for name in increments}
+        )
+    if dialect == "mysql":
+        stmt = mysql.insert(table).values(values)
+        return stmt.on_duplicate_key_update({name: table.c[name] + stmt.inserted[name] for name in increments})
+    raise NotImplementedError(f"No upsert for {dialect}")
+
+def _bucket(doctor_id: int, appointment_time: datetime, status: Optional[str]) -> dict:
+    return {
+        "doctor_id": doctor_id,
+        "day": appointment_time.date(),
+        "status": AppointmentStatus(status or AppointmentStatus.pending),
+    }
+
+def _add(connection, bucket: dict, appointments: int, revenue):
+    table = DoctorDailyStats.__table__
+    connection.execute(_upsert(connection, table, {**bucket, "appointments": appointments, "revenue": revenue},
+                               increments=("appointments", "revenue")))
+
+def _revenue_per_appointment(connection, bucket: dict):
+    """What one appointment of ``bucket`` takes along when it leaves; the current fee if the bucket is empty."""
+    table = DoctorDailyStats.__table__
+    row = connection.execute(
+        select(table.c.appointments, table.c.revenue).where(*(table.c[name] == value for name, value in bucket.items()))
+    ).first()
+    if row is None or row.appointments <= 0:
+        return connection.scalar(select(_fee(bucket["doctor_id"])))
+    return row.revenue / row.appointments
+
+def count_appointments(connection, changes: Iterable[Change]):
+    """
+    Apply appointments entering (+1, at the doctor's current fee) or leaving
+    (-1, at their bucket's revenue per appointment) their doctor/day/status counts.
+    """
+    for doctor_id, appointment_time, status, delta in changes:
+        if doctor_id is None or appointment_time is None:
+            continue
+        bucket = _bucket(doctor_id, appointment_time, status)
+        if delta > 0:
+            _add(connection, bucket, delta, delta * _fee(doctor_id))
+        else:
+            _add(connection, bucket, delta, delta * _revenue_per_appointment(connection, bucket))
+
+def move_appointment(connection, before: Tuple[int, datetime, Optional[str]],
+                     after: Tuple[int, datetime, Optional[str]]):
+    """Move one appointment between buckets, with the revenue it was counted at."""
+    if None in before[:2]:
+        return count_appointments(connection, [(*after, 1)])
+    source = _bucket(*before)
+    revenue = _revenue_per_appointment(connection, source)
+    _add(connection, source, -1, -revenue)
+    if None not in after[:2]:
+        _add(connection, _bucket(*after), 1, revenue)
+
+def rebuild_daily_stats(connection, doctor_ids: Optional[Iterable[int]] = None):
+    """Recompute the counts of ``doctor_ids`` (everyone if None) from appointments."""
+    from app.db.models.user import User
+    table = DoctorDailyStats.__table__
+    visits = func.count(Appointment.id)
+    query = (
+        select(
+            Appointment.doctor_id, func.date(Appointment.appointment_time), Appointment.status,
+            visits, visits * func.coalesce(User.consultation_fee, 0)
+        )
+        .join(User, User.id == Appointment.doctor_id)
+        .group_by(Appointment.doctor_id, func.date(Appointment.appointment_time), Appointment.status)
+    )
+    clear = delete(table)
+    if doctor_ids is not None:
+        doctor_ids = list(doctor_ids)
+        query = query.where(Appointment.doctor_id.in_(doctor_ids))
+        clear = clear.where(table.c.doctor_id.in_(doctor_ids))
+    connection.execute(clear)
+    connection.execute(insert(table).from_select(
+        ["doctor_id", "day", "status", "appointments", "revenue"], query
+    ))
+
+
+# Keep the counts in step with bookings and status changes, in the same
+# transaction. Core bulk writes bypass this; call count_appointments() or
+# rebuild_daily_stats() for those rows yourself.
+COUNTED_FIELDS = ("doctor_id", "appointment_time", "status")
+
+def _before(state, field):
+    history = state.attrs[field].history
+    return history.deleted[0] if history.deleted else getattr(state.object, field)
+
+@event.listens_for(Appointment, "after_insert")
+def _count_booking(mapper, connection, target):
+    count_appointments(connection, [(target.doctor_id, target.appointment_time, target.status, 1)])
+
+@event.listens_for(Appointment, "after_update")
+def _count_transition(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in COUNTED_FIELDS):
+        return
+    before = tuple(_before(state, field) for field in COUNTED_FIELDS)
+    move_appointment(connection, before, (target.doctor_id, target.appointment_time, target.status))
+
+@event.listens_for(Appointment, "after_delete")
+def _count_removal(mapper, connection, target):
+    state = inspect(target)
+    count_appointments(connection, [(*[_before(state, field) for field in COUNTED_FIELDS], -1)])
@@ -1,7 +1,10 @@
-from sqlalchemy import Column, String, Integer, Enum, Text, Float, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Integer, Enum, Text, Float, LargeBinary, event, inspect
+from sqlalchemy.orm import relationship, deferred
 from app.db.database import Base
 from app.db.models.appointment import Appointment
+from app.db.models.availability import DoctorSlot
+from app.db.models.search import index_names
+from app.db.models.stats import DoctorDailyStats  # registers the table and its Appointment listeners
 import enum
 
 
@@ -26,7 +29,10 @@ class User(Base):
     district = Column(String(50), nullable=True)
     thana = Column(String(50), nullable=True)
 
-    profile_image = Column(LargeBinary, nullable=True)
+    # SHA-256 of the image in the blob store (see app.core.storage)
+    profile_image_key = Column(String(64), nullable=True)
+    # Legacy inline image; emptied by app.db.migrate_profile_images
+    profile_image = deferred(Column(LargeBinary, nullable=True))
 
     # Doctor-specific fields
     license_number = Column(String(50), nullable=True)
@@ -36,3 +42,17 @@ class User(Base):
 
     patient_appointments = relationship("Appointment", foreign_keys="Appointment.patient_id", back_populates="patient")
     doctor_appointments = relationship("Appointment", foreign_keys="Appointment.doctor_id", back_populates="doctor")
+    # Structured form of available_timeslots, kept in sync on registration
+    slots = relationship("DoctorSlot", back_populates="doctor", cascade="all, delete-orphan")
+
+
+# Keep the name search index in step with full_name, in the same transaction.
+# Core bulk inserts bypass this; call index_names() for those rows yourself.
+@event.listens_for(User, "after_insert")
+def _index_new_name(mapper, connection, target):
+    index_names(connection, [(target.id, target.full_name)])
+
+@event.listens_for(User, "after_update")
+def _reindex_name(mapper, connection, target):
+    if inspect(target).attrs.full_name.history.has_changes():
+        index_names(connection, [(target.id, target.full_name)])
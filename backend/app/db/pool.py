@@ -0,0 +1,78 @@
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app.core.config import settings
+
+
+class PoolMetrics:
+    """Checkout wait times and timeouts for one engine's pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, waited: float, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self, pool) -> dict:
+        attempts = self.checkouts + self.timeouts
+        stats = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_ms_avg": round(self.wait_seconds_total / attempts * 1000, 3) if attempts else 0.0,
+            "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+        }
+        # Live gauges; only queue-based pools have a size/overflow
+        if isinstance(pool, QueuePool):
+            for name in ("size", "checkedout", "checkedin", "overflow"):
+                stats[name] = getattr(pool, name)()
+        return stats
+
+
+class TimedCheckoutMixin:
+    """Times how long callers wait for a pooled connection (pool.recreate() keeps the class)."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - started, timed_out=False)
+        return connection
+
+def instrumented(pool_class, metrics: PoolMetrics):
+    return type(f"Timed{pool_class.__name__}", (TimedCheckoutMixin, pool_class), {"metrics": metrics})
+
+
+def pool_options(url: str, pool_class, metrics: PoolMetrics) -> dict:
+    """create_engine() keyword arguments for the configured pool."""
+    options = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if make_url(url).get_backend_name() == "sqlite":
+        # SQLite picks a pool suited to file/memory databases; sizing doesn't apply
+        return options
+    options.update(
+        poolclass=instrumented(pool_class, metrics),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
@@ -0,0 +1,235 @@
+"""
+Statement monitoring: slow-query log, N+1 detection and query counting.
+
+Every statement executed through any Engine (the app's, the async engine's
+sync core, those made by tests and scripts) is timed. Within a *watch* --
+one per HTTP request (QueryWatchMiddleware) and one per Celery task --
+statements are also counted per shape, the SQL text with IN-lists
+collapsed, so that executions differing only in parameters count as one
+shape.
+
+- A statement slower than SLOW_QUERY_MS is logged with its parameters
+  (unless SLOW_QUERY_LOG_PARAMS is off) and the route or task that ran it.
+- When a watch ends, every shape run N_PLUS_ONE_THRESHOLD times or more is
+  logged as a likely N+1: a query in a loop that should be one query.
+- With QUERY_LOG_ORIGIN on, both also name the line of app code that issued
+  the statement, when it ran in the caller's thread (not for async routes'
+  ThreadedSession calls). That walks the stack on every statement, so it
+  is meant for development.
+
+record_queries() collects the statements run in a block, whichever thread
+runs them; the query_budget fixture in tests/conftest.py uses it to fail
+tests that exceed their budget.
+"""
+import contextlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Longest rendering of a statement's parameters in the slow-query log
+MAX_PARAMS_LENGTH = 500
+# Longest statement in log lines
+MAX_STATEMENT_LENGTH = 300
+# Route label of requests that match no route
+UNMATCHED = "unmatched"
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+# A run of two or more placeholders: IN-lists and multi-row VALUES
+_PLACEHOLDERS = re.compile(r"(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+))+")
+_SPACE = re.compile(r"\s+")
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement: str) -> str:
+    """``statement`` with whitespace normalized and placeholder lists collapsed to one ``?...``."""
+    return _PLACEHOLDERS.sub("?...", _SPACE.sub(" ", statement).strip())
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _format_params(parameters, executemany: bool) -> str:
+    if executemany:
+        return _shorten(f"{len(parameters)} parameter sets, first {parameters[0]!r}", MAX_PARAMS_LENGTH)
+    return _shorten(repr(parameters), MAX_PARAMS_LENGTH)
+
+def statement_origin() -> Optional[str]:
+    """``path:line in function`` of the innermost app frame outside this module, if any."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(APP_ROOT) and filename != _THIS_FILE:
+            return f"{os.path.relpath(filename, os.path.dirname(APP_ROOT))}:{frame.lineno} in {frame.name}"
+    return None
+
+
+class QueryWatch:
+    """Statements run within one request or task."""
+
+    def __init__(self, label: Union[str, Callable[[], str]]):
+        self._label = label
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes: Dict[str, int] = Counter()
+        self.origins: Dict[str, str] = {}  # shape -> first origin, with QUERY_LOG_ORIGIN
+
+    @property
+    def label(self) -> str:
+        # A request's route is only known once routed, so it may be computed late
+        return self._label() if callable(self._label) else self._label
+
+    def record(self, statement: str, seconds: float, origin: Optional[str]):
+        shape = statement_shape(statement)
+        self.statements += 1
+        self.seconds += seconds
+        self.shapes[shape] += 1
+        if origin and shape not in self.origins:
+            self.origins[shape] = origin
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes run at least ``threshold`` times, most repeated first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def report(self):
+        threshold = settings.N_PLUS_ONE_THRESHOLD
+        if threshold <= 0:
+            return
+        for shape, count in self.repeated(threshold):
+            origin = self.origins.get(shape)
+            logger.warning(
+                f"Possible N+1 in {self.label}: {count} x {_shorten(shape, MAX_STATEMENT_LENGTH)}"
+                + (f" (from {origin})" if origin else "")
+            )
+
+
+_current: ContextVar[Optional[QueryWatch]] = ContextVar("query_watch", default=None)
+
+def current_watch() -> Optional[QueryWatch]:
+    return _current.get()
+
+@contextlib.contextmanager
+def watch(label: Union[str, Callable[[], str]]) -> Iterator[QueryWatch]:
+    """
+    Watch the statements run in this context (and the threadpool calls made
+    from it, which run in a copy of it) until the block ends, then report
+    likely N+1s.
+    """
+    query_watch = QueryWatch(label)
+    token = _current.set(query_watch)
+    try:
+        yield query_watch
+    finally:
+        _current.reset(token)
+        query_watch.report()
+
+
+class QueryWatchMiddleware:
+    """
+    Watches each HTTP request's statements, labelled with its method and
+    route template. Plain ASGI, like MetricsMiddleware, which reads its
+    per-request statement counts from this watch.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # The route is only known once the router has matched it
+        with watch(lambda: f"{scope['method']} {route_template(scope)}"):
+            await self.app(scope, receive, send)
+
+def route_template(scope) -> str:
+    """The matched route's path template, left in the scope by the router, or "unmatched"."""
+    return getattr(scope.get("route"), "path", None) or UNMATCHED
+
+
+# ----------------------------------------------------------
+# Recording for tests and benchmarks
+
+class QueryRecord:
+    def __init__(self):
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.statements)
+
+    def add(self, statement: str):
+        with self._lock:
+            self.statements.append(statement)
+
+    def shapes(self) -> Dict[str, int]:
+        return Counter(statement_shape(statement) for statement in self.statements)
+
+    def describe(self) -> str:
+        return "\n".join(
+            f"  {count} x {_shorten(shape, MAX_STATEMENT_LENGTH)}" for shape, count in self.shapes().most_common()
+        )
+
+_recorders: List[QueryRecord] = []
+
+@contextlib.contextmanager
+def record_queries() -> Iterator[QueryRecord]:
+    """Every statement run by any engine in any thread until the block ends."""
+    record = QueryRecord()
+    _recorders.append(record)
+    try:
+        yield record
+    finally:
+        _recorders.remove(record)
+
+
+# ----------------------------------------------------------
+# Engine events
+
+def _started(conn):
+    conn.info.setdefault("query_log_started", []).append(time.perf_counter())
+
+def _finished(conn, statement: str, parameters, executemany: bool):
+    started = conn.info.get("query_log_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    query_watch = _current.get()
+    slow = 0 < settings.SLOW_QUERY_MS <= elapsed * 1000
+    origin = statement_origin() if settings.QUERY_LOG_ORIGIN and (slow or query_watch) else None
+    for record in list(_recorders):
+        record.add(statement)
+    if query_watch is not None:
+        query_watch.record(statement, elapsed, origin)
+    if slow:
+        where = query_watch.label if query_watch is not None else "no request or task"
+        params = f" | params {_format_params(parameters, executemany)}" if settings.SLOW_QUERY_LOG_PARAMS else ""
+        logger.warning(
+            f"Slow query ({elapsed * 1000:.1f} ms) in {where}: {_shorten(statement_shape(statement), MAX_STATEMENT_LENGTH)}"
+            + params + (f" (from {origin})" if origin else "")
+        )
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _started(conn)
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finished(conn, statement, parameters, executemany)
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and exception_context.statement is not None:
+        _finished(conn, exception_context.statement, exception_context.parameters,
+                  bool(exception_context.execution_context and exception_context.execution_context.executemany))
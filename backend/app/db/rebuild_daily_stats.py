@@ -0,0 +1,45 @@
+"""
+Recompute ``doctor_daily_stats`` from ``appointments``.
+
+Creates the table when it is missing, then rebuilds the counts of each doctor
+(or only the given ones), a batch of doctors per transaction. Use it to
+backfill, after Core bulk writes that bypassed the Appointment listeners, or
+to reprice revenue after consultation fees changed. Safe to rerun.
+
+    python -m app.db.rebuild_daily_stats
+    python -m app.db.rebuild_daily_stats --doctor 12 --doctor 15
+"""
+import argparse
+from sqlalchemy import select
+from app.db.database import engine
+from app.db.models.user import User
+from app.db.models.stats import DoctorDailyStats, rebuild_daily_stats
+
+BATCH_SIZE = 500
+
+def rebuild(bind=engine, doctor_ids=None) -> int:
+    """Returns the number of doctors rebuilt."""
+    DoctorDailyStats.__table__.create(bind=bind, checkfirst=True)
+    if doctor_ids is not None:
+        doctor_ids = list(doctor_ids)
+        with bind.begin() as conn:
+            rebuild_daily_stats(conn, doctor_ids)
+        return len(doctor_ids)
+    rebuilt, last_id = 0, 0
+    while True:
+        with bind.begin() as conn:
+            batch = conn.execute(
+                select(User.id).where(User.id > last_id, User.user_type == "doctor").order_by(User.id).limit(BATCH_SIZE)
+            ).scalars().all()
+            if batch:
+                rebuild_daily_stats(conn, batch)
+        if not batch:
+            return rebuilt
+        rebuilt += len(batch)
+        last_id = batch[-1]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctor", type=int, action="append", help="only rebuild this doctor (repeatable)")
+    args = parser.parse_args()
+    print(f"✅ Rebuilt daily stats for {rebuild(doctor_ids=args.doctor)} doctors")
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, validator
-from .user import UserBase
-from typing import Literal, Optional
-from datetime import datetime, timezone
+from .user import UserSummary
+from typing import List, Literal, Optional
+from datetime import date, datetime, timezone
 
 class AppointmentCreate(BaseModel):
     doctor_id: int
@@ -18,8 +18,8 @@ class AppointmentOut(BaseModel):  # ✅ Do NOT inherit from AppointmentCreate
     id: int
     patient_id: int
     doctor_id: int
-    doctor: Optional[UserBase]
-    patient: Optional[UserBase]
+    doctor: Optional[UserSummary]
+    patient: Optional[UserSummary]
     appointment_time: datetime
     notes: Optional[str] = None
     status: Literal["Pending", "Confirmed", "Cancelled", "Completed"]
@@ -27,5 +27,43 @@ class AppointmentOut(BaseModel):  # ✅ Do NOT inherit from AppointmentCreate
     class Config:
         orm_mode = True
 
+class AppointmentPage(BaseModel):
+    items: List[AppointmentOut]
+    next_cursor: Optional[str] = None
+
 class AppointmentStatusUpdate(BaseModel):
     status: Literal["Pending", "Confirmed", "Cancelled", "Completed"]
+
+StatusName = Literal["Pending", "Confirmed", "Cancelled", "Completed"]
+
+class StatsTotal(BaseModel):
+    status: StatusName
+    appointments: int
+    revenue: float
+
+class DayStats(StatsTotal):
+    day: date
+
+class DoctorStats(StatsTotal):
+    doctor_id: int
+
+class StatsDashboard(BaseModel):
+    date_from: date
+    date_to: date
+    totals: List[StatsTotal]  # per status over the range
+    days: List[DayStats]  # per day and status, over the doctors in scope
+    doctors: List[DoctorStats]  # per doctor and status, over the range
+
+class AppointmentImport(BaseModel):
+    """One appointment row of a bulk import; parties are matched by email and past times are allowed."""
+    # Looked up, not stored: an unknown address is reported as such, so full
+    # (and comparatively slow) email validation would add nothing
+    doctor_email: str
+    patient_email: str
+    appointment_time: datetime
+    status: StatusName = "Pending"
+    notes: Optional[str] = None
+
+    @validator("appointment_time")
+    def as_naive_utc(cls, v):
+        return v.astimezone(timezone.utc).replace(tzinfo=None) if v.tzinfo else v
@@ -0,0 +1,23 @@
+from datetime import datetime, time
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict
+
+class DoctorSlotOut(BaseModel):
+    weekday: int  # Monday is 0
+    start_time: time
+    end_time: time
+    capacity: int
+    model_config = ConfigDict(from_attributes=True)
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+    seats_left: int
+
+class DoctorFreeSlots(BaseModel):
+    id: int
+    full_name: str
+    division: Optional[str] = None
+    district: Optional[str] = None
+    consultation_fee: Optional[float] = None
+    slots: List[FreeSlot]
@@ -1,9 +1,10 @@
 import re
 import logging
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 from pydantic import (
     BaseModel,
     ConfigDict,
+    computed_field,
     EmailStr,
     constr,
     Field,
@@ -11,6 +12,8 @@ from pydantic import (
     model_validator
 )
 
+from app.utils.validators import parse_timeslots
+
 # Set up logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -23,7 +26,6 @@ class UserBase(BaseModel):
     division: Optional[str] = None
     district: Optional[str] = None
     thana: Optional[str] = None
-    profile_image: Optional[bytes] = None
 
     license_number: Optional[str] = Field(default=None, validate_default=True)
     experience_years: Optional[int] = Field(default=None, validate_default=True)
@@ -41,6 +43,12 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: constr(min_length=8)
 
+    @validator("available_timeslots")
+    def timeslots_must_parse(cls, v):
+        if v:
+            parse_timeslots(v)
+        return v
+
     @validator("password")
     def strong_password(cls, v):
         if not re.match(r'^(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*?&])', v):
@@ -65,11 +73,55 @@ class UserCreate(UserBase):
                 raise ValueError(f"The following fields are required for doctors: {', '.join(missing)}")
         return self
 
+class UserImport(UserCreate):
+    """
+    One user row of a bulk import (see app.db.bulk_import): a ``password``,
+    or the bcrypt ``hashed_password`` carried over from a previous system.
+    """
+    password: Optional[constr(min_length=8)] = None
+    hashed_password: Optional[str] = None
+
+    @model_validator(mode='after')
+    def needs_a_password(self):
+        if self.password is None and self.hashed_password is None:
+            raise ValueError("password or hashed_password is required")
+        return self
+
 class UserOut(UserBase):
     id: int
     user_type: str
+    profile_image_key: Optional[str] = Field(default=None, exclude=True)
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def avatar_url(self) -> Optional[str]:
+        # Versioned by content hash so the avatar response can be cached forever
+        if not self.profile_image_key:
+            return None
+        return f"/api/v1/users/{self.id}/avatar?v={self.profile_image_key[:12]}"
+
+class UserSummary(BaseModel):
+    """Lightweight view of a user embedded in other responses (no image, no doctor fields)."""
+    id: int
+    full_name: str
+    email: EmailStr
+    mobile_number: str
+    user_type: str
+    model_config = ConfigDict(from_attributes=True)
+
+class DoctorSearchHit(BaseModel):
+    id: int
+    full_name: str
+    division: Optional[str] = None
+    district: Optional[str] = None
+    consultation_fee: Optional[float] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class DoctorSearchPage(BaseModel):
+    items: List[DoctorSearchHit]
+    next_offset: Optional[int] = None
+
 class LoginSchema(BaseModel):
     email: EmailStr
     password: str
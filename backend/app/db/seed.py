@@ -1,6 +1,7 @@
 from app.db.database import SessionLocal
 from app.db.models.user import User
 from app.core.security import hash_password
+from app.db.crud.availability import build_slots
 from sqlalchemy.exc import IntegrityError
 
 def seed():
@@ -27,7 +28,8 @@ def seed():
             license_number="DOC-12345",
             experience_years=5,
             consultation_fee=500,
-            available_timeslots="10:00-11:00,11:00-12:00"
+            available_timeslots="10:00-11:00,11:00-12:00",
+            slots=build_slots("10:00-11:00,11:00-12:00")
         )
         db.add(doctor)
 
@@ -0,0 +1,32 @@
+"""
+Work deferred until a session commits.
+
+Caches over database rows are invalidated from flush-time mapper events, but
+only once the change is committed: dropping an entry at flush lets a
+concurrent request re-cache the old row before the commit. ``on_commit()``
+records the work in ``session.info``; it runs after the commit and is
+discarded on rollback.
+"""
+from typing import Callable, Dict, Hashable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+PENDING_KEY = "on_commit"
+
+def on_commit(session: Optional[Session], key: Hashable, action: Callable[[], None]):
+    """
+    Run ``action`` once ``session`` commits. Actions under the same ``key``
+    run once per commit. A None session (an object not in one) is ignored.
+    """
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, {})[key] = action
+
+@event.listens_for(Session, "after_commit")
+def _run_committed(session):
+    pending: Dict[Hashable, Callable[[], None]] = session.info.pop(PENDING_KEY, {})
+    for action in pending.values():
+        action()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
@@ -1,5 +1,11 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.api.v1 import router as api_router
+from app.api.v1.metrics import exposition as metrics_exposition
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.db.query_log import QueryWatchMiddleware
 from app.db.database import create_db_and_tables
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -22,8 +28,28 @@ app.add_middleware(
     allow_headers=["*"],      # or explicitly ["Authorization", "Content-Type"]
 )
 
+# Per-route latency, response size and SQL statement metrics, outermost so
+# the time spent in the other middleware counts too
+if settings.HTTP_METRICS:
+    app.add_middleware(MetricsMiddleware)
+# Slow-query attribution and N+1 detection per request, whether or not
+# metrics are on; outside MetricsMiddleware, which reads its counts
+app.add_middleware(QueryWatchMiddleware)
+
 # Add routes
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(metrics_exposition)
+
+
+# No pooled connection freed up within DB_POOL_TIMEOUT: shed the request
+# instead of letting the queue of waiting requests grow
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request, exc):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database is busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
 
 
 
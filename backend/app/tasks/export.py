@@ -0,0 +1,55 @@
+"""
+Appointment exports too large to stream over one HTTP response.
+
+export_appointments writes the same CSV / NDJSON / Parquet as the admin
+export endpoint to a file in EXPORT_DIR, reading through a server-side cursor
+EXPORT_BATCH_SIZE rows at a time. The file appears under its final name only
+once complete.
+"""
+import logging
+import os
+import uuid
+from datetime import date, datetime
+from typing import Optional
+from app.celery_app import celery
+from app.core.config import settings
+from app.db.crud.appointment import export_query
+from app.db.database import SessionLocal
+from app.db.models.appointment import AppointmentStatus
+from app.utils.export import get_encoder
+
+logger = logging.getLogger(__name__)
+
+@celery.task
+def export_appointments(format: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                        status: Optional[str] = None) -> dict:
+    encoder = get_encoder(format, settings.EXPORT_PARQUET_ROW_GROUP)
+    query = export_query(
+        date.fromisoformat(date_from) if date_from else None,
+        date.fromisoformat(date_to) if date_to else None,
+        AppointmentStatus(status) if status else None
+    )
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    name = f"appointments-{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.{encoder.extension}"
+    path = os.path.join(settings.EXPORT_DIR, name)
+    partial = path + ".part"
+
+    db = SessionLocal()
+    rows = 0
+    try:
+        with open(partial, "wb") as f:
+            f.write(encoder.begin())
+            result = db.execute(query.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+            for batch in result.partitions():
+                f.write(encoder.encode(batch))
+                rows += len(batch)
+            f.write(encoder.finish())
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        db.close()
+    logger.info(f"Exported {rows} appointments to {path}")
+    return {"path": path, "rows": rows}
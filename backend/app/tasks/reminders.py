@@ -1,31 +1,262 @@
+"""
+Appointment reminders, sent about REMINDER_LEAD_HOURS ahead.
+
+Beat runs send_appointment_reminders every REMINDER_INTERVAL_MINUTES. Each
+run picks up the confirmed appointments starting within the lead time that
+have not been reminded yet -- in steady state just those that entered the
+window since the previous run, plus late bookings and confirmations -- so
+sending is spread through the day. Work is fanned out as a chord of shards.
+
+Before sending, a shard claims each reminder in reminder_ledger; only the
+claimer sends it and records ``sent_at``. Overlapping runs, retried tasks and
+duplicate beats therefore skip reminders already claimed or sent. A claim
+without ``sent_at`` (failed send, crashed worker) lapses
+REMINDER_CLAIM_LEASE_MINUTES after it was made -- not after the run that
+queued the shard, which may have waited in the broker -- and is retried, at
+most REMINDER_MAX_ATTEMPTS times. Reminders the mail server refuses for good
+(5xx) are marked ``failed_at`` instead and never retried.
+"""
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Set, Tuple
+from celery import chord
+from sqlalchemy import and_, exists, insert, or_, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import aliased
 from app.celery_app import celery
-from app.core.mail import send_email
+from app.core.config import settings
+from app.core.mail import build_message, send_many
 from app.db.database import SessionLocal
-from app.db.models.appointment import Appointment
+from app.db.models.appointment import Appointment, AppointmentStatus, ReminderLedger
 from app.db.models.user import User
-from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+Doctor = aliased(User, name="doctor")
+Patient = aliased(User, name="patient")
+
+# A position in (appointment_time, id) order, the order reminders are read in
+Key = Tuple[datetime, int]
+
+def utcnow() -> datetime:
+    """The time claims are stamped and checked with."""
+    return datetime.utcnow()
+
+def _due(now: datetime):
+    """Confirmed, starting within the lead time, and not sent, refused or claimed by anyone else."""
+    ledger = ReminderLedger
+    return (
+        Appointment.status == AppointmentStatus.confirmed,
+        Appointment.appointment_time >= now,
+        Appointment.appointment_time < now + timedelta(hours=settings.REMINDER_LEAD_HOURS),
+        ~exists().where(
+            ledger.appointment_id == Appointment.id,
+            or_(
+                ledger.sent_at.isnot(None),
+                ledger.failed_at.isnot(None),
+                ledger.attempts >= settings.REMINDER_MAX_ATTEMPTS,
+                ledger.claimed_at >= _lease_cutoff(now)
+            )
+        )
+    )
+
+def _lease_cutoff(now: datetime) -> datetime:
+    return now - timedelta(minutes=settings.REMINDER_CLAIM_LEASE_MINUTES)
+
+def _after(key: Key):
+    return or_(
+        Appointment.appointment_time > key[0],
+        and_(Appointment.appointment_time == key[0], Appointment.id > key[1])
+    )
+
+def _until(key: Key):
+    return or_(
+        Appointment.appointment_time < key[0],
+        and_(Appointment.appointment_time == key[0], Appointment.id <= key[1])
+    )
+
+def reminder_chunks(db, now: datetime, chunk_size: int, after: Optional[Key] = None, until: Optional[Key] = None):
+    """
+    Due reminders (after ``after``, up to and including ``until``) with the
+    patient's email and doctor's name, in chunks of ``chunk_size`` rows. Each
+    chunk is one short keyset query, so no cursor or transaction stays open
+    while a chunk is being sent.
+    """
+    query = (
+        select(Appointment.id, Appointment.appointment_time, Patient.email, Doctor.full_name.label("doctor_name"))
+        .join(Patient, Appointment.patient_id == Patient.id)
+        .join(Doctor, Appointment.doctor_id == Doctor.id)
+        .where(*_due(now))
+        .order_by(Appointment.appointment_time, Appointment.id)
+        .limit(chunk_size)
+    )
+    if until:
+        query = query.where(_until(until))
+    while True:
+        page = query.where(_after(after)) if after else query
+        rows = db.execute(page).all()
+        db.rollback()  # end the read transaction before sending
+        if not rows:
+            return
+        yield rows
+        after = (rows[-1].appointment_time, rows[-1].id)
+
+def shard_bounds(db, now: datetime, shard_size: int) -> List[Tuple[Optional[Key], Key]]:
+    """
+    Split the due reminders into (after, until] key ranges of ``shard_size``
+    appointments. Reads only the (time, id) keys, off the
+    (status, appointment_time) index.
+    """
+    keys = db.execute(
+        select(Appointment.appointment_time, Appointment.id)
+        .where(*_due(now))
+        .order_by(Appointment.appointment_time, Appointment.id)
+    ).all()
+    db.rollback()
+    return [
+        (tuple(keys[start - 1]) if start else None, tuple(keys[min(start + shard_size, len(keys)) - 1]))
+        for start in range(0, len(keys), shard_size)
+    ]
+
+def _insert_ignore(db, table):
+    """INSERT that skips rows whose primary key already exists."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "mysql":
+        return mysql.insert(table).prefix_with("IGNORE")
+    return insert(table)
+
+def claim_reminders(db, appointment_ids: List[int]) -> Tuple[str, Set[int]]:
+    """
+    Claim the reminders of ``appointment_ids`` that nobody else holds: new
+    ledger rows, plus lapsed claims that have attempts left. Claims are
+    stamped with the current time, so the lease runs from the claim itself.
+    Returns the claim token and the ids claimed with it.
+    """
+    token = uuid.uuid4().hex
+    claimed_at = utcnow()
+    ledger = ReminderLedger.__table__
+    db.execute(_insert_ignore(db, ledger), [
+        {"appointment_id": appointment_id, "claim_token": token, "claimed_at": claimed_at, "attempts": 1}
+        for appointment_id in appointment_ids
+    ])
+    db.execute(
+        update(ledger)
+        .where(
+            ledger.c.appointment_id.in_(appointment_ids),
+            ledger.c.claim_token != token,
+            ledger.c.sent_at.is_(None),
+            ledger.c.failed_at.is_(None),
+            ledger.c.attempts < settings.REMINDER_MAX_ATTEMPTS,
+            ledger.c.claimed_at < _lease_cutoff(claimed_at)
+        )
+        .values(claim_token=token, claimed_at=claimed_at, attempts=ledger.c.attempts + 1)
+    )
+    claimed = set(db.scalars(
+        select(ledger.c.appointment_id).where(ledger.c.appointment_id.in_(appointment_ids), ledger.c.claim_token == token)
+    ))
+    db.commit()
+    return token, claimed
+
+def mark_sent(db, token: str, delivered: List[int], refused: List[int], now: datetime):
+    """Record the delivered reminders as sent and the refused ones as failed for good."""
+    ledger = ReminderLedger.__table__
+    for appointment_ids, values in ((delivered, {"sent_at": now}), (refused, {"failed_at": now})):
+        if appointment_ids:
+            db.execute(
+                update(ledger)
+                .where(ledger.c.appointment_id.in_(appointment_ids), ledger.c.claim_token == token)
+                .values(**values)
+            )
+    db.commit()
+
+def send_reminder_chunk(rows) -> Tuple[List[int], List[int]]:
+    """
+    Send one chunk as a single mail batch; returns the ids of the appointments
+    reminded and of those the mail server refused for good.
+    """
+    messages = [
+        (row.id, build_message(
+            to=row.email,
+            subject="🔔 Appointment Reminder",
+            body=f"Reminder: Appointment with Dr. {row.doctor_name} at {row.appointment_time}"
+        ))
+        for row in rows
+    ]
+    report = send_many(message for _, message in messages)
+    for recipient, error in report.failed:
+        logger.warning(f"Reminder to {recipient} failed: {error!r}")
+    delivered = {id(message) for message in report.delivered}
+    refused = {id(message) for message in report.refused}
+    return (
+        [appointment_id for appointment_id, message in messages if id(message) in delivered],
+        [appointment_id for appointment_id, message in messages if id(message) in refused],
+    )
+
+# Keys travel through the broker as [isoformat, id]
+def _encode_key(key: Optional[Key]):
+    return [key[0].isoformat(), key[1]] if key else None
+
+def _decode_key(value) -> Optional[Key]:
+    return (datetime.fromisoformat(value[0]), value[1]) if value else None
 
 @celery.task
-def send_appointment_reminders():
+def send_reminder_shard(shard: int, now: str, after, until) -> dict:
     db = SessionLocal()
     try:
-        tomorrow = datetime.utcnow() + timedelta(days=1)
-        appointments = db.query(Appointment).filter(
-            Appointment.appointment_time.between(
-                tomorrow.replace(hour=0, minute=0),
-                tomorrow.replace(hour=23, minute=59)
-            ),
-            Appointment.status == "Confirmed"
-        ).all()
-
-        for appt in appointments:
-            patient = db.query(User).filter(User.id == appt.patient_id).first()
-            doctor = db.query(User).filter(User.id == appt.doctor_id).first()
-            if patient:
-                send_email(
-                    to=patient.email,
-                    subject="🔔 Appointment Reminder",
-                    body=f"Reminder: Appointment with Dr. {doctor.full_name} at {appt.appointment_time}"
-                )
+        run_at = datetime.fromisoformat(now)
+        sent = failed = skipped = 0
+        chunks = reminder_chunks(db, run_at, settings.REMINDER_CHUNK_SIZE,
+                                 after=_decode_key(after), until=_decode_key(until))
+        for rows in chunks:
+            token, claimed = claim_reminders(db, [row.id for row in rows])
+            skipped += len(rows) - len(claimed)
+            rows = [row for row in rows if row.id in claimed]
+            if not rows:
+                continue
+            delivered, refused = send_reminder_chunk(rows)
+            mark_sent(db, token, delivered, refused, utcnow())
+            sent += len(delivered)
+            failed += len(rows) - len(delivered)
+        logger.info(f"Reminder shard {shard}: {sent} sent, {failed} failed, {skipped} claimed elsewhere")
+        return {"shard": shard, "sent": sent, "failed": failed, "skipped": skipped}
     finally:
         db.close()
+
+@celery.task
+def summarize_reminder_shards(results: List[dict]) -> dict:
+    summary = {"shards": len(results)}
+    for field in ("sent", "failed", "skipped"):
+        summary[field] = sum(result[field] for result in results)
+    logger.info(f"Appointment reminders done: {summary}")
+    return summary
+
+def dispatch_reminders(now: datetime):
+    """
+    Fan the reminders due at ``now`` out as one send_reminder_shard task per
+    shard, joined by a chord whose callback totals their counts. Returns the
+    chord's result, or None if there is nothing to send.
+    """
+    db = SessionLocal()
+    try:
+        bounds = shard_bounds(db, now, settings.REMINDER_SHARD_SIZE)
+    finally:
+        db.close()
+    if not bounds:
+        logger.info("No appointment reminders due")
+        return None
+    header = [
+        send_reminder_shard.s(shard, now.isoformat(), _encode_key(after), _encode_key(until))
+        for shard, (after, until) in enumerate(bounds)
+    ]
+    return chord(header)(summarize_reminder_shards.s())
+
+# Coordinator, scheduled by beat: it only finds the due work, the shards send
+@celery.task
+def send_appointment_reminders():
+    result = dispatch_reminders(utcnow())
+    return {"result_id": result.id if result is not None else None}
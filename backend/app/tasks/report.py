@@ -1,50 +1,73 @@
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime
+from sqlalchemy import and_, func, select
 from sqlalchemy.orm import Session
 from app.db.database import SessionLocal
-from app.db.models.appointment import Appointment
-from app.db.models.user import User
-from app.core.mail import send_email
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.db.models.user import User, UserType
+from app.core.mail import build_message, send_many
 from app.celery_app import celery
 
-@celery.task
-def generate_monthly_doctor_report():
-    db: Session = SessionLocal()
-    try:
-        now = datetime.utcnow()
-        first_day = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        last_day = now
+logger = logging.getLogger(__name__)
 
-        # Get all doctors
-        doctors = db.query(User).filter(User.user_type == "doctor").all()
+# Rows fetched from the report query at a time
+BATCH_SIZE = 500
 
-        for doctor in doctors:
-            appointments = db.query(Appointment).filter(
-                Appointment.doctor_id == doctor.id,
-                Appointment.appointment_time >= first_day,
-                Appointment.appointment_time <= last_day,
-                Appointment.status.in_(["Confirmed", "Completed"])
-            ).all()
+BILLABLE = (AppointmentStatus.confirmed, AppointmentStatus.completed)
 
-            total_visits = len(appointments)
-            total_earned = sum(a.consultation_fee or 0 for a in appointments)
-            patient_ids = set(a.patient_id for a in appointments)
+def doctor_report_query(start: datetime, end: datetime):
+    """
+    One row per doctor with their billable appointments between ``start``
+    and ``end``: visits, distinct patients, and earnings at the doctor's
+    consultation fee. Doctors without appointments get zeros. Each doctor's
+    appointments are read off the (doctor_id, appointment_time) index.
+    """
+    visits = func.count(Appointment.id)
+    return (
+        select(
+            User.id, User.full_name, User.email,
+            visits.label("visits"),
+            func.count(Appointment.patient_id.distinct()).label("patients"),
+            (visits * func.coalesce(User.consultation_fee, 0)).label("earned")
+        )
+        .outerjoin(Appointment, and_(
+            Appointment.doctor_id == User.id,
+            Appointment.appointment_time >= start,
+            Appointment.appointment_time <= end,
+            Appointment.status.in_(BILLABLE)
+        ))
+        .where(User.user_type == UserType.doctor)
+        .group_by(User.id)
+        .order_by(User.id)
+    )
 
-            report_text = f"""
-📅 Monthly Report for Dr. {doctor.full_name}
+def render_report(row, generated: datetime) -> str:
+    return f"""
+📅 Monthly Report for Dr. {row.full_name}
 ──────────────────────────────────────────────
-🧍 Total Patients Seen: {len(patient_ids)}
-📋 Total Appointments : {total_visits}
-💰 Total Earnings     : BDT {total_earned:.2f}
+🧍 Total Patients Seen: {row.patients}
+📋 Total Appointments : {row.visits}
+💰 Total Earnings     : BDT {row.earned:.2f}
 ──────────────────────────────────────────────
-Generated on: {now.strftime('%Y-%m-%d')}
+Generated on: {generated.strftime('%Y-%m-%d')}
 """
 
-            # Send report via email
-            send_email(
-                to=doctor.email,
-                subject="📊 Your Monthly Appointment Report",
-                body=report_text
-            )
+@celery.task
+def generate_monthly_doctor_report():
+    db: Session = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        first_day = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
+        # Rows are rendered and handed to the mailer as they stream in
+        rows = db.execute(doctor_report_query(first_day, now).execution_options(yield_per=BATCH_SIZE))
+        report = send_many(
+            build_message(to=row.email, subject="📊 Your Monthly Appointment Report", body=render_report(row, now))
+            for row in rows
+        )
+        for recipient, error in report.failed:
+            logger.warning(f"Monthly report to {recipient} failed: {error!r}")
+        logger.info(f"Monthly doctor reports: {report.sent} sent, {len(report.failed)} failed")
+        return {"sent": report.sent, "failed": len(report.failed)}
     finally:
         db.close()
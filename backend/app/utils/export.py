@@ -0,0 +1,151 @@
+"""
+Incremental encoders for appointment exports.
+
+Each encoder turns batches of export rows (see
+app.db.crud.appointment.export_query) into bytes as they arrive, so an export
+of any size is written with constant memory: ``begin()``, then ``encode()``
+per batch, then ``finish()``. Parquet needs the optional ``pyarrow`` package;
+rows are buffered up to one row group at a time.
+"""
+import csv
+import io
+import json
+from typing import List
+
+EXPORT_COLUMNS = ["id", "appointment_time", "status", "doctor_id", "doctor_name", "patient_id", "patient_name", "notes"]
+
+
+def _text_values(row) -> list:
+    return [
+        row.id, row.appointment_time.isoformat(), row.status.value, row.doctor_id, row.doctor_name,
+        row.patient_id, row.patient_name, row.notes
+    ]
+
+
+class CSVEncoder:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def begin(self) -> bytes:
+        return self._lines([EXPORT_COLUMNS])
+
+    def encode(self, rows) -> bytes:
+        return self._lines(_text_values(row) for row in rows)
+
+    def finish(self) -> bytes:
+        return b""
+
+    @staticmethod
+    def _lines(records) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(records)
+        return buffer.getvalue().encode()
+
+
+class NDJSONEncoder:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def begin(self) -> bytes:
+        return b""
+
+    def encode(self, rows) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, _text_values(row))), ensure_ascii=False) + "\n" for row in rows
+        ).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+class _ChunkSink:
+    """
+    Write target for the Parquet writer that hands out what was written so
+    far, while reporting the absolute position the writer records offsets by.
+    """
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class ParquetEncoder:
+    """Writes a row group every ``row_group_size`` rows; ``finish()`` flushes the rest and the footer."""
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, row_group_size: int):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.row_group_size = row_group_size
+        self.schema = pa.schema([
+            ("id", pa.int64()), ("appointment_time", pa.timestamp("us")), ("status", pa.string()),
+            ("doctor_id", pa.int64()), ("doctor_name", pa.string()),
+            ("patient_id", pa.int64()), ("patient_name", pa.string()), ("notes", pa.string()),
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self.schema)
+        self._pending: List[tuple] = []
+
+    def begin(self) -> bytes:
+        return self._sink.drain()
+
+    def encode(self, rows) -> bytes:
+        for row in rows:
+            self._pending.append((
+                row.id, row.appointment_time, row.status.value, row.doctor_id, row.doctor_name,
+                row.patient_id, row.patient_name, row.notes
+            ))
+            if len(self._pending) >= self.row_group_size:
+                self._write_group()
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        if self._pending:
+            self._write_group()
+        self._writer.close()
+        return self._sink.drain()
+
+    def _write_group(self):
+        columns = list(zip(*self._pending))
+        self._writer.write_table(self.pa.Table.from_arrays(
+            [self.pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema
+        ), row_group_size=self.row_group_size)
+        self._pending = []
+
+
+FORMATS = ("csv", "ndjson", "parquet")
+
+def get_encoder(format: str, parquet_row_group: int = 100000):
+    """Raises ValueError for an unknown format and ImportError if Parquet support is missing."""
+    if format == "csv":
+        return CSVEncoder()
+    if format == "ndjson":
+        return NDJSONEncoder()
+    if format == "parquet":
+        return ParquetEncoder(parquet_row_group)
+    raise ValueError(f"Unknown export format: {format}")
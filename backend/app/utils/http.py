@@ -0,0 +1,47 @@
+from typing import Optional, Tuple
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an ``If-None-Match`` header value matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in if_none_match.split(","))
+
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``Range: bytes=...`` header into an inclusive ``(start, end)``.
+
+    Returns None when the header is absent, malformed or asks for several ranges
+    (callers then send the whole body). Raises ValueError if the range cannot be
+    satisfied for a body of ``size`` bytes.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+
+    first, last = spec.split("-", 1)
+    if not (first == "" or first.isdigit()) or not (last == "" or last.isdigit()):
+        return None
+
+    if first == "":
+        # Suffix range: the last N bytes
+        if last == "":
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    if end < start:
+        return None
+    return start, min(end, size - 1)
@@ -0,0 +1,53 @@
+import re
+from datetime import datetime, time, timedelta
+from typing import List, Tuple
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+# A bare start time ("10:00") stands for a slot of this length
+DEFAULT_SLOT_MINUTES = 60
+
+_SLOT_PATTERN = re.compile(
+    r"^(?:(?P<day>[A-Za-z]{3})\s+)?(?P<start>\d{1,2}:\d{2})(?:\s*-\s*(?P<end>\d{1,2}:\d{2}))?$"
+)
+
+def _parse_time(value: str) -> time:
+    return datetime.strptime(value, "%H:%M").time()
+
+def parse_timeslots(value: str) -> List[Tuple[int, time, time]]:
+    """
+    Parse a doctor's ``available_timeslots`` text into ``(weekday, start, end)`` tuples.
+
+    Entries are comma separated: ``"10:00-11:00"``, a bare start time ``"10:00"``
+    (a DEFAULT_SLOT_MINUTES slot) or either form prefixed with a day, e.g.
+    ``"Mon 10:00-11:00"``. Entries without a day apply to every weekday.
+    Weekdays follow ``datetime.weekday()`` (Monday is 0).
+    """
+    slots = []
+    for entry in value.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        match = _SLOT_PATTERN.match(entry)
+        if not match:
+            raise ValueError(f"Invalid timeslot '{entry}', expected e.g. '10:00-11:00' or 'Mon 10:00-11:00'")
+        try:
+            start = _parse_time(match["start"])
+            if match["end"]:
+                end = _parse_time(match["end"])
+            else:
+                end_dt = datetime.combine(datetime.min, start) + timedelta(minutes=DEFAULT_SLOT_MINUTES)
+                end = end_dt.time() if end_dt.date() == datetime.min.date() else time(23, 59)
+        except ValueError:
+            raise ValueError(f"Invalid time in timeslot '{entry}'")
+        if end <= start:
+            raise ValueError(f"Timeslot '{entry}' must end after it starts")
+
+        if match["day"]:
+            day = match["day"].lower()
+            if day not in WEEKDAYS:
+                raise ValueError(f"Invalid weekday in timeslot '{entry}'")
+            weekdays = [WEEKDAYS.index(day)]
+        else:
+            weekdays = range(7)
+        slots.extend((weekday, start, end) for weekday in weekdays)
+    return slots
@@ -0,0 +1,136 @@
+"""
+Many patients racing for the same single-seat slot.
+
+Drives the app in-process (httpx + ASGI transport) against a throwaway SQLite
+database: one doctor with one Monday 10:00-11:00 slot, then --bookings
+patients all POST a booking for that slot at once (at most --concurrency in
+flight). Every request carries an Idempotency-Key and is sent twice, as a
+client retrying after a lost response would. Prints the outcome counts,
+throughput and latency, and checks that exactly one appointment exists.
+
+    cd backend && DATABASE_URL=sqlite:// BLOB_STORE=memory python -m benchmarks.booking_contention --bookings 2000
+
+DATABASE_URL only has to be importable; requests go to the throwaway database.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.db.database import Base, get_db
+from app.db.models.user import User
+from app.db.models.appointment import Appointment
+from app.db.crud.availability import build_slots
+from app.core.config import settings
+from app.core.security import create_access_token
+
+from benchmarks.stats import percentile
+
+# 2030-01-07 is a Monday
+SLOT_TIME = "2030-01-07T10:00:00"
+
+
+def seed(SessionLocal, bookings):
+    db = SessionLocal()
+    doctor = User(full_name="Contended Doctor", email="doctor@example.com", mobile_number="+8801900000000",
+                  hashed_password="x", user_type="doctor", available_timeslots="Mon 10:00-11:00",
+                  slots=build_slots("Mon 10:00-11:00"))
+    db.add(doctor)
+    db.commit()
+    db.execute(insert(User), [
+        {"full_name": f"Patient {i}", "email": f"patient{i}@example.com", "mobile_number": f"+88{i:011d}",
+         "hashed_password": "x", "user_type": "patient"}
+        for i in range(bookings)
+    ])
+    db.commit()
+    patient_ids = [user_id for (user_id,) in db.query(User.id).filter(User.user_type == "patient")]
+    doctor_id = doctor.id
+    db.close()
+    return doctor_id, patient_ids
+
+
+async def book(client, limit, doctor_id, patient_id, latencies):
+    headers = {
+        "Authorization": f"Bearer {create_access_token(data={'user_id': patient_id})}",
+        "Idempotency-Key": f"bench-{patient_id}",
+    }
+    outcomes = []
+    async with limit:
+        for _ in range(2):  # original request + retry
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/v1/appointment/appointments",
+                json={"doctor_id": doctor_id, "appointment_time": SLOT_TIME},
+                headers=headers
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            replayed = "replayed" if response.headers.get("Idempotent-Replayed") else "fresh"
+            outcomes.append(f"{response.status_code} {replayed}")
+    return outcomes
+
+
+async def run(doctor_id, patient_ids, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(book(client, limit, doctor_id, pid, latencies) for pid in patient_ids))
+        elapsed = time.perf_counter() - started
+
+    counts = Counter(outcome for outcomes in results for outcome in outcomes)
+    for outcome, count in sorted(counts.items()):
+        print(f"{outcome:>14}: {count}")
+    print(f"{len(latencies)} requests in {elapsed:.2f} s ({len(latencies) / elapsed:.0f} req/s)  "
+          f"p50={statistics.median(latencies):.2f} ms  p99={percentile(latencies, 99):.2f} ms")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Same pool capacity as the app's engine, which DB_THREADED_SESSIONS is sized to
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                               connect_args={"check_same_thread": False},
+                               pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW)
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        doctor_id, patient_ids = seed(SessionLocal, args.bookings)
+        counts = asyncio.run(run(doctor_id, patient_ids, args.concurrency))
+
+        db = SessionLocal()
+        booked = db.query(Appointment).count()
+        db.close()
+        engine.dispose()
+
+    print(f"appointments stored: {booked}")
+    if booked != 1 or counts["200 fresh"] != 1:
+        raise SystemExit("❌ expected exactly one winner")
+    print("✅ exactly one winner")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Latency of the multi-doctor free-slot search.
+
+Seeds a throwaway SQLite database with --doctors doctors, each taking hourly
+appointments 09:00-17:00 every day, and books --booked of the slot instances
+over the next --days days. It then times GET /api/v1/users/users/doctors/free-slots
+for the whole range (all doctors with the default per_doctor, one division,
+and all doctors with every open slot) and prints p50/p99, next
+to the in-memory seats computation alone and the whole search without HTTP
+(the endpoint figures include decoding the response). The first request
+builds the slot index and is not timed.
+
+    cd backend && DATABASE_URL=sqlite:// BLOB_STORE=memory python -m benchmarks.free_slot_search --doctors 500
+
+DATABASE_URL only has to be importable; requests go to the throwaway database.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.db.database import Base, ThreadedSession, get_db
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.crud.availability import find_free_slots, seats_left
+from app.core.slot_index import SlotIndex
+from app.utils.validators import parse_timeslots
+
+from benchmarks.stats import percentile
+
+DIVISIONS = ["Dhaka", "Chattogram", "Khulna", "Rajshahi", "Sylhet", "Barishal", "Rangpur", "Mymensingh"]
+TIMESLOTS = "09:00,10:00,11:00,12:00,14:00,15:00,16:00,17:00"
+
+
+def seed(SessionLocal, doctors, days, booked):
+    rng = random.Random(7)
+    db = SessionLocal()
+    db.execute(insert(User), [
+        {"full_name": f"Doctor {i}", "email": f"doctor{i}@example.com", "mobile_number": f"+88{i:011d}",
+         "hashed_password": "x", "user_type": "doctor", "division": DIVISIONS[i % len(DIVISIONS)],
+         "consultation_fee": 500 + 100 * (i % 10), "available_timeslots": TIMESLOTS}
+        for i in range(doctors)
+    ])
+    db.execute(insert(User).values(full_name="Patient", email="patient@example.com", mobile_number="+8809999999999",
+                                   hashed_password="x", user_type="patient"))
+    doctor_ids = [user_id for (user_id,) in db.query(User.id).filter(User.user_type == "doctor")]
+    patient_id = db.query(User.id).filter(User.user_type == "patient").scalar()
+
+    template = parse_timeslots(TIMESLOTS)
+    db.execute(insert(DoctorSlot), [
+        {"doctor_id": doctor_id, "weekday": weekday, "start_time": start, "end_time": end, "capacity": 1}
+        for doctor_id in doctor_ids for weekday, start, end in template
+    ])
+
+    # Book a random share of the slot instances (one seat each) from tomorrow on
+    first_day = date.today() + timedelta(days=1)
+    instances = [
+        (doctor_id, datetime.combine(first_day + timedelta(days=day), start))
+        for doctor_id in doctor_ids for day in range(days - 1) for weekday, start, end in template
+        if weekday == (first_day + timedelta(days=day)).weekday()
+    ]
+    chosen = rng.sample(instances, int(len(instances) * booked))
+    db.execute(insert(Appointment), [
+        {"patient_id": patient_id, "doctor_id": doctor_id, "appointment_time": slot_start}
+        for doctor_id, slot_start in chosen
+    ])
+    appointment_ids = [appointment_id for (appointment_id,) in db.query(Appointment.id).order_by(Appointment.id)]
+    db.execute(insert(SlotClaim), [
+        {"doctor_id": doctor_id, "slot_start": slot_start, "seat": 0, "appointment_id": appointment_id}
+        for (doctor_id, slot_start), appointment_id in zip(chosen, appointment_ids)
+    ])
+    db.commit()
+    db.close()
+    return len(chosen)
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label, samples):
+    print(f"{label:>26}: p50={statistics.median(samples):7.2f} ms  p99={percentile(samples, 99):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--booked", type=float, default=0.3, help="share of slot instances already booked")
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        booked = seed(SessionLocal, args.doctors, args.days, args.booked)
+        print(f"{args.doctors} doctors, {args.days} days, {booked} booked slot instances")
+
+        with TestClient(app) as client:
+            def search(**params):
+                response = client.get("/api/v1/users/users/doctors/free-slots", params={"days": args.days, **params})
+                response.raise_for_status()
+                return response.json()
+
+            found = search(per_doctor=500)
+            print(f"open slots in range: {sum(len(doctor['slots']) for doctor in found)}")
+            report("all doctors", timed(search, args.runs))
+            report("one division", timed(lambda: search(division="Dhaka"), args.runs))
+            report("all doctors, every slot", timed(lambda: search(per_doctor=500), args.runs))
+
+        db = SessionLocal()
+        index = SlotIndex(db.query(DoctorSlot).all(), version=None)
+        claims = db.query(SlotClaim.doctor_id, SlotClaim.slot_start).all()
+        doctor_ids = [doctor_id for (doctor_id,) in db.query(User.id).filter(User.user_type == "doctor")]
+        rows = np.arange(len(index.key))
+        report("seats matrix only", timed(lambda: seats_left(index, rows, claims, date.today(), args.days), args.runs))
+        search_only = lambda: asyncio.run(
+            find_free_slots(ThreadedSession(db), doctor_ids, date.today(), args.days, datetime.now(), per_doctor=10)
+        )
+        report("find_free_slots (no HTTP)", timed(search_only, args.runs))
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
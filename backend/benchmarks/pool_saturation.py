@@ -0,0 +1,125 @@
+"""
+Drive the API past connection pool capacity and check that waiting is bounded.
+
+Fires --concurrency simultaneous GET /api/v1/appointment/appointments requests
+at the app (in-process) backed by a small, instrumented QueuePool. Every
+statement is slowed by --statement-ms to stand in for network round trips, so
+requests pile up waiting for connections. Requests either succeed or get a 503
+once they have waited --pool-timeout seconds; none hang. Prints latency
+percentiles, status counts and the pool metrics.
+
+    cd backend && DATABASE_URL=sqlite:// python -m benchmarks.pool_saturation --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.main import app
+from app.db.database import Base, get_db
+from app.db.models.appointment import Appointment
+from app.db.models.user import User
+from app.db.pool import PoolMetrics, instrumented
+from app.core.security import create_access_token
+
+from benchmarks.stats import percentile
+
+
+def seed(SessionLocal):
+    db = SessionLocal()
+    doctor = User(full_name="Bench Doctor", email="doctor@example.com", mobile_number="+8801000000001",
+                  hashed_password="x", user_type="doctor")
+    patient = User(full_name="Bench Patient", email="patient@example.com", mobile_number="+8801000000002",
+                   hashed_password="x", user_type="patient")
+    db.add_all([doctor, patient])
+    db.flush()
+    start = datetime(2030, 1, 1, 9, 0)
+    db.add_all(
+        Appointment(doctor_id=doctor.id, patient_id=patient.id, appointment_time=start + timedelta(hours=i))
+        for i in range(100)
+    )
+    db.commit()
+    doctor_id = doctor.id
+    db.close()
+    return doctor_id
+
+
+async def run(concurrency, headers):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        # Warm the principal cache so each request needs a single checkout
+        await client.get("/api/v1/appointment/appointments", headers=headers)
+
+        async def one():
+            started = time.perf_counter()
+            response = await client.get("/api/v1/appointment/appointments", headers=headers)
+            return response.status_code, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--max-overflow", type=int, default=2)
+    parser.add_argument("--pool-timeout", type=float, default=0.5)
+    parser.add_argument("--statement-ms", type=float, default=20)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics = PoolMetrics()
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            poolclass=instrumented(QueuePool, metrics),
+            pool_size=args.pool_size,
+            max_overflow=args.max_overflow,
+            pool_timeout=args.pool_timeout,
+            connect_args={"check_same_thread": False},
+        )
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        doctor_id = seed(SessionLocal)
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def simulate_latency(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(args.statement_ms / 1000)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        headers = {"Authorization": f"Bearer {create_access_token(data={'user_id': doctor_id})}"}
+        results, elapsed = asyncio.run(run(args.concurrency, headers))
+
+        latencies = [ms for _, ms in results]
+        statuses = [status for status, _ in results]
+        print(f"requests: {len(results)} in {elapsed:.2f}s  "
+              f"({statuses.count(200)} ok, {statuses.count(503)} shed with 503, "
+              f"{len(results) - statuses.count(200) - statuses.count(503)} other)")
+        print(f"latency: p50={statistics.median(latencies):.1f} ms  p99={percentile(latencies, 99):.1f} ms  "
+              f"max={max(latencies):.1f} ms")
+        print("pool:", json.dumps(metrics.snapshot(engine.pool)))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Latency of an unrelated endpoint while registrations hash passwords.
+
+Drives the app in-process (httpx + ASGI transport, single event loop) against a
+throwaway SQLite database. It first measures GET /api/v1/users/test alone, then
+again while a burst of registrations is in flight, and prints p50/p99 for both.
+With hashing on the password pool the two p99 values stay close; with bcrypt
+on the event loop the second one grows by roughly a hash time per registration.
+
+    cd backend && DATABASE_URL=sqlite:// python -m benchmarks.registration_burst --registrations 40
+
+DATABASE_URL only has to be importable; requests go to the throwaway database.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.db.database import Base, get_db
+
+from benchmarks.stats import percentile
+
+
+async def probe(client, stop_at, latencies):
+    while time.perf_counter() < stop_at:
+        started = time.perf_counter()
+        response = await client.get("/api/v1/users/test")
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def register(client, index):
+    user = {
+        "full_name": f"Bench User {index}",
+        "email": f"bench{index}@example.com",
+        "mobile_number": f"+88{index:011d}",
+        "password": "Bench@12345",
+        "user_type": "patient",
+    }
+    return await client.post("/api/v1/users/register", data={"data": json.dumps(user)})
+
+
+async def run(registrations, duration):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle = []
+        await probe(client, time.perf_counter() + duration, idle)
+
+        loaded = []
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            probe(client, started + duration, loaded),
+            *(register(client, i) for i in range(registrations)),
+        )
+        statuses = [response.status_code for response in results[1:]]
+
+    for label, samples in (("idle", idle), ("during burst", loaded)):
+        print(f"{label:>13}: n={len(samples):5d}  p50={statistics.median(samples):7.2f} ms  "
+              f"p99={percentile(samples, 99):7.2f} ms")
+    print(f"registrations: {statuses.count(200)} ok, {statuses.count(503)} rejected (503)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registrations", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds to probe in each phase")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        asyncio.run(run(args.registrations, args.duration))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Reminder throughput against a local SMTP stand-in.
+
+Seeds a throwaway SQLite database with confirmed appointments spread over
+the next REMINDER_LEAD_HOURS, starts a minimal SMTP server on localhost
+(accepts everything, stores nothing) and runs one reminder pass, shards
+executed eagerly in this process. Prints messages per second,
+SMTP connections opened and SQL statements issued. ``--baseline`` also times the
+previous per-appointment loop (two user lookups and a new SMTP connection
+per message) on the first N appointments for comparison.
+
+    cd backend && DATABASE_URL=sqlite:// python -m benchmarks.reminder_throughput --appointments 100000
+
+DATABASE_URL only has to be importable; the task runs on the throwaway database.
+"""
+import argparse
+import logging
+import os
+import smtplib
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.celery_app import celery
+from app.core.config import settings
+from app.db.database import Base
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.tasks import reminders
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: every command succeeds, DATA is discarded."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.sessions = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.sessions += 1
+        self.reply("220 localhost stand-in")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.reply("250-localhost\r\n250 8BITMIME")
+            elif command == b"DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.messages += 1
+                self.reply("250 OK")
+            elif command == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def seed(engine, now, appointments, doctors=200, patients=20000):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"full_name": f"User {i}", "email": f"user{i}@example.com", "mobile_number": f"+88{i:011d}",
+             "hashed_password": "x", "user_type": "doctor" if i < doctors else "patient"}
+            for i in range(doctors + patients)
+        ])
+        step = settings.REMINDER_LEAD_HOURS * 3600 / appointments
+        conn.execute(insert(Appointment), [
+            {"doctor_id": 1 + i % doctors, "patient_id": 1 + doctors + i % patients,
+             "appointment_time": now + timedelta(seconds=int(i * step)),
+             "status": AppointmentStatus.confirmed}
+            for i in range(appointments)
+        ])
+
+
+def legacy_reminders(SessionLocal, limit):
+    # The loop this pipeline replaced, for comparison: a connection per message
+    db = SessionLocal()
+    try:
+        appointments = db.query(Appointment).filter(Appointment.status == "Confirmed").limit(limit).all()
+        for appt in appointments:
+            patient = db.query(User).filter(User.id == appt.patient_id).first()
+            doctor = db.query(User).filter(User.id == appt.doctor_id).first()
+            msg = MIMEText(f"Reminder: Appointment with Dr. {doctor.full_name} at {appt.appointment_time}")
+            msg["Subject"] = "🔔 Appointment Reminder"
+            msg["From"] = settings.EMAIL_FROM
+            msg["To"] = patient.email
+            with smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT) as server:
+                server.sendmail(settings.EMAIL_FROM, patient.email, msg.as_string())
+        return len(appointments)
+    finally:
+        db.close()
+
+
+def measure(label, engine, server, fn):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    sessions, messages = server.sessions, server.messages
+    started = time.perf_counter()
+    try:
+        sent = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", listener)
+    print(f"{label:>9}: {sent:7d} reminders in {elapsed:7.2f} s  ({sent / elapsed:8.0f} msg/s)  "
+          f"smtp sessions={server.sessions - sessions}  delivered={server.messages - messages}  "
+          f"sql statements={len(statements)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=settings.REMINDER_CHUNK_SIZE)
+    parser.add_argument("--baseline", type=int, default=0, metavar="N",
+                        help="also time the per-appointment loop on N appointments")
+    args = parser.parse_args()
+    logging.getLogger("app.tasks.reminders").setLevel(logging.WARNING)
+
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.SMTP_SERVER, settings.SMTP_PORT = server.server_address
+    settings.SMTP_SECURITY, settings.EMAIL_PASSWORD = "none", None
+    settings.EMAIL_FROM = "reminders@example.com"
+    settings.REMINDER_CHUNK_SIZE = args.chunk_size
+    settings.MAIL_BACKEND = "smtp"
+    celery.conf.task_always_eager = True
+    now = datetime.utcnow()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        seed(engine, now, args.appointments)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        reminders.SessionLocal = SessionLocal
+
+        measure("pipeline", engine, server, lambda: reminders.dispatch_reminders(now).get()["sent"])
+        if args.baseline:
+            measure("baseline", engine, server, lambda: legacy_reminders(SessionLocal, args.baseline))
+        engine.dispose()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""Summary statistics shared by the benchmarks."""
+
+
+def percentile(samples, pct):
+    """Nearest-rank ``pct`` percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,430 @@
+"""
+End-to-end load benchmark of the API and the Celery tasks on synthetic data.
+
+Fills a throwaway SQLite database (or --database-url) with the population
+from benchmarks.synthetic, then drives the app in-process (httpx + ASGI
+transport) endpoint by endpoint: --requests requests each, at most
+--concurrency in flight, after --warmup untimed ones. The report, reminder
+and export tasks run --task-runs times each, in this process with Celery in
+eager mode. Every endpoint and task gets its throughput and p50/p95/p99/max
+latency; failed requests (any non-2xx) are counted, not timed separately.
+On SQLite, which takes one writer at a time, booking and status updates are
+sent one by one; use a server database for concurrent write numbers.
+
+--output writes the results as JSON, with the data size, parameters, git
+commit and library versions, and --compare prints the change against such
+a file from an earlier run; --max-regression makes it exit non-zero when a
+p95 grew by more than that many percent. Run both versions with the same
+arguments and seed: the data is then identical.
+
+    cd backend && DATABASE_URL=sqlite:// BLOB_STORE=memory python -m benchmarks.suite --output main.json
+    cd backend && DATABASE_URL=sqlite:// BLOB_STORE=memory python -m benchmarks.suite --compare main.json
+
+DATABASE_URL only has to be importable; requests go to the benchmark database.
+Pass --no-generate with --database-url to reuse data already loaded there.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from unittest import mock
+
+import httpx
+import sqlalchemy
+from sqlalchemy import create_engine, delete, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.main import app
+from app.celery_app import celery
+from app.core.config import settings
+from app.core.directory_cache import get_directory_cache
+from app.core.mail import MemoryBackend, set_mail_backend
+from app.core.principal import get_principal_cache
+from app.core.security import create_access_token
+from app.core.slot_index import clear_slot_index
+from app.db.database import get_db
+from app.db.models.appointment import Appointment, AppointmentStatus, ReminderLedger
+from app.db.models.availability import DoctorSlot
+from app.db.models.user import User, UserType
+from app.tasks import export, reminders, report
+
+from benchmarks import synthetic
+from benchmarks.stats import percentile
+
+# Version of the results file layout
+RESULTS_FORMAT = 1
+
+API = "/api/v1"
+
+
+class Workload:
+    """Who and what the requests pick from, loaded from the benchmark database."""
+
+    def __init__(self, db, rng: random.Random):
+        self.rng = rng
+        self.today = date.today()
+        self.admin_id = db.scalar(select(User.id).where(User.user_type == UserType.admin).order_by(User.id))
+        self.doctors = db.execute(
+            select(User.id, User.full_name, User.division).where(User.user_type == UserType.doctor).order_by(User.id)
+        ).all()
+        self.patient_ids = list(db.scalars(select(User.id).where(User.user_type == UserType.patient)))
+        self.divisions = sorted({doctor.division for doctor in self.doctors if doctor.division})
+
+        # Upcoming appointments for doctors to confirm
+        self.pending = db.execute(
+            select(Appointment.id, Appointment.doctor_id).where(
+                Appointment.status == AppointmentStatus.pending, Appointment.appointment_time > datetime.now()
+            )
+        ).all()
+        rng.shuffle(self.pending)
+
+        # Free seats to book: every slot in the two weeks after the last appointment
+        last = db.scalar(select(func.max(Appointment.appointment_time)))
+        first_day = max(self.today, last.date() if last else self.today) + timedelta(days=1)
+        slots = db.execute(select(DoctorSlot.doctor_id, DoctorSlot.weekday, DoctorSlot.start_time,
+                                  DoctorSlot.capacity)).all()
+        self.openings = [
+            (slot.doctor_id, datetime.combine(day, slot.start_time).isoformat())
+            for day in (first_day + timedelta(days=n) for n in range(14))
+            for slot in slots if slot.weekday == day.weekday() for _ in range(slot.capacity)
+        ]
+        rng.shuffle(self.openings)
+        self._tokens: Dict[int, dict] = {}
+
+    def auth(self, user_id: int) -> dict:
+        if user_id not in self._tokens:
+            self._tokens[user_id] = {"Authorization": f"Bearer {create_access_token(data={'user_id': user_id})}"}
+        return self._tokens[user_id]
+
+    def patient(self) -> int:
+        return self.rng.choice(self.patient_ids)
+
+    def doctor(self) -> int:
+        # Doctors come in order of popularity (see benchmarks.synthetic)
+        return self.doctors[min(int(self.rng.expovariate(1 / 10)), len(self.doctors) - 1)].id
+
+    def name_fragment(self) -> str:
+        word = self.rng.choice(self.rng.choice(self.doctors).full_name.split()[1:])
+        return word[:self.rng.randint(3, len(word))]
+
+
+# A request: (method, path, httpx keyword arguments)
+Request = Tuple[str, str, dict]
+
+
+class Endpoint(NamedTuple):
+    name: str
+    make: Callable[[Workload], Request]
+    # Fraction of --requests to send, for the expensive ones
+    share: float = 1.0
+    writes: bool = False
+
+
+def _book(w: Workload) -> Request:
+    doctor_id, at = w.openings.pop()
+    return "POST", f"{API}/appointment/appointments", {
+        "json": {"doctor_id": doctor_id, "appointment_time": at}, "headers": w.auth(w.patient())
+    }
+
+def _confirm(w: Workload) -> Request:
+    appointment_id, doctor_id = w.pending.pop()
+    return "PATCH", f"{API}/appointment/appointments/{appointment_id}/status", {
+        "json": {"status": "Confirmed"}, "headers": w.auth(doctor_id)
+    }
+
+ENDPOINTS = [
+    Endpoint("auth.login", lambda w: ("POST", f"{API}/auth/login", {
+        "json": {"email": f"patient{w.rng.randrange(len(w.patient_ids))}@example.com",
+                 "password": synthetic.PASSWORD}
+    }), share=0.1),
+    Endpoint("users.me", lambda w: ("GET", f"{API}/users/users/me", {"headers": w.auth(w.patient())})),
+    Endpoint("doctors.directory", lambda w: ("GET", f"{API}/users/users/doctors", {})),
+    Endpoint("doctors.search", lambda w: ("GET", f"{API}/users/users/doctors/search", {
+        "params": {"q": w.name_fragment()}
+    })),
+    Endpoint("doctors.slots", lambda w: ("GET", f"{API}/users/users/doctors/{w.doctor()}/slots", {})),
+    Endpoint("doctors.free_slots", lambda w: ("GET", f"{API}/users/users/doctors/free-slots", {
+        "params": {"division": w.rng.choice(w.divisions)} if w.divisions else {}
+    }), share=0.25),
+    Endpoint("appointments.book", _book, writes=True),
+    Endpoint("appointments.update_status", _confirm, writes=True),
+    Endpoint("appointments.list_patient", lambda w: ("GET", f"{API}/appointment/appointments", {
+        "headers": w.auth(w.patient())
+    })),
+    Endpoint("appointments.list_doctor", lambda w: ("GET", f"{API}/appointment/appointments", {
+        "headers": w.auth(w.doctor())
+    })),
+    Endpoint("appointments.list_admin", lambda w: ("GET", f"{API}/appointment/appointments", {
+        "params": {"status": "Completed", "date_from": (w.today - timedelta(days=30)).isoformat()},
+        "headers": w.auth(w.admin_id)
+    })),
+    Endpoint("appointments.stats", lambda w: ("GET", f"{API}/appointment/appointments/stats", {
+        "headers": w.auth(w.admin_id)
+    })),
+    Endpoint("appointments.export", lambda w: ("GET", f"{API}/appointment/appointments/export", {
+        "params": {"format": "csv", "date_from": (w.today - timedelta(days=7)).isoformat()},
+        "headers": w.auth(w.admin_id)
+    }), share=0.1),
+]
+
+
+def summarize(latencies: List[float], elapsed: float, failed: int = 0, items: Optional[int] = None) -> dict:
+    """Latencies in ms and wall time in s of one endpoint or task, as stored in the results."""
+    result = {
+        "count": len(latencies),
+        "failed": failed,
+        "seconds": round(elapsed, 4),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+    }
+    if items is not None:
+        result["items"] = items
+        result["items_per_s"] = round(items / elapsed, 2) if elapsed else None
+    return result
+
+
+async def drive(client, requests: List[Request], concurrency: int):
+    """Send ``requests``, at most ``concurrency`` at a time; (latencies in ms, status counts, wall time)."""
+    limit = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], Counter()
+
+    async def one(method, path, kwargs):
+        async with limit:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def run_endpoints(workload: Workload, requests: int, concurrency: int, warmup: int,
+                        serial_writes: bool = False, only: Optional[List[str]] = None) -> dict:
+    results = {}
+    # Unhandled errors become 500s and count as failed, as they would behind a server
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for endpoint in ENDPOINTS:
+            if only and endpoint.name not in only:
+                continue
+            count = max(1, int(requests * endpoint.share))
+            try:
+                batch = [endpoint.make(workload) for _ in range(warmup + count)]
+            except IndexError:
+                print(f"{endpoint.name:>30}: skipped, not enough data")
+                continue
+            parallel = 1 if endpoint.writes and serial_writes else concurrency
+            await drive(client, batch[:warmup], parallel)
+            latencies, statuses, elapsed = await drive(client, batch[warmup:], parallel)
+            failed = sum(n for code, n in statuses.items() if not 200 <= code < 300)
+            results[endpoint.name] = {
+                **summarize(latencies, elapsed, failed), "concurrency": parallel,
+                "statuses": {str(code): n for code, n in statuses.items()}
+            }
+            print_result(endpoint.name, results[endpoint.name])
+    return results
+
+
+# (name, setup before each run (untimed), run -> number of items handled)
+def _reset_reminders(SessionLocal):
+    with SessionLocal() as db:
+        db.execute(delete(ReminderLedger))
+        db.commit()
+
+def _remind():
+    result = reminders.dispatch_reminders(datetime.utcnow())
+    return result.get()["sent"] if result is not None else 0
+
+def _export(today: date):
+    result = export.export_appointments("csv", date_from=(today - timedelta(days=30)).isoformat())
+    os.remove(result["path"])
+    return result["rows"]
+
+def run_tasks(SessionLocal, runs: int, only: Optional[List[str]] = None) -> dict:
+    today = date.today()
+    tasks = [
+        ("report.monthly", lambda: set_mail_backend(MemoryBackend()),
+         lambda: report.generate_monthly_doctor_report()["sent"]),
+        ("reminders.dispatch", lambda: (set_mail_backend(MemoryBackend()), _reset_reminders(SessionLocal)),
+         _remind),
+        ("export.csv", lambda: None, lambda: _export(today)),
+    ]
+    results = {}
+    for name, setup, run in tasks:
+        if only and name not in only:
+            continue
+        latencies, items, elapsed = [], 0, 0.0
+        for _ in range(runs):
+            setup()
+            started = time.perf_counter()
+            items += run()
+            latencies.append((time.perf_counter() - started) * 1000)
+            elapsed += latencies[-1] / 1000
+        results[name] = summarize(latencies, elapsed, items=items)
+        print_result(name, results[name])
+    return results
+
+
+@contextlib.contextmanager
+def attached(SessionLocal, export_dir: str):
+    """Point the app and the task modules at the benchmark database for the duration."""
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(app.dependency_overrides, {get_db: override_get_db}))
+        for module in (export, reminders, report):
+            stack.enter_context(mock.patch.object(module, "SessionLocal", SessionLocal))
+        stack.enter_context(mock.patch.object(settings, "EXPORT_DIR", export_dir))
+        stack.callback(setattr, celery.conf, "task_always_eager", celery.conf.task_always_eager)
+        celery.conf.task_always_eager = True
+        stack.callback(set_mail_backend, None)
+        # Nothing cached from (or for) another database
+        for clear in (get_principal_cache().clear, get_directory_cache().clear, clear_slot_index):
+            clear()
+            stack.callback(clear)
+        yield
+
+
+def run_suite(engine, requests: int = 200, concurrency: int = 16, warmup: int = 5, task_runs: int = 3,
+              seed: int = 7, only: Optional[List[str]] = None) -> dict:
+    """Benchmark the app and tasks against the data in ``engine``; the results document."""
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    started_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    with SessionLocal() as db:
+        workload = Workload(db, random.Random(seed))
+        data = {
+            "doctors": len(workload.doctors), "patients": len(workload.patient_ids),
+            "appointments": db.scalar(select(func.count(Appointment.id))),
+        }
+    with tempfile.TemporaryDirectory() as export_dir, attached(SessionLocal, export_dir):
+        # SQLite has a single writer, and concurrent deferred transactions
+        # deadlock until the busy timeout: one write request at a time there
+        endpoints = asyncio.run(run_endpoints(workload, requests, concurrency, warmup,
+                                              serial_writes=engine.dialect.name == "sqlite", only=only))
+        tasks = run_tasks(SessionLocal, task_runs, only)
+    return {
+        "format": RESULTS_FORMAT,
+        "meta": {
+            "started_at": started_at,
+            "git_commit": _git_commit(),
+            "app_version": app.version,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "data": data,
+            "params": {"requests": requests, "concurrency": concurrency, "warmup": warmup,
+                       "task_runs": task_runs, "seed": seed},
+        },
+        "endpoints": endpoints,
+        "tasks": tasks,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(name: str, result: dict):
+    extra = f"  items/s={result['items_per_s']:9.1f}" if "items" in result else ""
+    print(f"{name:>30}: n={result['count']:5d}  {result['throughput']:8.1f}/s  p50={result['p50_ms']:8.2f} ms  "
+          f"p95={result['p95_ms']:8.2f} ms  p99={result['p99_ms']:8.2f} ms  failed={result['failed']}{extra}")
+
+
+def compare(baseline: dict, current: dict) -> Dict[str, float]:
+    """Print the change from ``baseline`` per endpoint and task; returns the p95 change in percent by name."""
+    changes = {}
+    print(f"\nagainst {baseline['meta'].get('git_commit') or 'baseline'} "
+          f"({baseline['meta'].get('started_at')}):")
+    for section in ("endpoints", "tasks"):
+        for name, new in current[section].items():
+            old = baseline.get(section, {}).get(name)
+            if old is None:
+                continue
+            delta = lambda field: (new[field] - old[field]) / old[field] * 100 if old[field] else 0.0
+            changes[name] = delta("p95_ms")
+            print(f"{name:>30}: p50 {old['p50_ms']:8.2f} -> {new['p50_ms']:8.2f} ms ({delta('p50_ms'):+6.1f}%)  "
+                  f"p95 {old['p95_ms']:8.2f} -> {new['p95_ms']:8.2f} ms ({changes[name]:+6.1f}%)  "
+                  f"throughput {delta('throughput'):+6.1f}%")
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--no-generate", action="store_true", help="use the data already in --database-url")
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--appointments", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--task-runs", type=int, default=3)
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="endpoints and tasks to run, e.g. appointments.book")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="RESULTS", help="results file of an earlier run to compare with")
+    parser.add_argument("--max-regression", type=float, metavar="PCT",
+                        help="with --compare, fail if any p95 grew by more than PCT percent")
+    args = parser.parse_args()
+    if args.no_generate and not args.database_url:
+        parser.error("--no-generate needs --database-url")
+    for name in ("httpx", "celery", "app"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # Same pool capacity as the app's engine, which DB_THREADED_SESSIONS is sized to
+        engine = create_engine(url, pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+                               **({"connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {}))
+        if not args.no_generate:
+            started = time.perf_counter()
+            counts = synthetic.generate(engine, args.doctors, args.patients, args.appointments, seed=args.seed)
+            print(f"{counts['doctors']} doctors, {counts['patients']} patients, {counts['appointments']} "
+                  f"appointments generated in {time.perf_counter() - started:.1f} s")
+        results = run_suite(engine, args.requests, args.concurrency, args.warmup, args.task_runs,
+                            seed=args.seed, only=args.only)
+        engine.dispose()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            changes = compare(json.load(f), results)
+        if args.max_regression is not None:
+            regressed = [name for name, change in changes.items() if change > args.max_regression]
+            if regressed:
+                sys.exit(f"❌ p95 regressed by more than {args.max_regression}%: {', '.join(regressed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Deterministic synthetic clinic data for benchmarks.
+
+Fills a database with --doctors doctors, --patients patients, one admin and
+about --appointments appointments. The same --seed always gives the same
+rows, so runs against different versions of the code see identical data.
+
+The shape follows what a real clinic network looks like rather than a
+uniform spread:
+
+- doctors are spread over divisions by population (Dhaka has the most), work
+  four to six days a week in a morning or evening block of hourly slots with
+  two to eight seats, and charge 300-2000 BDT;
+- a few doctors get most of the bookings (Zipf-like popularity) and patient
+  activity is long-tailed (a few regulars, many one-off visitors);
+- most appointments lie in the past --past-days days, the rest are booked
+  a few days ahead (exponential lead time, --future-share of all);
+- past appointments are mostly Completed, upcoming ones Pending or
+  Confirmed, and some of either are Cancelled.
+
+Every appointment sits in one of its doctor's slots and no slot is booked
+past its capacity; non-cancelled appointments hold their seat in
+slot_claims, as if booked through the API. Name search entries and the
+daily stats rollup are filled in too. Everyone's password is PASSWORD.
+
+    cd backend && python -m benchmarks.synthetic --database-url sqlite:///bench.db --appointments 1000000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+from datetime import date, datetime, time as clock, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, func, insert, select
+
+from app.core.directory_cache import get_directory_cache
+from app.core.security import hash_password
+from app.core.slot_index import clear_slot_index
+from app.db.database import Base
+from app.db.models.appointment import Appointment, AppointmentStatus, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.models.search import index_names
+from app.db.models.stats import rebuild_daily_stats
+from app.db.models.user import User
+from app.utils.validators import WEEKDAYS
+
+PASSWORD = "Bench@12345"
+BATCH_SIZE = 10000
+
+# (division, share of the population, districts)
+DIVISIONS = [
+    ("Dhaka", 0.26, ["Dhaka", "Gazipur", "Narayanganj", "Tangail"]),
+    ("Chattogram", 0.20, ["Chattogram", "Cox's Bazar", "Cumilla", "Noakhali"]),
+    ("Rajshahi", 0.12, ["Rajshahi", "Bogura", "Pabna"]),
+    ("Khulna", 0.11, ["Khulna", "Jashore", "Kushtia"]),
+    ("Rangpur", 0.10, ["Rangpur", "Dinajpur"]),
+    ("Mymensingh", 0.07, ["Mymensingh", "Jamalpur"]),
+    ("Sylhet", 0.07, ["Sylhet", "Moulvibazar"]),
+    ("Barishal", 0.07, ["Barishal", "Patuakhali"]),
+]
+FIRST_NAMES = [
+    "Abdul", "Afsana", "Aminul", "Anika", "Arif", "Ayesha", "Farhana", "Fatema", "Habib", "Hasan",
+    "Imran", "Jahid", "Kamal", "Karim", "Laila", "Mahmud", "Masud", "Mim", "Nadia", "Nasrin",
+    "Nusrat", "Rafiq", "Rahim", "Rina", "Sabina", "Saiful", "Shakil", "Sharmin", "Sumon", "Tania",
+]
+LAST_NAMES = [
+    "Ahmed", "Akter", "Alam", "Begum", "Biswas", "Chowdhury", "Das", "Hossain", "Islam", "Kabir",
+    "Khan", "Mahmud", "Miah", "Mondal", "Rahman", "Roy", "Sarkar", "Sheikh", "Sultana", "Uddin",
+]
+NOTES = ["Follow-up", "First visit", "Bring previous reports", "Fasting blood test", "Referred by GP"]
+
+# (fee in BDT, weight)
+FEES = [(300, 2), (500, 6), (700, 5), (800, 4), (1000, 4), (1200, 2), (1500, 2), (2000, 1)]
+# (first hour, hours): morning or evening chambers
+BLOCKS = [(9, 4), (10, 3), (17, 4), (18, 3)]
+# (seats per hourly slot, weight): about 15 minutes per patient
+CAPACITIES = [(2, 2), (4, 5), (6, 2), (8, 1)]
+
+PAST_STATUSES = [
+    (AppointmentStatus.completed, 70), (AppointmentStatus.cancelled, 15),
+    (AppointmentStatus.confirmed, 10), (AppointmentStatus.pending, 5),
+]
+FUTURE_STATUSES = [
+    (AppointmentStatus.pending, 45), (AppointmentStatus.confirmed, 45), (AppointmentStatus.cancelled, 10),
+]
+
+
+def _pick(rng: random.Random, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+def _cumulative(weights) -> List[float]:
+    total, cumulative = 0.0, []
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    return cumulative
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+def _insert_numbered(conn, table, rows) -> List[int]:
+    """
+    Insert ``rows`` with ids numbered on from the table's highest, returning
+    them. (RETURNING with executemany would insert one row per statement on
+    SQLite.)
+    """
+    first = (conn.execute(select(func.max(table.id))).scalar() or 0) + 1
+    ids = list(range(first, first + len(rows)))
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(table), [
+            {**row, "id": row_id} for row, row_id in zip(rows[start:start + BATCH_SIZE], ids[start:])
+        ])
+    if conn.dialect.name == "postgresql" and ids:
+        # Explicit ids leave the serial sequence behind
+        conn.execute(select(func.setval(func.pg_get_serial_sequence(table.__tablename__, "id"), ids[-1])))
+    return ids
+
+def _users(rng: random.Random, doctors: int, patients: int, hashed: str):
+    division_weights = _cumulative(share for _, share, _ in DIVISIONS)
+    admin = {"full_name": "Bench Admin", "email": "admin@example.com", "mobile_number": "+8801000000000",
+             "hashed_password": hashed, "user_type": "admin"}
+    doctor_rows, schedules = [], []
+    for i in range(doctors):
+        division, _, districts = rng.choices(DIVISIONS, cum_weights=division_weights)[0]
+        first_hour, hours = rng.choice(BLOCKS)
+        # Friday is the usual day off
+        weekdays = sorted(rng.sample([0, 1, 2, 3, 5, 6], rng.randint(4, 6)))
+        capacity = _pick(rng, CAPACITIES)
+        slots = [(weekday, first_hour + h) for weekday in weekdays for h in range(hours)]
+        doctor_rows.append({
+            "full_name": f"Dr. {_name(rng)}", "email": f"doctor{i}@example.com",
+            "mobile_number": f"+8801{300000000 + i:09d}", "hashed_password": hashed, "user_type": "doctor",
+            "division": division, "district": rng.choice(districts),
+            "license_number": f"BMDC-{10000 + i}", "experience_years": rng.randint(1, 35),
+            "consultation_fee": _pick(rng, FEES),
+            "available_timeslots": ",".join(
+                f"{WEEKDAYS[weekday].title()} {hour:02d}:00-{hour + 1:02d}:00" for weekday, hour in slots
+            ),
+        })
+        schedules.append((slots, capacity))
+    patient_rows = []
+    for i in range(patients):
+        division, _, districts = rng.choices(DIVISIONS, cum_weights=division_weights)[0]
+        patient_rows.append({
+            "full_name": _name(rng), "email": f"patient{i}@example.com",
+            "mobile_number": f"+8801{700000000 + i:09d}", "hashed_password": hashed, "user_type": "patient",
+            "division": division, "district": rng.choice(districts),
+        })
+    return admin, doctor_rows, schedules, patient_rows
+
+
+def _appointments(rng: random.Random, doctor_ids, schedules, patient_ids, count: int, today: date,
+                  past_days: int, future_share: float):
+    """
+    (appointment rows, [(doctor_id, slot_start, seat) or None per row]).
+    An appointment that finds no free seat after a few tries is dropped, so
+    too few doctors for ``count`` give fewer appointments; a doctor sees a
+    few thousand patients a year.
+    """
+    doctor_weights = _cumulative(1 / (rank + 1) ** 0.9 for rank in range(len(doctor_ids)))
+    patient_weights = _cumulative(rng.paretovariate(1.5) for _ in patient_ids)
+    by_weekday = [
+        {weekday: [hour for day, hour in slots if day == weekday] for weekday, _ in slots}
+        for slots, _ in schedules
+    ]
+    seats: Dict[tuple, int] = Counter()
+    rows, claims = [], []
+    doctors = range(len(doctor_ids))
+    for _ in range(count):
+        future = rng.random() < future_share
+        # A fully booked doctor sends the patient to another one
+        for _attempt in range(10):
+            doctor = rng.choices(doctors, cum_weights=doctor_weights)[0]
+            capacity = schedules[doctor][1]
+            if future:
+                offset = 1 + min(int(rng.expovariate(1 / 5)), 60)
+            else:
+                offset = -rng.randint(1, past_days)
+            day = today + timedelta(days=offset)
+            hours = by_weekday[doctor].get(day.weekday())
+            if not hours:
+                continue
+            slot_start = datetime.combine(day, clock(rng.choice(hours)))
+            status = _pick(rng, FUTURE_STATUSES if future else PAST_STATUSES)
+            key = (doctor, slot_start)
+            if status != AppointmentStatus.cancelled and seats[key] >= capacity:
+                continue
+            rows.append({
+                "doctor_id": doctor_ids[doctor],
+                "patient_id": rng.choices(patient_ids, cum_weights=patient_weights)[0],
+                "appointment_time": slot_start + timedelta(minutes=rng.choice([0, 15, 30, 45])),
+                "status": status,
+                "notes": rng.choice(NOTES) if rng.random() < 0.2 else None,
+            })
+            if status == AppointmentStatus.cancelled:
+                claims.append(None)
+            else:
+                claims.append((doctor_ids[doctor], slot_start, seats[key]))
+                seats[key] += 1
+            break
+    return rows, claims
+
+
+def generate(bind, doctors: int, patients: int, appointments: int, seed: int = 7,
+             today: Optional[date] = None, past_days: int = 365, future_share: float = 0.1) -> dict:
+    """
+    Create the tables on ``bind`` if needed and add the synthetic population
+    to it. Returns the number of users and appointments added.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    Base.metadata.create_all(bind=bind)
+    admin, doctor_rows, schedules, patient_rows = _users(rng, doctors, patients, hash_password(PASSWORD))
+
+    with bind.begin() as conn:
+        _insert_numbered(conn, User, [admin])
+        doctor_ids = _insert_numbered(conn, User, doctor_rows)
+        patient_ids = _insert_numbered(conn, User, patient_rows)
+        for start in range(0, len(doctor_rows) + len(patient_rows), BATCH_SIZE):
+            index_names(conn, list(zip(doctor_ids + patient_ids, [
+                row["full_name"] for row in doctor_rows + patient_rows
+            ]))[start:start + BATCH_SIZE])
+        conn.execute(insert(DoctorSlot), [
+            {"doctor_id": doctor_id, "weekday": weekday, "start_time": clock(hour), "end_time": clock(hour + 1),
+             "capacity": capacity}
+            for doctor_id, (slots, capacity) in zip(doctor_ids, schedules) for weekday, hour in slots
+        ])
+
+    rows, claims = _appointments(rng, doctor_ids, schedules, patient_ids, appointments, today,
+                                 past_days, future_share)
+    with bind.begin() as conn:
+        appointment_ids = _insert_numbered(conn, Appointment, rows)
+        claim_rows = [
+            {"doctor_id": claim[0], "slot_start": claim[1], "seat": claim[2], "appointment_id": appointment_id}
+            for appointment_id, claim in zip(appointment_ids, claims) if claim is not None
+        ]
+        for start in range(0, len(claim_rows), BATCH_SIZE):
+            conn.execute(insert(SlotClaim), claim_rows[start:start + BATCH_SIZE])
+        rebuild_daily_stats(conn)
+
+    get_directory_cache().bump()
+    clear_slot_index()
+    return {"doctors": len(doctor_ids), "patients": len(patient_ids), "appointments": len(appointment_ids)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=20000)
+    parser.add_argument("--appointments", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--past-days", type=int, default=365)
+    parser.add_argument("--future-share", type=float, default=0.1)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    started = time.perf_counter()
+    counts = generate(engine, args.doctors, args.patients, args.appointments, seed=args.seed,
+                      past_days=args.past_days, future_share=args.future_share)
+    engine.dispose()
+    print(f"✅ {counts['doctors']} doctors, {counts['patients']} patients, {counts['appointments']} appointments "
+          f"in {time.perf_counter() - started:.1f} s (password: {PASSWORD})")
+
+
+if __name__ == "__main__":
+    main()
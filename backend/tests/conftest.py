@@ -0,0 +1,148 @@
+"""
+Shared fixtures: the test database and query budgets.
+
+``db_session`` creates the tables in ./test.db, points the app's get_db at
+that database and yields a session on it; ``engine`` and ``session_factory``
+are the same database for tests that set it up themselves. ``make_user``
+adds users and ``auth_headers`` authenticates requests as one.
+
+Query budgets (app.db.query_log.record_queries): a test fails when it, or a
+block within it, runs more SQL statements than its budget, listing the
+statements it ran:
+
+    @pytest.mark.query_budget(3)
+    def test_listing(...): ...
+
+    def test_booking(query_budget):
+        with query_budget(4):
+            client.post(...)
+
+Statements are counted across threads, so requests made through TestClient
+count. The marker covers the whole test call, fixtures excluded.
+"""
+import contextlib
+import itertools
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.db.database import Base, get_db
+from app.db.models.user import User
+from app.db.query_log import record_queries
+from app.core.directory_cache import get_directory_cache
+from app.core.idempotency import get_idempotency_store
+from app.core.metrics import get_http_metrics
+from app.core.principal import get_principal_cache
+from app.core.security import create_access_token
+from app.core.slot_index import clear_slot_index
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+
+# ----------------------------------------------------------
+# Test database
+
+@pytest.fixture(scope="session")
+def engine():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
+
+@pytest.fixture(scope="session")
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _reset_app_state():
+    # Ids are reused once the tables are recreated, so nothing keyed by them may outlive a test
+    get_principal_cache().clear()
+    get_directory_cache().clear()
+    get_idempotency_store().clear()
+    get_http_metrics().clear()
+    clear_slot_index()
+
+@pytest.fixture(scope="function")
+def db_session(engine, session_factory):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    _reset_app_state()
+    db = session_factory()
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+    _reset_app_state()
+
+@pytest.fixture
+def make_user(db_session):
+    """
+    ``make_user(user_type="patient", **fields)`` adds and commits a user.
+    Email and mobile number are unique per call unless given; the name
+    defaults to the email's local part.
+    """
+    numbers = itertools.count(1)
+
+    def make(user_type: str = "patient", **fields) -> User:
+        n = next(numbers)
+        fields.setdefault("email", f"user{n}@example.com")
+        fields.setdefault("mobile_number", f"+88{n:011d}")
+        fields.setdefault("full_name", fields["email"].split("@")[0].title())
+        fields.setdefault("hashed_password", "x")
+        user = User(user_type=user_type, **fields)
+        db_session.add(user)
+        db_session.commit()
+        return user
+    return make
+
+@pytest.fixture
+def auth_headers():
+    """``auth_headers(user_or_id, **extra)``: request headers carrying a token for the user."""
+    def headers(user, **extra) -> dict:
+        token = create_access_token(data={"user_id": getattr(user, "id", user)})
+        return {"Authorization": f"Bearer {token}", **extra}
+    return headers
+
+
+# ----------------------------------------------------------
+# Query budgets
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "query_budget(n): fail if the test runs more than n SQL statements"
+    )
+
+def _check(record, budget: int, what: str):
+    if len(record) > budget:
+        pytest.fail(f"{what} ran {len(record)} SQL statements, over its budget of {budget}:\n{record.describe()}",
+                    pytrace=False)
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+    with record_queries() as record:
+        # A failing test raises here: its own failure is reported, not the budget
+        result = yield
+    _check(record, marker.args[0], item.name)
+    return result
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(n): ...`` fails if the block runs more than n SQL statements."""
+    @contextlib.contextmanager
+    def budget(limit: int):
+        with record_queries() as record:
+            yield record
+        _check(record, limit, "Block")
+    return budget
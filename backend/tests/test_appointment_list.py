@@ -0,0 +1,117 @@
+import json
+import re
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.db.models.appointment import Appointment
+
+client = TestClient(app)
+
+@pytest.fixture(scope="function")
+def seeded(db_session, make_user):
+    doctor = make_user("doctor", email="doctor@example.com", available_timeslots="10:00-11:00")
+    patient = make_user("patient", email="patient@example.com")
+    base = datetime(2030, 1, 1, 10, 0)
+    # Pairs of appointments share a timestamp so the id tie-breaker is exercised
+    for i in range(7):
+        db_session.add(Appointment(
+            patient_id=patient.id,
+            doctor_id=doctor.id,
+            appointment_time=base + timedelta(days=i // 2),
+            notes=f"visit {i}"
+        ))
+    db_session.commit()
+    return doctor, patient
+
+def test_list_appointments_keyset_pages(seeded, auth_headers):
+    doctor, _ = seeded
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/appointment/appointments", params=params, headers=auth_headers(doctor))
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 3
+        seen.extend((item["appointment_time"], item["id"]) for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+    assert seen == sorted(seen, reverse=True)
+
+def test_list_appointments_ndjson_stream(seeded, auth_headers):
+    _, patient = seeded
+    response = client.get(
+        "/api/v1/appointment/appointments",
+        params={"format": "ndjson"},
+        headers=auth_headers(patient)
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 7
+    assert all(row["patient_id"] == patient.id for row in rows)
+
+def test_list_appointments_rejects_bad_cursor(seeded, auth_headers):
+    doctor, _ = seeded
+    response = client.get(
+        "/api/v1/appointment/appointments",
+        params={"cursor": "not-a-cursor"},
+        headers=auth_headers(doctor)
+    )
+    assert response.status_code == 400
+
+def count_list_statements(engine, headers, limit):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get(
+            "/api/v1/appointment/appointments",
+            params={"limit": limit},
+            headers=headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == limit
+    assert all(item["doctor"]["full_name"] and item["patient"]["full_name"] for item in response.json()["items"])
+    return statements
+
+def test_list_appointments_constant_statement_count(seeded, engine, auth_headers):
+    doctor, _ = seeded
+    headers = auth_headers(doctor)
+    # Warm the principal cache so both measured requests skip the users lookup
+    count_list_statements(engine, headers, 1)
+    small_page = count_list_statements(engine, headers, 1)
+    large_page = count_list_statements(engine, headers, 7)
+    assert len(small_page) == len(large_page)
+    # Neither the current user nor the nested parties load the image blob
+    assert not any(re.search(r"profile_image\b", statement) for statement in large_page)
+
+def test_authenticated_request_uses_one_connection(seeded, engine, auth_headers):
+    doctor, _ = seeded
+    headers = auth_headers(doctor)
+    checkouts = []
+
+    def record(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+
+    event.listen(engine, "checkout", record)
+    try:
+        response = client.get("/api/v1/appointment/appointments", headers=headers)
+    finally:
+        event.remove(engine, "checkout", record)
+    assert response.status_code == 200
+    # get_current_user and the route share the request's session
+    assert len(checkouts) == 1
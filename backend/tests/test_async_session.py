@@ -0,0 +1,68 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.main import app
+from app.db import database
+from app.db.database import async_database_url, get_async_db
+from app.db.crud.availability import build_slots
+
+client = TestClient(app)
+
+@pytest.fixture(scope="function")
+def users(make_user):
+    # Built per test: aiosqlite connections are bound to the TestClient's event loop
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    doctor = make_user("doctor", full_name="Async Doctor", available_timeslots="10:00,11:00",
+                       slots=build_slots("10:00,11:00"))
+    patient = make_user("patient", full_name="Async Patient", email="apat@example.com")
+
+    yield doctor.id, patient.id
+    app.dependency_overrides.pop(get_async_db, None)
+
+def test_booking_flow_on_async_session(users, auth_headers):
+    doctor_id, patient_id = users
+
+    response = client.post(
+        "/api/v1/appointment/appointments",
+        json={"doctor_id": doctor_id, "appointment_time": "2030-01-01T10:00:00"},
+        headers=auth_headers(patient_id)
+    )
+    assert response.status_code == 200
+    booked = response.json()
+    assert booked["doctor"]["full_name"] == "Async Doctor"
+
+    response = client.patch(
+        f"/api/v1/appointment/appointments/{booked['id']}/status",
+        json={"status": "Confirmed"},
+        headers=auth_headers(doctor_id)
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "Confirmed"
+
+    response = client.get("/api/v1/appointment/appointments", headers=auth_headers(doctor_id))
+    assert [item["id"] for item in response.json()["items"]] == [booked["id"]]
+
+    response = client.get(
+        "/api/v1/appointment/appointments",
+        params={"format": "ndjson"},
+        headers=auth_headers(patient_id)
+    )
+    assert len(response.text.splitlines()) == 1
+
+    response = client.get("/api/v1/users/users/me", headers=auth_headers(patient_id))
+    assert response.json()["email"] == "apat@example.com"
+
+def test_async_url_uses_matching_driver(monkeypatch):
+    monkeypatch.setattr(database.settings, "ASYNC_DB_URL", None)
+    monkeypatch.setattr(database.settings, "DB_URL", "mysql+mysqlconnector://root:pw@localhost/appointment_book")
+    assert async_database_url() == "mysql+aiomysql://root:pw@localhost/appointment_book"
+    monkeypatch.setattr(database.settings, "DB_URL", "sqlite:///./app.db")
+    assert async_database_url() == "sqlite+aiosqlite:///./app.db"
@@ -0,0 +1,52 @@
+import pytest
+from datetime import time
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.models.availability import DoctorSlot
+from app.db.migrate_availability_slots import migrate
+from app.utils.validators import parse_timeslots
+
+client = TestClient(app)
+
+def test_parse_timeslots():
+    assert parse_timeslots("Mon 10:00-11:00, Tue 09:30") == [
+        (0, time(10, 0), time(11, 0)),
+        (1, time(9, 30), time(10, 30)),
+    ]
+    assert len(parse_timeslots("10:00-11:00,11:00-12:00")) == 14
+    with pytest.raises(ValueError):
+        parse_timeslots("10:00-09:00")
+    with pytest.raises(ValueError):
+        parse_timeslots("10")
+
+def test_booking_validated_against_slots(engine, session_factory, make_user, auth_headers):
+    # "10:00" used to match any timeslot text containing it, e.g. "09:00-10:00"
+    doctor_id = make_user("doctor", available_timeslots="Mon 09:00-10:00").id
+    patient_id = make_user("patient").id
+    assert migrate(bind=engine, session_factory=session_factory) == (1, [])
+    headers = auth_headers(patient_id)
+
+    # 2030-01-07 is a Monday
+    for appointment_time, expected in [
+        ("2030-01-07T09:30:00", 200),
+        ("2030-01-07T10:00:00", 400),
+        ("2030-01-08T09:30:00", 400),
+    ]:
+        response = client.post(
+            "/api/v1/appointment/appointments",
+            json={"doctor_id": doctor_id, "appointment_time": appointment_time},
+            headers=headers
+        )
+        assert response.status_code == expected, appointment_time
+
+    response = client.get(f"/api/v1/users/users/doctors/{doctor_id}/slots")
+    assert response.json() == [{"weekday": 0, "start_time": "09:00:00", "end_time": "10:00:00", "capacity": 1}]
+
+def test_migration_reports_unparseable_timeslots(db_session, engine, session_factory, make_user):
+    good = make_user("doctor", available_timeslots="10:00-11:00").id
+    bad = make_user("doctor", available_timeslots="mornings").id
+
+    assert migrate(bind=engine, session_factory=session_factory) == (1, [bad])
+    assert db_session.query(DoctorSlot).filter(DoctorSlot.doctor_id == good).count() == 7
+    # Doctors that already have slots are skipped on rerun
+    assert migrate(bind=engine, session_factory=session_factory) == (0, [bad])
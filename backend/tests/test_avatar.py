@@ -0,0 +1,63 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.models.user import User
+from app.db.migrate_profile_images import migrate
+from app.core.storage import MemoryBlobStore, set_blob_store
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(range(56))
+
+client = TestClient(app)
+
+@pytest.fixture(scope="function")
+def store(db_session):
+    store = MemoryBlobStore()
+    set_blob_store(store)
+    yield store
+    set_blob_store(None)
+
+def test_avatar_served_with_cache_headers(store, make_user):
+    key = store.put(IMAGE)
+    user_id = make_user(profile_image_key=key).id
+
+    response = client.get(f"/api/v1/users/{user_id}/avatar")
+    assert response.status_code == 200
+    assert response.content == IMAGE
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["etag"] == f'"{key}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    response = client.get(f"/api/v1/users/{user_id}/avatar", headers={"If-None-Match": f'"{key}"'})
+    assert response.status_code == 304
+    assert response.content == b""
+
+def test_avatar_range_requests(store, make_user):
+    user_id = make_user(profile_image_key=store.put(IMAGE)).id
+
+    response = client.get(f"/api/v1/users/{user_id}/avatar", headers={"Range": "bytes=0-7"})
+    assert response.status_code == 206
+    assert response.content == IMAGE[:8]
+    assert response.headers["content-range"] == f"bytes 0-7/{len(IMAGE)}"
+
+    response = client.get(f"/api/v1/users/{user_id}/avatar", headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.content == IMAGE[-4:]
+
+    response = client.get(f"/api/v1/users/{user_id}/avatar", headers={"Range": f"bytes={len(IMAGE)}-"})
+    assert response.status_code == 416
+
+def test_avatar_missing(store, make_user):
+    user_id = make_user().id
+    response = client.get(f"/api/v1/users/{user_id}/avatar")
+    assert response.status_code == 404
+
+def test_migrate_moves_inline_images(store, db_session, engine, session_factory, make_user):
+    user_id = make_user(profile_image=IMAGE).id
+
+    assert migrate(bind=engine, session_factory=session_factory, store=store) == 1
+    # Rerunning is a no-op
+    assert migrate(bind=engine, session_factory=session_factory, store=store) == 0
+
+    user = db_session.query(User).filter(User.id == user_id).first()
+    assert user.profile_image is None
+    assert store.get(user.profile_image_key) == IMAGE
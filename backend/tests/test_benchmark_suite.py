@@ -0,0 +1,77 @@
+import json
+from datetime import date, datetime
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.db.crud.availability import slot_covering
+from app.db.models.appointment import Appointment, AppointmentStatus, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.models.stats import DoctorDailyStats
+from benchmarks import synthetic
+from benchmarks.suite import ENDPOINTS, compare, run_suite
+
+TODAY = date(2030, 1, 1)
+
+def generated(tmp_path, name, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / name}", connect_args={"check_same_thread": False})
+    counts = synthetic.generate(engine, doctors=5, patients=40, appointments=500, today=TODAY, **kwargs)
+    return engine, counts
+
+def appointment_rows(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(
+            Appointment.doctor_id, Appointment.patient_id, Appointment.appointment_time, Appointment.status
+        ).order_by(Appointment.id)).all()
+
+def test_generator_is_deterministic(tmp_path):
+    first, counts = generated(tmp_path, "a.db")
+    second, _ = generated(tmp_path, "b.db")
+    other, _ = generated(tmp_path, "c.db", seed=8)
+    assert counts == {"doctors": 5, "patients": 40, "appointments": 500}
+    assert appointment_rows(first) == appointment_rows(second)
+    assert appointment_rows(first) != appointment_rows(other)
+
+def test_generated_appointments_fit_the_schedules(tmp_path):
+    engine, _ = generated(tmp_path, "a.db")
+    db = sessionmaker(bind=engine)()
+    appointments = db.query(Appointment).all()
+    statuses = {appointment.status for appointment in appointments}
+    assert statuses == set(AppointmentStatus)
+    assert any(a.appointment_time > datetime(2030, 1, 1) for a in appointments)
+
+    claims = {claim.appointment_id: claim for claim in db.query(SlotClaim)}
+    for appointment in appointments:
+        slot = db.execute(slot_covering(appointment.doctor_id, appointment.appointment_time)).scalars().first()
+        assert slot is not None
+        claim = claims.get(appointment.id)
+        assert (claim is None) == (appointment.status == AppointmentStatus.cancelled)
+        if claim is not None:
+            assert claim.slot_start == datetime.combine(appointment.appointment_time.date(), slot.start_time)
+            assert 0 <= claim.seat < slot.capacity
+    # The rollup and name index are filled in as on booking and registration
+    assert db.scalar(select(func.sum(DoctorDailyStats.appointments))) == len(appointments)
+    assert db.query(DoctorSlot).count() > 0
+    db.close()
+    engine.dispose()
+
+def test_suite_runs_every_endpoint_and_task(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}", connect_args={"check_same_thread": False})
+    synthetic.generate(engine, doctors=5, patients=40, appointments=300)
+    overrides = dict(app.dependency_overrides)
+    results = run_suite(engine, requests=2, concurrency=2, warmup=1, task_runs=1)
+    engine.dispose()
+    # The app is left as it was found
+    assert app.dependency_overrides == overrides
+
+    assert set(results["endpoints"]) == {endpoint.name for endpoint in ENDPOINTS}
+    assert set(results["tasks"]) == {"report.monthly", "reminders.dispatch", "export.csv"}
+    for name, result in {**results["endpoints"], **results["tasks"]}.items():
+        assert result["failed"] == 0, (name, result)
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"] <= result["max_ms"]
+    assert results["endpoints"]["appointments.book"]["concurrency"] == 1
+    assert results["tasks"]["report.monthly"]["items"] == 5
+    assert results["meta"]["data"] == {"doctors": 5, "patients": 40, "appointments": 300}
+
+    # Machine-readable, and comparable with itself
+    reloaded = json.loads(json.dumps(results))
+    assert set(compare(reloaded, results).values()) == {0.0}
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+from datetime import datetime
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.db.database import ThreadedSession
+from app.db.models.appointment import Appointment, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.crud.appointment import book_seat
+from app.db.crud.availability import build_slots
+from app.db.migrate_slot_claims import migrate
+from app.core.idempotency import IdempotencyStore
+
+client = TestClient(app)
+
+# 2030-01-07 is a Monday
+SLOT_TIME = "2030-01-07T10:15:00"
+
+@pytest.fixture
+def add_doctor(make_user):
+    def add(capacity=1):
+        slots = build_slots("Mon 10:00-11:00")
+        for slot in slots:
+            slot.capacity = capacity
+        return make_user("doctor", available_timeslots="Mon 10:00-11:00", slots=slots).id
+    return add
+
+@pytest.fixture
+def add_patients(make_user):
+    return lambda count: [make_user("patient").id for _ in range(count)]
+
+@pytest.fixture
+def book(auth_headers):
+    def book(doctor_id, patient_id, appointment_time=SLOT_TIME, **headers):
+        return client.post(
+            "/api/v1/appointment/appointments",
+            json={"doctor_id": doctor_id, "appointment_time": appointment_time},
+            headers=auth_headers(patient_id, **headers)
+        )
+    return book
+
+def test_slot_cannot_be_double_booked(add_doctor, add_patients, book):
+    doctor_id = add_doctor()
+    first, second = add_patients(2)
+
+    booked = book(doctor_id, first)
+    assert booked.status_code == 200
+    # A retry without an Idempotency-Key still gets the same booking back
+    assert book(doctor_id, first).json()["id"] == booked.json()["id"]
+    # Any time inside the same slot competes for the same seat
+    response = book(doctor_id, second, "2030-01-07T10:45:00")
+    assert response.status_code == 409
+    # The following Monday is a different slot
+    assert book(doctor_id, second, "2030-01-14T10:00:00").status_code == 200
+
+def test_capacity_and_cancellation_free_seats(db_session, add_doctor, add_patients, book, auth_headers):
+    doctor_id = add_doctor(capacity=2)
+    patients = add_patients(3)
+
+    booked = [book(doctor_id, patient_id) for patient_id in patients]
+    assert [response.status_code for response in booked] == [200, 200, 409]
+    assert sorted(claim.seat for claim in db_session.query(SlotClaim)) == [0, 1]
+
+    response = client.patch(
+        f"/api/v1/appointment/appointments/{booked[0].json()['id']}/status",
+        json={"status": "Cancelled"},
+        headers=auth_headers(doctor_id)
+    )
+    assert response.status_code == 200
+    assert book(doctor_id, patients[2]).status_code == 200
+
+def test_seat_retry_survives_concurrent_bookings(db_session, session_factory, add_doctor, add_patients):
+    doctor_id = add_doctor(capacity=3)
+    patients = add_patients(3)
+    at = datetime(2030, 1, 7, 10, 15)
+    db = session_factory()
+    slot = db.query(DoctorSlot).filter_by(doctor_id=doctor_id).one()
+    competitors = iter(enumerate(patients[1:]))
+
+    @event.listens_for(db, "before_flush")
+    def book_concurrently(session, flush_context, instances):
+        # Each attempt loses its seat to another patient booked just before it.
+        # The second one gets the id the first failed attempt had flushed.
+        seat, patient_id = next(competitors, (None, None))
+        if patient_id is not None:
+            other = session_factory()
+            appointment = Appointment(patient_id=patient_id, doctor_id=doctor_id, appointment_time=at)
+            other.add(SlotClaim(doctor_id=doctor_id, slot_start=datetime(2030, 1, 7, 10), seat=seat,
+                                appointment=appointment))
+            other.commit()
+            other.close()
+
+    appointment = Appointment(patient_id=patients[0], doctor_id=doctor_id, appointment_time=at)
+    appointment_id = asyncio.run(book_seat(ThreadedSession(db), appointment, slot))
+    db.close()
+    assert appointment_id is not None
+    claims = {claim.seat: claim.appointment.patient_id for claim in db_session.query(SlotClaim)}
+    assert claims == {0: patients[1], 1: patients[2], 2: patients[0]}
+
+def test_idempotency_key_replays_the_first_outcome(db_session, add_doctor, add_patients, book):
+    doctor_id = add_doctor()
+    patient_id, other_id = add_patients(2)
+
+    first = book(doctor_id, patient_id, **{"Idempotency-Key": "k1"})
+    retry = book(doctor_id, patient_id, **{"Idempotency-Key": "k1"})
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db_session.query(Appointment).count() == 1
+
+    # Same key, different request
+    assert book(doctor_id, patient_id, "2030-01-14T10:00:00", **{"Idempotency-Key": "k1"}).status_code == 422
+    # Keys are scoped per user; a conflict is replayed like any other outcome
+    assert book(doctor_id, other_id, **{"Idempotency-Key": "k1"}).status_code == 409
+    assert book(doctor_id, other_id, **{"Idempotency-Key": "k1"}).headers["Idempotent-Replayed"] == "true"
+
+def test_idempotency_store_in_flight_and_eviction():
+    store = IdempotencyStore(maxsize=2)
+    assert store.begin("a", "f") is None
+    with pytest.raises(HTTPException) as exc:
+        store.begin("a", "f")
+    assert exc.value.status_code == 409
+
+    store.complete("a", 200, {"id": 1})
+    assert store.begin("a", "f") == (200, {"id": 1})
+
+    store.begin("b", "f")
+    store.begin("c", "f")
+    assert store.begin("a", "f") is None  # evicted, so it starts over
+
+    store.release("a")
+    assert store.begin("a", "f") is None
+
+def test_migration_claims_existing_appointments(db_session, engine, session_factory, add_doctor, add_patients):
+    doctor_id = add_doctor()
+    first, second = add_patients(2)
+    at = datetime(2030, 1, 7, 10, 15)
+    db_session.add_all([
+        Appointment(patient_id=first, doctor_id=doctor_id, appointment_time=at),
+        Appointment(patient_id=second, doctor_id=doctor_id, appointment_time=at),
+        Appointment(patient_id=second, doctor_id=doctor_id, appointment_time=datetime(2030, 1, 8, 10, 15)),
+    ])
+    db_session.commit()
+
+    claimed, unclaimed = migrate(bind=engine, session_factory=session_factory)
+    assert claimed == 1
+    assert len(unclaimed) == 2
+    assert migrate(bind=engine, session_factory=session_factory) == (0, unclaimed)
@@ -0,0 +1,193 @@
+import io
+import json
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from app.main import app
+from app.db import bulk_import
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, SlotClaim
+from app.db.models.availability import DoctorSlot
+from app.db.models.stats import DoctorDailyStats
+from app.core.security import hash_password, verify_password
+from app.core.directory_cache import get_directory_cache
+
+client = TestClient(app)
+
+HASHED = hash_password("Secret@123")
+
+@pytest.fixture
+def admin(make_user, auth_headers):
+    return auth_headers(make_user("admin", email="admin@example.com"))
+
+USERS_CSV = f"""full_name,email,mobile_number,user_type,password,hashed_password,license_number,experience_years,consultation_fee,available_timeslots
+Dr. Farhana Akter,farhana@example.com,+8801000000061,doctor,,{HASHED},L-1,7,800,Mon 10:00-12:00
+Dr. Kamal Hossain,kamal@example.com,+8801000000062,doctor,,{HASHED},L-2,3,500,"Tue 09:00-10:00,Wed 09:00-10:00"
+Rina Das,rina@example.com,+8801000000063,patient,Patient@123,,,,,
+Bad Mobile,bad@example.com,12345,patient,,{HASHED},,,,
+Dr. No Fields,nofields@example.com,+8801000000064,doctor,,{HASHED},,,,
+Copy Cat,farhana@example.com,+8801000000065,patient,,{HASHED},,,,
+Existing,admin@example.com,+8801000000066,patient,,{HASHED},,,,
+Plain Hash,plain@example.com,+8801000000067,patient,,not-a-hash,,,,
+"""
+
+def upload(path, content, headers, filename, **params):
+    return client.post(path, files={"file": (filename, io.BytesIO(content.encode()))}, params=params, headers=headers)
+
+def import_users(headers):
+    return upload("/api/v1/users/users/import", USERS_CSV, headers, "users.csv")
+
+def test_user_import_reports_bad_rows_and_imports_the_rest(db_session, admin):
+    version = get_directory_cache().version
+    response = import_users(admin)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 3 and report["failed"] == 5
+    errors = {error["line"]: error["error"] for error in report["errors"]}
+    assert list(errors) == [5, 6, 7, 8, 9]
+    assert "mobile_number" in errors[5]
+    assert "consultation_fee" in errors[6]
+    assert errors[7] == "email farhana@example.com is already registered"
+    assert errors[8] == "email admin@example.com is already registered"
+    assert errors[9] == "hashed_password is not a bcrypt hash"
+
+    kamal = db_session.query(User).filter_by(email="kamal@example.com").one()
+    assert kamal.consultation_fee == 500 and kamal.hashed_password == HASHED
+    assert sorted(slot.weekday for slot in db_session.query(DoctorSlot).filter_by(doctor_id=kamal.id)) == [1, 2]
+    rina = db_session.query(User).filter_by(email="rina@example.com").one()
+    assert verify_password("Patient@123", rina.hashed_password)
+
+    # Imported doctors show up in name search and in a fresh directory
+    assert get_directory_cache().version > version
+    hits = client.get("/api/v1/users/users/doctors/search", params={"q": "kamal"}).json()["items"]
+    assert [hit["id"] for hit in hits] == [kamal.id]
+
+def test_appointment_import(db_session, admin):
+    import_users(admin)
+    farhana = "farhana@example.com"
+    lines = [
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2024-03-04T10:00:00",
+         "status": "Completed"},
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2024-03-04T11:00:00+06:00",
+         "status": "Completed", "notes": "follow-up"},
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2024-03-05T10:00:00"},
+        {"doctor_email": "rina@example.com", "patient_email": farhana, "appointment_time": "2024-03-05T10:00:00"},
+        {"doctor_email": farhana, "patient_email": "nobody@example.com", "appointment_time": "2024-03-05T10:00:00"},
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2024-03-05T10:00:00",
+         "status": "Lost"},
+    ]
+    content = "\n".join(json.dumps(line) for line in lines) + "\n{not json\n"
+    response = upload("/api/v1/appointment/appointments/import", content, admin, "history.ndjson")
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 3
+    errors = {error["line"]: error["error"] for error in report["errors"]}
+    assert errors[4] == "no doctor with email rina@example.com"
+    assert errors[5] == "no patient with email nobody@example.com"
+    assert errors[6].startswith("status:")
+    assert errors[7].startswith("invalid JSON")
+
+    times = sorted(a.appointment_time.isoformat() for a in db_session.query(Appointment))
+    assert times == ["2024-03-04T05:00:00", "2024-03-04T10:00:00", "2024-03-05T10:00:00"]
+    # Core inserts bypass the stats listeners, so the import rebuilds the doctors' rollup
+    stats = {(row.day, row.status.value): (row.appointments, row.revenue) for row in db_session.query(DoctorDailyStats)}
+    assert stats == {(date(2024, 3, 4), "Completed"): (2, 1600.0), (date(2024, 3, 5), "Pending"): (1, 800.0)}
+
+def test_upcoming_appointments_claim_their_seats(db_session, admin, make_user, auth_headers):
+    import_users(admin)
+    farhana = "farhana@example.com"
+    # 2030-01-07 is a Monday; Dr. Farhana sees one patient per slot, Mon 10:00-12:00
+    lines = [
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2030-01-07T10:15:00",
+         "status": "Confirmed"},
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2030-01-07T10:45:00"},
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2030-01-08T10:00:00"},
+        {"doctor_email": farhana, "patient_email": "rina@example.com", "appointment_time": "2030-01-07T10:30:00",
+         "status": "Cancelled"},
+    ]
+    content = "\n".join(json.dumps(line) for line in lines)
+    report = upload("/api/v1/appointment/appointments/import", content, admin, "upcoming.ndjson").json()
+    assert report["imported"] == 2
+    assert report["errors"] == [
+        {"line": 2, "error": "the slot at 2030-01-07T10:00:00 is already fully booked"},
+        {"line": 3, "error": "no slot of the doctor covers 2030-01-08T10:00:00"},
+    ]
+    [claim] = db_session.query(SlotClaim).all()
+    assert claim.appointment.status.value == "Confirmed" and claim.seat == 0
+
+    # Bookings see the imported seat as taken
+    response = client.post(
+        "/api/v1/appointment/appointments",
+        json={"doctor_id": claim.doctor_id, "appointment_time": "2030-01-07T11:00:00"},
+        headers=auth_headers(make_user("patient"))
+    )
+    assert response.status_code == 409
+
+def test_seats_are_claimed_without_returning(db_session, engine, admin):
+    import_users(admin)
+    # An engine whose dialect, like MySQL's, cannot INSERT .. RETURNING
+    no_returning = create_engine(engine.url, connect_args={"check_same_thread": False})
+    no_returning.dialect.insert_returning = no_returning.dialect.insert_executemany_returning = False
+    statements = []
+    event.listen(no_returning, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    rows = [
+        {"doctor_email": "farhana@example.com", "patient_email": "rina@example.com",
+         "appointment_time": f"2030-01-{day:02d}T10:00:00", "status": "Confirmed"}
+        for day in (7, 14, 21)
+    ]
+    report = bulk_import.import_appointments(
+        [(line, row, None) for line, row in enumerate(rows, start=1)], bind=no_returning
+    )
+    no_returning.dispose()
+    assert report.imported == 3 and report.errors == []
+    assert not any("RETURNING" in statement for statement in statements)
+    claims = db_session.query(SlotClaim).all()
+    assert sorted(claim.appointment.appointment_time.day for claim in claims) == [7, 14, 21]
+
+def test_chunks_are_inserted_in_one_statement(engine, admin):
+    import_users(admin)
+    rows = [
+        {"doctor_email": "farhana@example.com", "patient_email": "rina@example.com",
+         "appointment_time": f"2024-03-{day:02d}T10:00:00"}
+        for day in range(1, 11)
+    ]
+    inserts = []
+    listener = lambda conn, cursor, statement, parameters, context, executemany: (
+        inserts.append(executemany) if statement.startswith("INSERT INTO appointments") else None
+    )
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        report = bulk_import.import_appointments(
+            [(line, row, None) for line, row in enumerate(rows, start=1)], bind=engine, chunk_size=4
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert report.imported == 10
+    assert inserts == [True, True, True]
+
+def test_constraint_failures_fall_back_to_single_rows(db_session, engine, admin, monkeypatch):
+    import_users(admin)
+    # Rows that slip past the checks, as if inserted concurrently by someone else
+    monkeypatch.setattr(bulk_import, "_unique_users", lambda bind, candidates, report: candidates)
+    rows = [
+        (2, {"full_name": "New One", "email": "new1@example.com", "mobile_number": "+8801000000071",
+             "user_type": "patient", "hashed_password": HASHED}, None),
+        (3, {"full_name": "Again", "email": "rina@example.com", "mobile_number": "+8801000000072",
+             "user_type": "patient", "hashed_password": HASHED}, None),
+        (4, {"full_name": "New Two", "email": "new2@example.com", "mobile_number": "+8801000000073",
+             "user_type": "patient", "hashed_password": HASHED}, None),
+    ]
+    report = bulk_import.import_users(rows, bind=engine)
+    assert report.imported == 2
+    assert [error["line"] for error in report.errors] == [3]
+    assert report.errors[0]["error"].startswith("rejected by the database")
+    assert db_session.query(User).filter(User.email.in_(["new1@example.com", "new2@example.com"])).count() == 2
+
+def test_import_is_admin_only(db_session, admin, auth_headers):
+    import_users(admin)
+    patient = auth_headers(db_session.query(User).filter_by(email="rina@example.com").one())
+    assert upload("/api/v1/users/users/import", USERS_CSV, patient, "users.csv").status_code == 403
+    assert upload("/api/v1/appointment/appointments/import", "", patient, "a.csv").status_code == 403
+    assert upload("/api/v1/users/users/import", USERS_CSV, admin, "users.xlsx").status_code == 400
@@ -0,0 +1,170 @@
+import pytest
+from datetime import date, datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from app.main import app
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.db.models.stats import DoctorDailyStats
+from app.db.crud.availability import build_slots
+from app.db.rebuild_daily_stats import rebuild
+
+client = TestClient(app)
+
+# 2030-01-07 and 2030-01-14 are Mondays
+MONDAY, NEXT_MONDAY = "2030-01-07", "2030-01-14"
+
+@pytest.fixture
+def add_doctor(make_user):
+    def add(fee):
+        slots = build_slots("Mon 10:00-12:00")
+        for slot in slots:
+            slot.capacity = 5
+        return make_user("doctor", consultation_fee=fee, available_timeslots="Mon 10:00-12:00", slots=slots).id
+    return add
+
+@pytest.fixture
+def book(auth_headers):
+    def book(doctor_id, patient_id, appointment_time):
+        response = client.post(
+            "/api/v1/appointment/appointments",
+            json={"doctor_id": doctor_id, "appointment_time": appointment_time},
+            headers=auth_headers(patient_id)
+        )
+        assert response.status_code == 200
+        return response.json()["id"]
+    return book
+
+@pytest.fixture
+def set_status(auth_headers):
+    def set_status(doctor_id, appointment_id, status):
+        response = client.patch(
+            f"/api/v1/appointment/appointments/{appointment_id}/status",
+            json={"status": status}, headers=auth_headers(doctor_id)
+        )
+        assert response.status_code == 200
+    return set_status
+
+def rollup(db):
+    db.expire_all()
+    return {
+        (row.doctor_id, row.day.isoformat(), row.status.value): (row.appointments, row.revenue)
+        for row in db.query(DoctorDailyStats) if row.appointments
+    }
+
+@pytest.fixture
+def clinic(make_user, add_doctor, book, set_status):
+    rahman = add_doctor(fee=500)
+    karim = add_doctor(fee=None)
+    patients = [make_user("patient").id for _ in range(3)]
+    admin = make_user("admin").id
+
+    first = book(rahman, patients[0], f"{MONDAY}T10:00:00")
+    second = book(rahman, patients[1], f"{MONDAY}T11:00:00")
+    book(rahman, patients[2], f"{NEXT_MONDAY}T10:00:00")
+    later = book(karim, patients[0], f"{MONDAY}T10:30:00")
+    set_status(rahman, first, "Confirmed")
+    set_status(rahman, first, "Completed")
+    set_status(rahman, second, "Cancelled")
+    set_status(karim, later, "Confirmed")
+    return {"rahman": rahman, "karim": karim, "admin": admin, "patient": patients[0]}
+
+def test_bookings_and_transitions_keep_the_rollup_current(db_session, engine, clinic):
+    rahman, karim = clinic["rahman"], clinic["karim"]
+    expected = {
+        (rahman, MONDAY, "Completed"): (1, 500.0),
+        (rahman, MONDAY, "Cancelled"): (1, 500.0),
+        (rahman, NEXT_MONDAY, "Pending"): (1, 500.0),
+        (karim, MONDAY, "Confirmed"): (1, 0.0),
+    }
+    assert rollup(db_session) == expected
+    # Rebuilding from appointments gives the same counts
+    assert rebuild(bind=engine) == 2
+    assert rollup(db_session) == expected
+
+def test_fee_changes_do_not_skew_the_buckets(db_session, engine, clinic, book, set_status):
+    rahman = clinic["rahman"]
+    patient = clinic["patient"]
+    db_session.get(User, rahman).consultation_fee = 800
+    db_session.commit()
+    booked = book(rahman, patient, f"{NEXT_MONDAY}T11:00:00")
+    assert rollup(db_session)[(rahman, NEXT_MONDAY, "Pending")] == (2, 1300.0)
+
+    # Appointments booked at either fee move with the revenue they were counted at
+    pending = db_session.query(Appointment).filter_by(doctor_id=rahman, status=AppointmentStatus.pending).all()
+    for appointment in pending:
+        set_status(rahman, appointment.id, "Confirmed")
+    set_status(rahman, booked, "Cancelled")
+    stats = rollup(db_session)
+    assert (rahman, NEXT_MONDAY, "Pending") not in stats
+    assert stats[(rahman, NEXT_MONDAY, "Confirmed")][0] == 1
+    assert stats[(rahman, NEXT_MONDAY, "Cancelled")][0] == 1
+    assert sum(stats[(rahman, NEXT_MONDAY, status)][1] for status in ("Confirmed", "Cancelled")) == 1300.0
+    assert all(revenue >= 0 for _, revenue in stats.values())
+    # Emptied buckets keep no revenue
+    db_session.expire_all()
+    assert all(row.revenue == 0 for row in db_session.query(DoctorDailyStats) if not row.appointments)
+
+    # Only a rebuild reprices at the current fee
+    rebuild(bind=engine, doctor_ids=[rahman])
+    assert rollup(db_session)[(rahman, NEXT_MONDAY, "Cancelled")] == (1, 800.0)
+
+def test_rebuild_picks_up_bulk_inserts(db_session, engine, clinic):
+    rahman = clinic["rahman"]
+    with engine.begin() as conn:
+        conn.execute(insert(Appointment), [
+            {"doctor_id": rahman, "patient_id": clinic["patient"], "appointment_time": datetime(2030, 2, 4, 10),
+             "status": AppointmentStatus.completed}
+        ] * 2)
+    assert (rahman, "2030-02-04", "Completed") not in rollup(db_session)
+    rebuild(bind=engine, doctor_ids=[rahman])
+    assert rollup(db_session)[(rahman, "2030-02-04", "Completed")] == (2, 1000.0)
+
+def test_dashboard_reads_only_the_rollup(engine, clinic, auth_headers):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(
+            "/api/v1/appointment/appointments/stats",
+            params={"date_from": "2030-01-01", "date_to": "2030-01-31"},
+            headers=auth_headers(clinic["admin"])
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    body = response.json()
+    # (the order of statuses within a group depends on the database's enum type)
+    assert sorted(body["totals"], key=lambda t: t["status"]) == [
+        {"status": "Cancelled", "appointments": 1, "revenue": 500.0},
+        {"status": "Completed", "appointments": 1, "revenue": 500.0},
+        {"status": "Confirmed", "appointments": 1, "revenue": 0.0},
+        {"status": "Pending", "appointments": 1, "revenue": 500.0},
+    ]
+    assert [d["day"] for d in body["days"]] == [MONDAY] * 3 + [NEXT_MONDAY]
+    assert {(d["day"], d["status"], d["appointments"]) for d in body["days"]} == {
+        (MONDAY, "Confirmed", 1), (MONDAY, "Cancelled", 1), (MONDAY, "Completed", 1), (NEXT_MONDAY, "Pending", 1)
+    }
+    assert {(d["doctor_id"], d["status"]) for d in body["doctors"]} == {
+        (clinic["rahman"], "Pending"), (clinic["rahman"], "Cancelled"), (clinic["rahman"], "Completed"),
+        (clinic["karim"], "Confirmed")
+    }
+    assert not [s for s in statements if "FROM appointments" in s]
+
+def test_dashboard_scope(clinic, auth_headers):
+    doctor = auth_headers(clinic["karim"])
+    params = {"date_from": "2030-01-01", "date_to": "2030-01-31"}
+    response = client.get("/api/v1/appointment/appointments/stats", params=params, headers=doctor)
+    assert response.status_code == 200
+    assert {d["doctor_id"] for d in response.json()["doctors"]} == {clinic["karim"]}
+
+    url = "/api/v1/appointment/appointments/stats"
+    assert client.get(url, params={**params, "doctor_id": clinic["rahman"]}, headers=doctor).status_code == 403
+    assert client.get(url, params=params, headers=auth_headers(clinic["patient"])).status_code == 403
+    assert client.get(url, params={"date_from": "2030-02-01", "date_to": "2030-01-01"},
+                      headers=doctor).status_code == 400
+    assert client.get(url, params={"date_from": "2029-01-01", "date_to": "2030-01-31"},
+                      headers=doctor).status_code == 400
+    # Defaults to the current month
+    assert client.get(url, headers=doctor).json()["date_from"] == date.today().replace(day=1).isoformat()
@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.core.directory_cache import DirectoryCache, get_directory_cache
+
+client = TestClient(app)
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", count)
+    yield executed
+    event.remove(engine, "before_cursor_execute", count)
+
+def directory(**headers):
+    return client.get("/api/v1/users/users/doctors", headers=headers)
+
+def test_revalidation_returns_304_without_querying(make_user, statements):
+    make_user("doctor", full_name="Dr. Rahman", consultation_fee=500, available_timeslots="Mon 10:00-11:00")
+    first = directory()
+    assert first.status_code == 200
+    assert first.json() == [{"id": 1, "full_name": "Dr. Rahman", "available_timeslots": "Mon 10:00-11:00",
+                             "consultation_fee": 500.0}]
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and first.headers["cache-control"] == "no-cache"
+
+    statements.clear()
+    again = directory(**{"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag
+    assert directory().content == first.content
+    assert statements == []
+
+def test_doctor_changes_invalidate(db_session, make_user):
+    doctor = make_user("doctor", full_name="Dr. Rahman", consultation_fee=500)
+    etag = directory().headers["etag"]
+
+    # Patients are not listed: the cached directory stays valid
+    make_user("patient", full_name="Patient")
+    assert directory(**{"If-None-Match": etag}).status_code == 304
+
+    doctor.consultation_fee = 700
+    db_session.commit()
+    changed = directory(**{"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json()[0]["consultation_fee"] == 700
+    etag = changed.headers["etag"]
+
+    make_user("doctor", full_name="Dr. Karim")
+    assert len(directory(**{"If-None-Match": etag}).json()) == 2
+
+def test_name_filters_are_cached_separately(make_user):
+    make_user("doctor", full_name="Dr. Rahman")
+    make_user("doctor", full_name="Dr. Karim")
+    assert [doc["full_name"] for doc in client.get("/api/v1/users/users/doctors", params={"name": "karim"}).json()] == ["Dr. Karim"]
+    assert len(directory().json()) == 2
+    # Same normalized filter, same entry
+    cache = get_directory_cache()
+    hits = cache.hits
+    client.get("/api/v1/users/users/doctors", params={"name": "  KARIM "})
+    assert cache.hits == hits + 1
+
+def test_cache_skips_bodies_read_before_a_change():
+    now = [0.0]
+    cache = DirectoryCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    version = cache.version
+    cache.bump()
+    cache.put("", version, b"[]")
+    assert cache.get("") is None
+
+    cache.put("a", cache.version, b"[1]")
+    cache.put("b", cache.version, b"[2]")
+    cache.put("c", cache.version, b"[3]")
+    assert cache.get("a") is None and cache.get("c").body == b"[3]"
+    now[0] = 11
+    assert cache.get("c") is None
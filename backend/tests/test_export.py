@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import os
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.main import app
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.core.config import settings
+from app.tasks import export
+from app.utils.export import EXPORT_COLUMNS
+
+client = TestClient(app)
+
+START = datetime(2030, 1, 1, 9)
+STATUSES = [AppointmentStatus.pending, AppointmentStatus.confirmed, AppointmentStatus.completed]
+
+@pytest.fixture
+def seeded(db_session, engine, monkeypatch):
+    # Several cursor batches and Parquet row groups per export
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 4)
+    monkeypatch.setattr(settings, "EXPORT_PARQUET_ROW_GROUP", 5)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"full_name": "Dr. Rahman", "email": "doc@example.com", "mobile_number": "+8801000000051",
+             "hashed_password": "x", "user_type": "doctor"},
+            {"full_name": "Nusrat, \"Nu\"", "email": "pat@example.com", "mobile_number": "+8801000000052",
+             "hashed_password": "x", "user_type": "patient"},
+            {"full_name": "Admin", "email": "admin@example.com", "mobile_number": "+8801000000053",
+             "hashed_password": "x", "user_type": "admin"},
+        ])
+        conn.execute(insert(Appointment), [
+            {"doctor_id": 1, "patient_id": 2, "appointment_time": START + timedelta(days=i),
+             "status": STATUSES[i % 3], "notes": "line one\nline two" if i == 0 else None}
+            for i in range(12)
+        ])
+    return {"doctor": 1, "admin": 3}
+
+@pytest.fixture
+def export_as(auth_headers):
+    return lambda user_id, **params: client.get(
+        "/api/v1/appointment/appointments/export", params=params, headers=auth_headers(user_id)
+    )
+
+def test_csv_export(seeded, export_as):
+    response = export_as(seeded["admin"], format="csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="appointments.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == EXPORT_COLUMNS
+    assert [int(row["id"]) for row in rows] == list(range(1, 13))
+    assert rows[0] == {
+        "id": "1", "appointment_time": "2030-01-01T09:00:00", "status": "Pending", "doctor_id": "1",
+        "doctor_name": "Dr. Rahman", "patient_id": "2", "patient_name": 'Nusrat, "Nu"', "notes": "line one\nline two"
+    }
+
+def test_ndjson_export_filters(seeded, export_as):
+    response = export_as(seeded["admin"], format="ndjson", status="Confirmed",
+                         date_from="2030-01-02", date_to="2030-01-08")
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    # date_to includes the whole day (the appointment at 09:00 on the 8th)
+    assert [(row["id"], row["appointment_time"], row["status"]) for row in rows] == [
+        (2, "2030-01-02T09:00:00", "Confirmed"), (5, "2030-01-05T09:00:00", "Confirmed"),
+        (8, "2030-01-08T09:00:00", "Confirmed"),
+    ]
+
+def test_parquet_export_in_row_groups(seeded, export_as):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = export_as(seeded["admin"], format="parquet")
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_rows == 12
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column_names == EXPORT_COLUMNS
+    assert table.column("id").to_pylist() == list(range(1, 13))
+    assert table.column("appointment_time").to_pylist()[1] == START + timedelta(days=1)
+
+def test_export_is_admin_only(seeded, export_as, auth_headers):
+    assert export_as(seeded["doctor"]).status_code == 403
+    response = client.post("/api/v1/appointment/appointments/export", headers=auth_headers(seeded["doctor"]))
+    assert response.status_code == 403
+
+def test_export_task_writes_a_file(seeded, session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "SessionLocal", session_factory)
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    result = export.export_appointments("ndjson", date_from="2030-01-10", status="Completed")
+    assert result["rows"] == 1
+    assert os.listdir(tmp_path) == [os.path.basename(result["path"])]
+    with open(result["path"]) as f:
+        assert [json.loads(line)["id"] for line in f] == [12]
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from datetime import date, datetime, time
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app.main import app
+from app.db.database import ThreadedSession
+from app.db.models.availability import DoctorSlot
+from app.core.config import settings
+from app.db.crud.availability import build_slots, find_free_slots
+
+client = TestClient(app)
+
+# 2030-01-07 is a Monday
+MONDAY = "2030-01-07"
+
+@pytest.fixture
+def add_doctor(make_user):
+    return lambda timeslots, **extra: make_user(
+        "doctor", available_timeslots=timeslots, slots=build_slots(timeslots), **extra
+    ).id
+
+def search(**params):
+    response = client.get("/api/v1/users/users/doctors/free-slots", params={"date_from": MONDAY, **params})
+    assert response.status_code == 200
+    return {doctor["id"]: doctor for doctor in response.json()}
+
+def test_free_slots_exclude_booked_and_apply_filters(add_doctor, make_user, auth_headers):
+    dhaka = add_doctor("Mon 10:00-11:00, Mon 11:00-12:00, Tue 09:00-10:00", division="Dhaka", consultation_fee=500)
+    khulna = add_doctor("Wed 10:00-11:00", division="Khulna", consultation_fee=1500)
+
+    response = client.post(
+        "/api/v1/appointment/appointments",
+        json={"doctor_id": dhaka, "appointment_time": f"{MONDAY}T10:30:00"},
+        headers=auth_headers(make_user("patient"))
+    )
+    assert response.status_code == 200
+
+    found = search(days=7)
+    assert found[dhaka]["slots"] == [
+        {"start": "2030-01-07T11:00:00", "end": "2030-01-07T12:00:00", "seats_left": 1},
+        {"start": "2030-01-08T09:00:00", "end": "2030-01-08T10:00:00", "seats_left": 1},
+    ]
+    assert found[dhaka]["division"] == "Dhaka"
+    assert [slot["start"] for slot in found[khulna]["slots"]] == ["2030-01-09T10:00:00"]
+
+    assert set(search(days=7, division="Khulna")) == {khulna}
+    assert set(search(days=7, max_fee=1000)) == {dhaka}
+    assert len(search(days=14, per_doctor=1)[dhaka]["slots"]) == 1
+    # Monday only: Khulna's doctor has nothing open and is left out
+    assert set(search(days=1)) == {dhaka}
+
+def test_doctors_booked_up_early_are_searched_further(add_doctor, make_user, auth_headers):
+    # Daily slots: the first window is two days, both of them booked for `busy`
+    busy = add_doctor("10:00-11:00")
+    idle = add_doctor("10:00-11:00")
+    headers = auth_headers(make_user("patient"))
+    for day in ["2030-01-07", "2030-01-08"]:
+        response = client.post("/api/v1/appointment/appointments",
+                               json={"doctor_id": busy, "appointment_time": f"{day}T10:00:00"}, headers=headers)
+        assert response.status_code == 200
+
+    found = search(days=14, per_doctor=1)
+    assert [slot["start"] for slot in found[busy]["slots"]] == ["2030-01-09T10:00:00"]
+    assert [slot["start"] for slot in found[idle]["slots"]] == ["2030-01-07T10:00:00"]
+
+def test_new_doctor_shows_up_without_restart(add_doctor):
+    add_doctor("Mon 10:00-11:00")
+    assert len(search(days=1)) == 1
+    add_doctor("Mon 10:00-11:00")
+    assert len(search(days=1)) == 2
+
+def test_slots_added_by_other_processes_show_up_after_the_recheck(engine, add_doctor, monkeypatch):
+    doctor = add_doctor("Mon 10:00-11:00")
+    assert len(search(days=1)[doctor]["slots"]) == 1
+    # Written outside this process's sessions: no commit drops the index
+    with engine.begin() as conn:
+        conn.execute(insert(DoctorSlot).values(doctor_id=doctor, weekday=0, start_time=time(12), end_time=time(13),
+                                               capacity=1))
+    assert len(search(days=1)[doctor]["slots"]) == 1
+    monkeypatch.setattr(settings, "SLOT_INDEX_RECHECK_SECONDS", 0)
+    assert len(search(days=1)[doctor]["slots"]) == 2
+
+def test_slots_already_started_today_are_skipped(db_session, add_doctor):
+    doctor = add_doctor("Mon 09:00-10:00, Mon 15:00-16:00")
+    free = asyncio.run(find_free_slots(ThreadedSession(db_session), [doctor], date(2030, 1, 7), 1,
+                                       now=datetime(2030, 1, 7, 12, 0), per_doctor=10))
+    assert [slot["start"] for slot in free[doctor]] == ["2030-01-07T15:00:00"]
@@ -0,0 +1,80 @@
+import asyncio
+import re
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.db.crud.availability import build_slots
+from app.core.metrics import HTTPMetrics, MetricsMiddleware, get_http_metrics
+
+client = TestClient(app)
+
+SLOTS_ROUTE = "/api/v1/users/users/doctors/{doctor_id}/slots"
+
+@pytest.fixture
+def doctor_id(make_user):
+    return make_user("doctor", full_name="Dr. Metrics", available_timeslots="Mon 10:00-12:00",
+                     slots=build_slots("Mon 10:00-12:00")).id
+
+def scrape() -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+def test_requests_are_recorded_per_route_template(db_session, doctor_id):
+    responses = [client.get(f"/api/v1/users/users/doctors/{id}/slots") for id in (doctor_id, doctor_id, 999999)]
+    assert responses[2].json() == []
+    client.get("/no/such/path")
+    samples = scrape()
+
+    labels = f'method="GET",route="{SLOTS_ROUTE}"'
+    assert samples[f'http_requests_total{{{labels},status="200"}}'] == 3
+    assert samples[f'http_request_duration_seconds_count{{{labels}}}'] == 3
+    assert samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 3
+    assert samples[f'http_response_size_bytes_sum{{{labels}}}'] == sum(len(r.content) for r in responses)
+    # One SELECT per request, timed
+    assert samples[f'http_request_db_statements_sum{{{labels}}}'] == 3
+    assert samples[f'http_request_db_statements_bucket{{{labels},le="1"}}'] == 3
+    assert samples[f'http_request_db_duration_seconds_sum{{{labels}}}'] > 0
+    # Unknown paths share one label instead of one series each
+    assert samples['http_requests_total{method="GET",route="unmatched",status="404"}'] == 1
+    # The scrape itself is in flight while rendering; nothing else is
+    assert samples['http_requests_in_flight{method="GET"}'] == 1
+    assert 'db_pool_checkouts_total{pool="sync"}' in samples
+
+def test_requests_without_queries(db_session):
+    client.get("/api/v1/users/test")
+    samples = scrape()
+    labels = 'method="GET",route="/api/v1/users/test"'
+    assert samples[f'http_request_db_statements_sum{{{labels}}}'] == 0
+    assert samples[f'http_request_db_statements_bucket{{{labels},le="0"}}'] == 1
+
+def test_histogram_buckets_are_cumulative():
+    metrics = HTTPMetrics()
+    for seconds in (0.001, 0.02, 0.02, 3.0, 60.0):
+        metrics.latency.observe(("GET", "/x"), seconds)
+    lines = [line for line in metrics.latency.render() if line.startswith("http_request_duration_seconds_bucket")]
+    counts = {re.search(r'le="([^"]+)"', line).group(1): int(line.rsplit(" ", 1)[1]) for line in lines}
+    assert counts["0.005"] == 1
+    assert counts["0.025"] == 3
+    assert counts["2.5"] == 3
+    assert counts["5.0"] == 4
+    assert counts["+Inf"] == 5
+    assert metrics.latency.sum(("GET", "/x")) == pytest.approx(63.041)
+
+def test_failed_requests_count_as_500():
+    metrics = HTTPMetrics()
+
+    async def broken(scope, receive, send):
+        raise RuntimeError("boom")
+
+    scope = {"type": "http", "method": "POST", "path": "/x"}
+    with pytest.raises(RuntimeError):
+        asyncio.run(MetricsMiddleware(broken, metrics)(scope, None, None))
+    assert metrics.requests.value(("POST", "unmatched", 500)) == 1
+    assert metrics.in_flight.value(("POST",)) == 0
@@ -0,0 +1,147 @@
+import smtplib
+from email import message_from_bytes
+from email.header import decode_header, make_header
+import pytest
+from app.core import mail
+from app.core.mail import FileBackend, MemoryBackend, SMTPBackend, build_message
+
+
+class FakeSMTP:
+    """Stands in for smtplib.SMTP; ``outcomes`` scripts what each send_message does."""
+    instances = []
+    outcomes = []
+    starttls_error = None
+
+    def __init__(self, host, port, timeout=None):
+        self.delivered = []
+        self.noops = 0
+        self.alive = True
+        self.logged_in = None
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        if FakeSMTP.starttls_error is not None:
+            raise FakeSMTP.starttls_error
+
+    def login(self, user, password):
+        self.logged_in = user
+
+    def noop(self):
+        self.noops += 1
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        return 250, b"OK"
+
+    def send_message(self, message):
+        outcome = FakeSMTP.outcomes.pop(0) if FakeSMTP.outcomes else None
+        if outcome is not None:
+            raise outcome
+        self.delivered.append(message["To"])
+
+    def quit(self):
+        self.alive = False
+
+    def close(self):
+        self.alive = False
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances, FakeSMTP.outcomes, FakeSMTP.starttls_error = [], [], None
+    monkeypatch.setattr(smtplib, "SMTP", FakeSMTP)
+    return FakeSMTP
+
+@pytest.fixture
+def backend(fake_smtp):
+    now = [0.0]
+    sleeps = []
+    backend = SMTPBackend("smtp.example.com", 587, security="none", username="me@example.com", password="secret",
+                          keepalive=30, retries=2, backoff=0.5, clock=lambda: now[0], sleep=sleeps.append)
+    backend.now, backend.sleeps = now, sleeps
+    return backend
+
+def batch(*recipients):
+    return [build_message(to, "🔔 Appointment Reminder", "Hello") for to in recipients]
+
+def delivered(fake_smtp):
+    return [to for server in fake_smtp.instances for to in server.delivered]
+
+def test_connections_are_reused_across_batches(backend, fake_smtp):
+    assert backend.send_many(batch("a@x.com", "b@x.com")).sent == 2
+    backend.send(batch("c@x.com")[0])
+    assert backend.connects == 1 and fake_smtp.instances[0].logged_in == "me@example.com"
+    assert delivered(fake_smtp) == ["a@x.com", "b@x.com", "c@x.com"]
+
+def test_idle_connection_is_probed_and_replaced_when_dead(backend, fake_smtp):
+    backend.send_many(batch("a@x.com"))
+    backend.now[0] = 10
+    backend.send_many(batch("b@x.com"))
+    assert fake_smtp.instances[0].noops == 0
+
+    backend.now[0] = 100
+    fake_smtp.instances[0].alive = False
+    backend.send_many(batch("c@x.com"))
+    assert fake_smtp.instances[0].noops == 1
+    assert backend.connects == 2 and fake_smtp.instances[1].delivered == ["c@x.com"]
+
+def test_lost_connection_is_retried_with_backoff(backend, fake_smtp):
+    fake_smtp.outcomes = [None, smtplib.SMTPServerDisconnected("gone"), OSError("reset")]
+    report = backend.send_many(batch("a@x.com", "b@x.com", "c@x.com"))
+    assert report.sent == 3 and report.failed == []
+    assert delivered(fake_smtp) == ["a@x.com", "b@x.com", "c@x.com"]
+    assert backend.sleeps == [0.5, 1.0] and backend.connects == 3
+
+def test_permanent_failures_are_reported_not_retried(backend, fake_smtp):
+    refused = smtplib.SMTPRecipientsRefused({"a@x.com": (550, b"No such user")})
+    fake_smtp.outcomes = [refused, smtplib.SMTPDataError(451, b"Try later")]
+    report = backend.send_many(batch("a@x.com", "b@x.com"))
+    assert report.sent == 1 and report.failed == [("a@x.com", refused)]
+    # The 4xx was retried on the same connection
+    assert backend.sleeps == [0.5] and backend.connects == 1
+
+def test_retries_give_up(backend, fake_smtp):
+    fake_smtp.outcomes = [OSError("down")] * 3
+    with pytest.raises(OSError):
+        backend.send(batch("a@x.com")[0])
+    assert backend.sleeps == [0.5, 1.0]
+
+def test_connection_setup_errors_are_reported_not_raised(fake_smtp):
+    fake_smtp.starttls_error = smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server.")
+    sleeps = []
+    backend = SMTPBackend("smtp.example.com", 587, security="starttls", username="me@example.com",
+                          password="secret", retries=2, sleep=sleeps.append)
+    report = backend.send_many(batch("a@x.com", "b@x.com"))
+    assert report.sent == 0
+    assert [(to, type(error)) for to, error in report.failed] == [
+        ("a@x.com", smtplib.SMTPNotSupportedError), ("b@x.com", smtplib.SMTPNotSupportedError)
+    ]
+    assert sleeps == [] and all(not server.alive for server in fake_smtp.instances)
+
+def test_file_and_memory_backends(tmp_path):
+    FileBackend(str(tmp_path)).send_many(batch("a@x.com", "b@x.com"))
+    files = sorted(tmp_path.iterdir())
+    assert len(files) == 2
+    message = message_from_bytes(files[0].read_bytes())
+    assert message["To"] == "a@x.com"
+    assert str(make_header(decode_header(message["Subject"]))) == "🔔 Appointment Reminder"
+
+    memory = MemoryBackend()
+    mail.set_mail_backend(memory)
+    try:
+        mail.send_email("c@x.com", "Hi", "Body")
+    finally:
+        mail.set_mail_backend(None)
+    assert [m["To"] for m in memory.outbox] == ["c@x.com"]
+
+def test_every_attempt_takes_a_rate_limit_token(fake_smtp):
+    class CountingLimiter:
+        acquired = 0
+
+        def acquire(self):
+            self.acquired += 1
+
+    limiter = CountingLimiter()
+    backend = SMTPBackend("smtp.example.com", 587, security="none", retries=2, limiter=limiter, sleep=lambda s: None)
+    fake_smtp.outcomes = [None, OSError("reset")]
+    assert backend.send_many(batch("a@x.com", "b@x.com")).sent == 2
+    assert limiter.acquired == 3
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import DateTime, inspect
+from app.db.database import Base
+from app.db.models.appointment import Appointment
+from app.db import migrate
+
+INDEXES = {"ix_appointments_doctor_time", "ix_appointments_patient_time",
+           "ix_appointments_status_time", "ix_appointments_time"}
+
+@pytest.fixture(scope="function")
+def legacy_db(engine):
+    # A database created before the appointment indexes and migration tracking existed
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for name in INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+        conn.exec_driver_sql("ALTER TABLE reminder_ledger DROP COLUMN failed_at")
+    yield
+    Base.metadata.drop_all(bind=engine)
+    migrate.schema_migrations.drop(bind=engine, checkfirst=True)
+
+def index_names(engine):
+    return {index["name"] for index in inspect(engine).get_indexes("appointments")}
+
+def test_upgrade_applies_pending_migrations_once(legacy_db, engine, session_factory):
+    assert not INDEXES & index_names(engine)
+    assert migrate.pending(engine) == [version for version, _ in migrate.MIGRATIONS]
+
+    applied = migrate.upgrade(bind=engine, session_factory=session_factory)
+    assert applied == [version for version, _ in migrate.MIGRATIONS]
+    assert INDEXES <= index_names(engine)
+    columns = {column["name"]: column["type"] for column in inspect(engine).get_columns("reminder_ledger")}
+    assert isinstance(columns["failed_at"], DateTime)
+
+    assert migrate.pending(engine) == []
+    assert migrate.upgrade(bind=engine, session_factory=session_factory) == []
+
+def test_stamp_marks_a_fresh_schema_current(legacy_db, engine):
+    migrate.stamp(engine)
+    assert migrate.pending(engine) == []
+    # Stamping records versions only; it does not run them
+    assert not INDEXES & index_names(engine)
+
+def test_model_declares_the_indexes():
+    assert INDEXES <= {index.name for index in Appointment.__table__.indexes}
@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.main import app
+from app.db.models.appointment import Appointment
+from app.db.models.search import UserNameGram, name_grams
+
+client = TestClient(app)
+
+def search(q, **params):
+    response = client.get("/api/v1/users/users/doctors/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def names(page):
+    return [item["full_name"] for item in page["items"]]
+
+def test_grams_cover_every_character():
+    assert name_grams("Rob") == {" ro", "rob", "ob ", "b  "}
+    assert name_grams("  Anna   BELL ") == name_grams("anna bell")
+
+def test_substring_search_is_ranked_and_paginated(make_user):
+    for full_name in ["Sara Rahman", "Rahman Ali", "Abdur Rahmanullah", "Rahman", "Karim Uddin"]:
+        make_user("doctor", full_name=full_name)
+    make_user("patient", full_name="Rahman Patient")
+
+    # Whole name, then name prefix, then word prefix; shorter names first
+    assert names(search("RAHMAN")) == ["Rahman", "Rahman Ali", "Sara Rahman", "Abdur Rahmanullah"]
+    assert names(search("hmanul")) == ["Abdur Rahmanullah"]
+    # Shorter than a gram: a prefix scan of the index
+    assert names(search("ud")) == ["Karim Uddin"]
+    assert names(search("n")) and "Karim Uddin" in names(search("n", limit=100))
+    assert search("zzz")["items"] == []
+
+    first = search("rahman", limit=3)
+    assert len(first["items"]) == 3 and first["next_offset"] == 3
+    rest = search("rahman", limit=3, offset=first["next_offset"])
+    assert names(rest) == ["Abdur Rahmanullah"] and rest["next_offset"] is None
+
+def test_grams_must_be_contiguous_and_wildcards_are_literal(make_user):
+    make_user("doctor", full_name="Nana Ana")
+    make_user("doctor", full_name="100% Care")
+    # Holds both grams of "anan" ("ana", "nan"), but not the term itself
+    assert search("anan")["items"] == []
+    assert names(search("0%")) == ["100% Care"]
+    assert search("a_n")["items"] == []
+
+def test_rename_reindexes(db_session, make_user):
+    user = make_user("doctor", full_name="Old Name")
+    user.full_name = "New Name"
+    db_session.commit()
+    assert search("old")["items"] == []
+    assert names(search("new")) == ["New Name"]
+    grams = set(db_session.scalars(select(UserNameGram.gram).where(UserNameGram.user_id == user.id)))
+    assert grams == name_grams("New Name")
+
+def test_get_all_doctors_name_filter(make_user):
+    make_user("doctor", full_name="Dr. Farhana Islam")
+    make_user("doctor", full_name="Dr. Islam Khan")
+    make_user("doctor", full_name="Dr. Tanvir")
+    response = client.get("/api/v1/users/users/doctors", params={"name": "islam"})
+    assert [doctor["full_name"] for doctor in response.json()] == ["Dr. Farhana Islam", "Dr. Islam Khan"]
+
+def test_appointments_filter_by_doctor_and_patient_name(db_session, make_user, auth_headers):
+    smith = make_user("doctor", full_name="Dr. Smith")
+    jones = make_user("doctor", full_name="Dr. Jones")
+    alice = make_user("patient", full_name="Alice Smith")
+    bob = make_user("patient", full_name="Bob")
+    admin = make_user("admin", full_name="Admin")
+    start = datetime(2030, 1, 1, 10)
+    for i, (doctor, patient) in enumerate([(smith, alice), (smith, bob), (jones, alice), (jones, bob)]):
+        db_session.add(Appointment(doctor_id=doctor.id, patient_id=patient.id,
+                                   appointment_time=start + timedelta(days=i)))
+    db_session.commit()
+
+    def pairs(**params):
+        response = client.get("/api/v1/appointment/appointments", params=params,
+                              headers=auth_headers(admin))
+        assert response.status_code == 200
+        return {(item["doctor"]["full_name"], item["patient"]["full_name"]) for item in response.json()["items"]}
+
+    # "smith" matches a doctor and a patient: each filter applies to its own party
+    assert pairs(doctor_name="smith") == {("Dr. Smith", "Alice Smith"), ("Dr. Smith", "Bob")}
+    assert pairs(patient_name="smith") == {("Dr. Smith", "Alice Smith"), ("Dr. Jones", "Alice Smith")}
+    assert pairs(doctor_name="jones", patient_name="bob") == {("Dr. Jones", "Bob")}
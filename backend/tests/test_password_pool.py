@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from app.core.security import PasswordHashPool, hash_password, verify_password
+
+def test_pool_hashes_off_the_caller():
+    pool = PasswordHashPool(workers=1, max_queue=0)
+    hashed = asyncio.run(pool.run_async(hash_password, "Str0ngP@ss"))
+    assert pool.run(verify_password, "Str0ngP@ss", hashed)
+    assert pool.pending == 0
+    pool.shutdown()
+
+def test_pool_rejects_when_saturated():
+    pool = PasswordHashPool(workers=1, max_queue=1)
+    release = threading.Event()
+    running = pool.submit(release.wait)
+    queued = pool.submit(release.wait)
+
+    with pytest.raises(HTTPException) as exc_info:
+        pool.submit(release.wait)
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+    assert pool.rejected == 1
+
+    release.set()
+    running.result()
+    queued.result()
+    assert pool.pending == 0
+    # Capacity is available again once work drains
+    pool.run(len, "ok")
+    pool.shutdown()
+
+def test_map_waits_for_capacity_instead_of_rejecting():
+    pool = PasswordHashPool(workers=2, max_queue=0)
+    release = threading.Event()
+    blocked = pool.submit(release.wait)
+    threading.Timer(0.05, release.set).start()
+    # Only one worker is free at first; the batch neither fails nor takes more than its share
+    assert pool.map(len, ["a", "bb", "ccc", "dddd"]) == [1, 2, 3, 4]
+    assert blocked.result() is True
+    assert pool.rejected == 0 and pool.pending == 0
+    pool.shutdown()
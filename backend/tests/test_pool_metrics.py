@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from app.main import app
+from app.db.pool import PoolMetrics, instrumented
+
+client = TestClient(app)
+
+def test_checkout_wait_and_timeouts_are_counted(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=instrumented(QueuePool, metrics),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    held = engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+
+    stats = metrics.snapshot(engine.pool)
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["checkedout"] == 1
+    assert stats["wait_ms_max"] >= 50
+
+    held.close()
+    engine.dispose()
+
+def test_pool_metrics_endpoint():
+    response = client.get("/api/v1/metrics/db-pool")
+    assert response.status_code == 200
+    assert "timeouts" in response.json()["sync"]
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.main import app
+from app.db.models.user import User
+from app.core.principal import (
+    LocalPrincipalCache,
+    Principal,
+    RedisPrincipalCache,
+    get_principal_cache,
+    set_principal_cache,
+)
+
+client = TestClient(app)
+
+class FakeRedis:
+    """Stands in for redis.Redis with just the commands the cache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+@pytest.fixture(scope="function", params=["local", "redis"])
+def cache(request, db_session):
+    previous_cache = get_principal_cache()
+    cache = LocalPrincipalCache() if request.param == "local" else RedisPrincipalCache(FakeRedis())
+    set_principal_cache(cache)
+    yield cache
+    set_principal_cache(previous_cache)
+
+def users_queries_during(engine, func):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    return [statement for statement in statements if "FROM users" in statement]
+
+def test_cache_hit_skips_users_query(cache, engine, make_user, auth_headers):
+    headers = auth_headers(make_user("patient"))
+    list_appointments = lambda: client.get("/api/v1/appointment/appointments", headers=headers)
+
+    assert len(users_queries_during(engine, list_appointments)) == 1
+    assert users_queries_during(engine, list_appointments) == []
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+def test_cache_invalidated_on_user_update(cache, session_factory, make_user):
+    user_id = make_user("patient", email="cached@example.com").id
+    cache.set(Principal(id=user_id, email="cached@example.com", user_type="patient"))
+
+    db = session_factory()
+    user = db.query(User).filter(User.id == user_id).first()
+    user.email = "rolled-back@example.com"
+    db.flush()
+    db.rollback()
+    # A rolled-back change is forgotten, not applied by the next commit
+    db.commit()
+    assert cache.get(user_id) is not None
+
+    user = db.query(User).filter(User.id == user_id).first()
+    user.email = "renamed@example.com"
+    db.flush()
+    # Not dropped until the change is committed
+    assert cache.get(user_id) is not None
+    db.commit()
+    db.close()
+
+    assert cache.get(user_id) is None
+
+def test_local_cache_is_bounded_and_expires():
+    now = [0.0]
+    cache = LocalPrincipalCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    for user_id in (1, 2, 3):
+        cache.set(Principal(id=user_id, email=f"{user_id}@example.com", user_type="patient"))
+
+    assert cache.get(1) is None  # least recently used, evicted
+    assert cache.get(3).id == 3
+    now[0] = 11
+    assert cache.get(3) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1}
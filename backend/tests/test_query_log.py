@@ -0,0 +1,88 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.main import app
+from app.db import query_log
+from app.db.models.user import User
+from app.db.crud.availability import build_slots
+from app.db.crud.user import get_user_by_email
+from app.core.config import settings
+
+client = TestClient(app)
+
+SLOTS_ROUTE = "/api/v1/users/users/doctors/{doctor_id}/slots"
+
+@pytest.fixture
+def doctor_id(make_user):
+    return make_user("doctor", full_name="Dr. Query", email="query@example.com",
+                     available_timeslots="Mon 10:00-12:00", slots=build_slots("Mon 10:00-12:00")).id
+
+@pytest.fixture
+def warnings(caplog):
+    caplog.set_level(logging.WARNING, logger=query_log.logger.name)
+    return lambda: [record.getMessage() for record in caplog.records if record.name == query_log.logger.name]
+
+def test_slow_queries_are_logged_with_route_and_params(db_session, doctor_id, warnings, monkeypatch):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 1e-6)
+    client.get(f"/api/v1/users/users/doctors/{doctor_id}/slots")
+    slow = [message for message in warnings() if message.startswith("Slow query")]
+    assert len(slow) == 1
+    assert f"in GET {SLOTS_ROUTE}: SELECT" in slow[0]
+    assert f"params ({doctor_id}," in slow[0]
+
+    monkeypatch.setattr(settings, "SLOW_QUERY_LOG_PARAMS", False)
+    monkeypatch.setattr(settings, "QUERY_LOG_ORIGIN", True)
+    get_user_by_email(db_session, "query@example.com")
+    assert "no request or task" in warnings()[-1]
+    assert "params" not in warnings()[-1]
+    assert warnings()[-1].endswith("(from app/db/crud/user.py:8 in get_user_by_email)")
+
+def test_repeated_statement_shapes_are_flagged(db_session, doctor_id, warnings, monkeypatch):
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 3)
+    with query_log.watch("task demo") as watch:
+        for id in (doctor_id, doctor_id + 1, doctor_id + 2):
+            db_session.execute(select(User.email).where(User.id == id))
+        # IN-lists of any length share one shape
+        db_session.execute(select(User.email).where(User.id.in_([1, 2])))
+        db_session.execute(select(User.email).where(User.id.in_([1, 2, 3])))
+    assert watch.statements == 5
+    assert sorted(watch.shapes.values()) == [2, 3]
+    [message] = warnings()
+    assert message.startswith("Possible N+1 in task demo: 3 x SELECT users.email")
+
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 0)
+    with query_log.watch("task demo"):
+        for _ in range(5):
+            db_session.execute(select(User.email))
+    assert len(warnings()) == 1
+
+def test_requests_are_watched_without_metrics(session_factory, doctor_id, warnings, monkeypatch):
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 3)
+    # An app with only the query watch, as with HTTP_METRICS off
+    bare = FastAPI()
+    bare.add_middleware(query_log.QueryWatchMiddleware)
+
+    @bare.get("/doctors/{doctor_id}/emails")
+    def emails(doctor_id: int):
+        with session_factory() as db:
+            return [db.scalar(select(User.email).where(User.id == doctor_id)) for _ in range(3)]
+
+    assert TestClient(bare).get(f"/doctors/{doctor_id}/emails").json() == ["query@example.com"] * 3
+    [message] = warnings()
+    assert message.startswith("Possible N+1 in GET /doctors/{doctor_id}/emails: 3 x SELECT users.email")
+
+def test_query_budget_fixture(doctor_id, query_budget):
+    with query_budget(1) as record:
+        client.get(f"/api/v1/users/users/doctors/{doctor_id}/slots")
+    assert len(record) == 1
+    with pytest.raises(pytest.fail.Exception, match=r"ran 2 SQL statements, over its budget of 1:\n  2 x SELECT"):
+        with query_budget(1):
+            client.get(f"/api/v1/users/users/doctors/{doctor_id}/slots")
+            client.get(f"/api/v1/users/users/doctors/{doctor_id}/slots")
+
+@pytest.mark.query_budget(2)
+def test_slots_take_one_statement_per_request(doctor_id):
+    for _ in range(2):
+        assert client.get(f"/api/v1/users/users/doctors/{doctor_id}/slots").status_code == 200
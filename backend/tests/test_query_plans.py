@@ -0,0 +1,136 @@
+"""
+Query-plan regression tests for the hot appointment queries.
+
+The real code paths (list_appointments, the reminder and report tasks) run
+against a seeded, ANALYZEd SQLite database while their SQL is captured; each
+statement reading ``appointments`` is then EXPLAINed and must search an
+index rather than scan the table (or a whole index), and must not sort its
+result in a temporary b-tree.
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from app.main import app
+from app.db.database import Base, get_db
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.core.principal import get_principal_cache
+from app.core.mail import SendReport
+from app.tasks import reminders, report
+from app.utils.pagination import encode_cursor
+
+client = TestClient(app)
+
+DOCTORS, PATIENTS, APPOINTMENTS = 20, 200, 4000
+# Walking the whole table or a whole index, or sorting the whole result
+FULL_SCAN = re.compile(r"^SCAN appointments\b")
+ORDERED_SCAN = re.compile(r"^SCAN appointments USING (COVERING )?INDEX ix_appointments_time$")
+# (count(DISTINCT) also uses a temp b-tree, but per group: not a sort of the result)
+SORT = re.compile(r"USE TEMP B-TREE FOR (?!count\(DISTINCT\))")
+
+@pytest.fixture(scope="module")
+def seeded(engine, session_factory):
+    # Seeded once for the module, so it sets the database up itself rather than through db_session
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"full_name": f"User {i}", "email": f"user{i}@example.com", "mobile_number": f"+88{i:011d}",
+             "hashed_password": "x", "user_type": "doctor" if i < DOCTORS else "patient"}
+            for i in range(DOCTORS + PATIENTS)
+        ] + [{"full_name": "Admin", "email": "admin@example.com", "mobile_number": "+8809999999999",
+              "hashed_password": "x", "user_type": "admin"}])
+        # Never Confirmed/Completed this month: the report task only has to query, not total
+        start = datetime.utcnow() - timedelta(days=400)
+        statuses = [AppointmentStatus.pending, AppointmentStatus.cancelled]
+        conn.execute(insert(Appointment), [
+            {"doctor_id": 1 + i % DOCTORS, "patient_id": 1 + DOCTORS + i % PATIENTS,
+             "appointment_time": start + timedelta(hours=3 * i), "status": statuses[i % 2]}
+            for i in range(APPOINTMENTS)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+    yield {"doctor": 1, "patient": DOCTORS + 1, "admin": DOCTORS + PATIENTS + 1}
+
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS sqlite_stat1")
+    get_principal_cache().clear()
+
+@contextmanager
+def captured_statements(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+def assert_indexed(engine, statements, allow_ordered_scan=False):
+    """
+    ``allow_ordered_scan``: an unfiltered listing may walk the appointment_time
+    index newest first, since its LIMIT stops the walk after one page.
+    """
+    checked = 0
+    for statement, parameters in statements:
+        if not re.search(r"\b(FROM|JOIN) appointments\b", statement):
+            continue
+        with engine.connect() as conn:
+            plan = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        for step in plan:
+            assert not SORT.search(step), f"{plan}\n{statement}"
+            if FULL_SCAN.search(step):
+                assert allow_ordered_scan and ORDERED_SCAN.search(step), f"{plan}\n{statement}"
+        checked += 1
+    assert checked, "no appointment query was captured"
+
+@pytest.mark.parametrize("role, params", [
+    ("doctor", {}),
+    ("doctor", {"status": "Pending"}),
+    ("doctor", {"date_from": "2020-01-01", "date_to": "2040-01-01"}),
+    ("doctor", {"cursor": encode_cursor(datetime(2040, 1, 1), 10**9)}),
+    ("patient", {}),
+    ("admin", {}),
+    ("admin", {"status": "Cancelled"}),
+])
+def test_list_appointments_uses_an_index(seeded, engine, auth_headers, role, params):
+    with captured_statements(engine) as statements:
+        response = client.get("/api/v1/appointment/appointments", params=params, headers=auth_headers(seeded[role]))
+    assert response.status_code == 200
+    assert_indexed(engine, statements, allow_ordered_scan=role == "admin" and not params)
+
+def test_reminder_query_uses_an_index(seeded, engine, session_factory, monkeypatch):
+    monkeypatch.setattr(reminders, "SessionLocal", session_factory)
+    monkeypatch.setattr(reminders, "send_many", lambda messages: SendReport())
+    now = datetime.utcnow()
+    with captured_statements(engine) as statements:
+        reminders.send_appointment_reminders()
+        reminders.send_reminder_shard(0, now.isoformat(), None, [(now + timedelta(hours=12)).isoformat(), 10**9])
+    assert_indexed(engine, statements)
+
+def test_report_query_uses_an_index(seeded, engine, session_factory, monkeypatch):
+    monkeypatch.setattr(report, "SessionLocal", session_factory)
+    monkeypatch.setattr(report, "send_many", lambda messages: SendReport())
+    with captured_statements(engine) as statements:
+        report.generate_monthly_doctor_report()
+    assert_indexed(engine, statements)
@@ -0,0 +1,60 @@
+from app.core.ratelimit import LocalRateLimiter, RedisRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+class FakeRedis:
+    def __init__(self, down=False):
+        self.counts = {}
+        self.down = down
+
+    def incr(self, key):
+        if self.down:
+            raise ConnectionError("Redis is down")
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return self.counts[key]
+
+    def expire(self, key, seconds):
+        pass
+
+
+def test_local_limiter_allows_a_burst_then_paces():
+    clock = FakeClock()
+    limiter = LocalRateLimiter(5, clock=clock, sleep=clock.sleep)
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.sleeps == []
+    for _ in range(5):
+        limiter.acquire()
+    assert clock.sleeps == [0.2] * 5
+
+def test_redis_limiter_is_shared_between_processes():
+    clock = FakeClock(now=1000.5)
+    redis = FakeRedis()
+    workers = [RedisRateLimiter(redis, 3, clock=clock, sleep=clock.sleep) for _ in range(2)]
+    for i in range(3):
+        workers[i % 2].acquire()
+    assert clock.sleeps == []
+    # The fourth acquisition in this second, from either worker, waits for the next one
+    workers[1].acquire()
+    assert clock.sleeps == [0.5]
+    assert redis.counts == {"mail-rate:1000": 4, "mail-rate:1001": 1}
+
+def test_redis_outage_falls_back_to_a_local_limit():
+    clock = FakeClock()
+    limiter = RedisRateLimiter(FakeRedis(down=True), 2, clock=clock, sleep=clock.sleep,
+                               fallback=LocalRateLimiter(2, clock=clock, sleep=clock.sleep))
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.sleeps == [0.5]
@@ -0,0 +1,199 @@
+import smtplib
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus, ReminderLedger
+from app.core.config import settings
+from app.core.mail import MemoryBackend, set_mail_backend
+from app.tasks import reminders
+from app.celery_app import celery
+
+class FlakyMail(MemoryBackend):
+    """Refuses the given recipients with ``code``, delivers the rest."""
+
+    def __init__(self, refuse=(), code=451):
+        super().__init__()
+        self.refuse = set(refuse)
+        self.code = code
+        self.batches = 0
+
+    def send_many(self, messages):
+        self.batches += 1
+        return super().send_many(messages)
+
+    def send(self, message):
+        if message["To"] in self.refuse:
+            raise smtplib.SMTPRecipientsRefused({message["To"]: (self.code, b"Try again later")})
+        super().send(message)
+
+
+class Clock:
+    """Stands in for reminders.utcnow, which stamps the claims."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock(run_time())
+    monkeypatch.setattr(reminders, "utcnow", clock)
+    return clock
+
+@pytest.fixture(scope="function")
+def db_session(db_session, session_factory, monkeypatch, clock):
+    monkeypatch.setattr(reminders, "SessionLocal", session_factory)
+    monkeypatch.setattr(settings, "REMINDER_SHARD_SIZE", 3)
+    monkeypatch.setattr(settings, "REMINDER_CHUNK_SIZE", 2)
+    monkeypatch.setattr(celery.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery.conf, "task_eager_propagates", True)
+    return db_session
+
+@pytest.fixture
+def outbox():
+    backend = FlakyMail()
+    set_mail_backend(backend)
+    yield backend
+    set_mail_backend(None)
+
+def run_time():
+    return (datetime.utcnow() + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+def book(db, doctor, patient, when, status=AppointmentStatus.confirmed):
+    appointment = Appointment(doctor_id=doctor.id, patient_id=patient.id, appointment_time=when, status=status)
+    db.add(appointment)
+    db.commit()
+    return appointment
+
+def seed(db):
+    doctor = User(full_name="Rahman", email="doc@example.com", mobile_number="+8801000000001",
+                  hashed_password="x", user_type="doctor")
+    patients = [User(full_name=f"Patient {i}", email=f"p{i}@example.com", mobile_number=f"+880100000001{i}",
+                     hashed_password="x", user_type="patient") for i in range(5)]
+    db.add_all([doctor, *patients])
+    db.flush()
+    now = run_time()
+    confirmed = AppointmentStatus.confirmed
+    for patient, when, status in [
+        (patients[0], now + timedelta(hours=9), confirmed),
+        (patients[1], now + timedelta(hours=9), confirmed),  # same time: keyset falls back to id
+        (patients[2], now + timedelta(hours=12), confirmed),
+        (patients[3], now + timedelta(hours=23, minutes=59, seconds=30), confirmed),
+        (patients[4], now + timedelta(hours=10), AppointmentStatus.pending),
+        (patients[4], now + timedelta(days=1), confirmed),  # beyond the lead time
+        (patients[4], now - timedelta(minutes=1), confirmed),  # already started
+    ]:
+        db.add(Appointment(doctor_id=doctor.id, patient_id=patient.id, appointment_time=when, status=status))
+    db.commit()
+    return doctor, patients
+
+def test_shards_cover_the_window_exactly_once(db_session):
+    seed(db_session)
+    now = run_time()
+    bounds = reminders.shard_bounds(db_session, now, 3)
+    assert len(bounds) == 2
+    (first_after, first_until), (second_after, second_until) = bounds
+    assert first_after is None and second_after == first_until
+    assert second_until == (now + timedelta(hours=23, minutes=59, seconds=30), 4)
+
+def test_coordinator_fans_out_shards_and_totals_them(db_session, engine, outbox):
+    seed(db_session)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        result = reminders.dispatch_reminders(run_time())
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert result.get() == {"shards": 2, "sent": 4, "failed": 0, "skipped": 0}
+    assert [m["To"] for m in outbox.outbox] == ["p0@example.com", "p1@example.com", "p2@example.com", "p3@example.com"]
+    assert "Reminder: Appointment with Dr. Rahman at" in outbox.outbox[0].get_payload()
+    # Shard 1 reads chunks of 2+1 then an empty one, shard 2 one chunk then an empty one; one batch per chunk
+    assert outbox.batches == 3
+    reads = [s for s in statements if "JOIN users AS patient" in s and "JOIN users AS doctor" in s]
+    assert len(reads) == 5
+
+def test_each_reminder_is_sent_once(db_session, outbox):
+    doctor, patients = seed(db_session)
+    now = run_time()
+    assert reminders.dispatch_reminders(now).get()["sent"] == 4
+    assert reminders.dispatch_reminders(now) is None
+    # Later runs only send what entered the window since: the appointment a day away...
+    assert reminders.dispatch_reminders(now + timedelta(minutes=5)).get()["sent"] == 1
+    # ...and a booking made after the last run
+    book(db_session, doctor, patients[4], now + timedelta(hours=2))
+    assert reminders.dispatch_reminders(now + timedelta(minutes=10)).get()["sent"] == 1
+    assert reminders.dispatch_reminders(now + timedelta(minutes=15)) is None
+    assert [m["To"] for m in outbox.outbox].count("p4@example.com") == 2
+    assert len(outbox.outbox) == 6
+    assert db_session.query(ReminderLedger).filter(ReminderLedger.sent_at.isnot(None)).count() == 6
+
+def test_overlapping_runs_skip_claimed_reminders(db_session, outbox):
+    seed(db_session)
+    now = run_time()
+    # Another worker holds the claim on p0's reminder and is still sending it
+    token, claimed = reminders.claim_reminders(db_session, [1])
+    assert claimed == {1}
+    assert reminders.claim_reminders(db_session, [1, 2])[1] == {2}
+    assert reminders.send_reminder_shard(0, now.isoformat(), None, None) == {
+        "shard": 0, "sent": 2, "failed": 0, "skipped": 0}
+    assert [m["To"] for m in outbox.outbox] == ["p2@example.com", "p3@example.com"]
+
+def test_failed_reminders_are_retried_after_the_lease(db_session, outbox, clock, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_CLAIM_LEASE_MINUTES", 15)
+    monkeypatch.setattr(settings, "REMINDER_MAX_ATTEMPTS", 2)
+    seed(db_session)
+    outbox.refuse = {"p0@example.com", "p3@example.com"}
+    now = run_time()
+    assert reminders.dispatch_reminders(now).get() == {"shards": 2, "sent": 2, "failed": 2, "skipped": 0}
+    # Still within the lease: failures are not retried straight away
+    assert reminders.dispatch_reminders(now + timedelta(minutes=5)).get() == {
+        "shards": 1, "sent": 1, "failed": 0, "skipped": 0}  # only the appointment a day away
+    outbox.refuse = {"p3@example.com"}
+    clock.now = now + timedelta(minutes=20)
+    assert reminders.dispatch_reminders(clock.now).get() == {
+        "shards": 1, "sent": 1, "failed": 1, "skipped": 0}
+    # p3 has used up its attempts
+    clock.now = now + timedelta(minutes=40)
+    assert reminders.dispatch_reminders(clock.now) is None
+    assert [m["To"] for m in outbox.outbox] == ["p1@example.com", "p2@example.com", "p4@example.com", "p0@example.com"]
+    ledger = {row.appointment_id: row for row in db_session.query(ReminderLedger)}
+    assert ledger[1].attempts == 2 and ledger[1].sent_at is not None
+    assert ledger[4].attempts == 2 and ledger[4].sent_at is None
+
+def test_lease_runs_from_the_claim_not_the_run(db_session, outbox, clock, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_CLAIM_LEASE_MINUTES", 15)
+    seed(db_session)
+    outbox.refuse = {"p0@example.com"}
+    now = run_time()
+    # The shard waited in the queue past the lease before claiming
+    clock.now = now + timedelta(minutes=20)
+    assert reminders.send_reminder_shard(0, now.isoformat(), None, None)["failed"] == 1
+    assert db_session.get(ReminderLedger, 1).claimed_at == clock.now
+    # Its claims are held for a full lease from then
+    clock.now = now + timedelta(minutes=30)
+    assert reminders.dispatch_reminders(clock.now).get()["sent"] == 1  # only the appointment a day away
+    assert [m["To"] for m in outbox.outbox].count("p0@example.com") == 0
+
+def test_permanent_refusals_are_not_retried(db_session, outbox, clock, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_CLAIM_LEASE_MINUTES", 15)
+    seed(db_session)
+    outbox.refuse, outbox.code = {"p0@example.com"}, 550
+    now = run_time()
+    assert reminders.dispatch_reminders(now).get()["failed"] == 1
+    ledger = db_session.get(ReminderLedger, 1)
+    assert ledger.failed_at == now and ledger.sent_at is None
+
+    outbox.refuse = set()
+    clock.now = now + timedelta(minutes=20)
+    assert reminders.dispatch_reminders(clock.now).get()["sent"] == 1  # only the appointment a day away
+    assert reminders.claim_reminders(db_session, [1])[1] == set()
+    assert "p0@example.com" not in [m["To"] for m in outbox.outbox]
+
+def test_nothing_to_send(db_session, outbox):
+    assert reminders.send_appointment_reminders() == {"result_id": None}
+    assert outbox.batches == 0
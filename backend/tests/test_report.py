@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.db.models.user import User
+from app.db.models.appointment import Appointment, AppointmentStatus
+from app.core.mail import MemoryBackend, set_mail_backend
+from app.tasks import report
+
+@pytest.fixture(scope="function")
+def db_session(db_session, session_factory, monkeypatch):
+    monkeypatch.setattr(report, "SessionLocal", session_factory)
+    return db_session
+
+@pytest.fixture
+def outbox():
+    backend = MemoryBackend()
+    set_mail_backend(backend)
+    yield backend
+    set_mail_backend(None)
+
+def user(db, name, user_type, fee=None):
+    number = db.query(User).count()
+    u = User(full_name=name, email=f"{name.lower()}@example.com", mobile_number=f"+880100000{number:04d}",
+             hashed_password="x", user_type=user_type, consultation_fee=fee)
+    db.add(u)
+    db.flush()
+    return u
+
+def seed(db):
+    rahman = user(db, "Rahman", "doctor", fee=500)
+    karim = user(db, "Karim", "doctor")  # no fee set
+    idle = user(db, "Idle", "doctor", fee=800)
+    user(db, "Admin", "admin")
+    patients = [user(db, f"Patient{i}", "patient") for i in range(3)]
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    this_month = month_start + timedelta(minutes=1)
+    for doctor, patient, when, status in [
+        (rahman, patients[0], this_month, AppointmentStatus.completed),
+        (rahman, patients[0], this_month, AppointmentStatus.confirmed),
+        (rahman, patients[1], this_month, AppointmentStatus.completed),
+        (rahman, patients[2], this_month, AppointmentStatus.cancelled),
+        (rahman, patients[2], this_month, AppointmentStatus.pending),
+        (rahman, patients[2], month_start - timedelta(minutes=1), AppointmentStatus.completed),  # last month
+        (karim, patients[1], this_month, AppointmentStatus.completed),
+    ]:
+        db.add(Appointment(doctor_id=doctor.id, patient_id=patient.id, appointment_time=when, status=status))
+    db.commit()
+
+def test_report_totals_every_doctor_in_one_query(db_session, engine, outbox):
+    seed(db_session)
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert report.generate_monthly_doctor_report() == {"sent": 3, "failed": 0}
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    bodies = {m["To"]: m.get_payload(decode=True).decode() for m in outbox.outbox}
+    assert list(bodies) == ["rahman@example.com", "karim@example.com", "idle@example.com"]
+    rahman = bodies["rahman@example.com"]
+    assert "Monthly Report for Dr. Rahman" in rahman
+    assert "Total Patients Seen: 2" in rahman
+    assert "Total Appointments : 3" in rahman
+    assert "Total Earnings     : BDT 1500.00" in rahman
+    assert "Total Appointments : 1" in bodies["karim@example.com"]
+    assert "Total Earnings     : BDT 0.00" in bodies["karim@example.com"]
+    assert "Total Patients Seen: 0" in bodies["idle@example.com"]
+    assert "Total Earnings     : BDT 0.00" in bodies["idle@example.com"]
@@ -52,11 +52,12 @@ def test_register_user_without_profile_image(db_session):
     assert data["email"] == user_data["email"]
     assert data["full_name"] == user_data["full_name"]
     assert "profile_image" not in data
+    assert data["avatar_url"] is None
 
     # Verify user in db
     user = db_session.query(User).filter(User.email == user_data["email"]).first()
     assert user is not None
-    assert user.profile_image is None
+    assert user.profile_image_key is None
 
 def test_register_user_with_profile_image(db_session):
     user_data = {
@@ -84,9 +85,9 @@ def test_register_user_with_profile_image(db_session):
     data = response.json()
     assert data["email"] == user_data["email"]
     assert data["full_name"] == user_data["full_name"]
-    assert data["profile_image"] is not None
+    assert data["avatar_url"] is not None
 
     # Verify user in db
     user = db_session.query(User).filter(User.email == user_data["email"]).first()
     assert user is not None
-    assert user.profile_image is not None
+    assert user.profile_image_key is not None
@@ -3,8 +3,8 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.db.database import Base
-from app.api.v1.auth import get_db
+from app.db.database import Base, get_db
+from app.api.v1 import auth
 from app.db.models.user import User
 import os
 
@@ -115,3 +115,60 @@ def test_register_duplicate_mobile_number():
         )
     assert response2.status_code == 400
     assert "Mobile number already registered" in response2.json()["detail"]
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    passwords = []
+    original = auth.hash_password_async
+
+    async def counting(password):
+        passwords.append(password)
+        return await original(password)
+
+    monkeypatch.setattr(auth, "hash_password_async", counting)
+    return passwords
+
+def register(**fields):
+    data = {
+        "full_name": "Test User",
+        "email": "test@example.com",
+        "mobile_number": "+8801234567890",
+        "password": "Str0ngP@ssw0rd!",
+        "user_type": "patient",
+        **fields
+    }
+    with open("dummy_image.png", "rb") as f:
+        return client.post("/api/v1/auth/register", data=data,
+                           files={"profile_image": ("dummy_image.png", f, "image/png")})
+
+
+def test_rejected_registrations_are_not_hashed(hashed):
+    weak = register(password="weakpassword")
+    assert weak.status_code == 422
+    assert weak.json()["detail"][0]["loc"] == ["password"]
+    assert register(user_type="doctor").status_code == 422
+    assert hashed == []
+
+    assert register().status_code == 200
+    assert register(mobile_number="+8801234567891").status_code == 400
+    assert register(email="other@example.com").status_code == 400
+    assert hashed == ["Str0ngP@ssw0rd!"]
+
+def test_login_verifies_without_holding_a_connection(monkeypatch):
+    assert register().status_code == 200
+    held = []
+    original = auth.verify_password_async
+
+    async def checking(plain, hashed):
+        held.append(engine.pool.checkedout())
+        return await original(plain, hashed)
+
+    monkeypatch.setattr(auth, "verify_password_async", checking)
+    login = {"email": "test@example.com", "password": "Str0ngP@ssw0rd!"}
+    response = client.post("/api/v1/auth/login", json=login)
+    assert response.status_code == 200
+    assert response.json()["email"] == "test@example.com"
+    assert client.post("/api/v1/auth/login", json={**login, "password": "Wr0ngP@ssw0rd!"}).status_code == 401
+    assert client.post("/api/v1/auth/login", json={**login, "email": "nobody@example.com"}).status_code == 401
+    assert held == [0, 0]
@@ -11,7 +11,7 @@ export default function DoctorProfile() {
       <div className="p-6">
         <div className="flex items-center space-x-4">
           <img
-            src={user?.profile_image ? `data:image/png;base64,${user.profile_image}` : "/default-avatar.png"}
+            src={user?.avatar_url ? `http://localhost:8000${user.avatar_url}` : "/default-avatar.png"}
             alt="Profile"
             className="w-24 h-24 rounded-full"
           />
@@ -33,13 +33,17 @@ export default function AppointmentList() {
   const [doctorSearch, setDoctorSearch] = useState<string>(""); // For patients searching doctors
   const [patientSearch, setPatientSearch] = useState<string>(""); // For doctors searching patients
 
-  // Pagination
+  // Pagination: one page per request, walked with the API's keyset cursors.
+  // Only the current page's rows are held; `cursors` keeps the cursor of each
+  // page before it (null for the first), so Prev can go back.
   const rowsPerPage = 8;
-  const [currentPage, setCurrentPage] = useState<number>(1);
+  const [cursors, setCursors] = useState<(string | null)[]>([null]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const currentPage = cursors.length;
 
   const token = typeof window !== "undefined" ? localStorage.getItem("token") : null;
 
-  const fetchAppointments = async () => {
+  const fetchAppointments = async (pageCursors: (string | null)[] = [null]) => {
     if (!token) return;
     setLoading(true);
 
@@ -50,6 +54,7 @@ export default function AppointmentList() {
       setUser(userRes.data);
 
       const params = new URLSearchParams();
+      params.append("limit", String(rowsPerPage));
       if (statusFilter) params.append("status", statusFilter);
       if (dateFrom) params.append("date_from", dateFrom);
       if (dateTo) params.append("date_to", dateTo);
@@ -62,12 +67,15 @@ export default function AppointmentList() {
         params.append("patient_name", patientSearch);
       }
 
+      const cursor = pageCursors[pageCursors.length - 1];
+      if (cursor) params.append("cursor", cursor);
+
       const apptRes = await axios.get(`http://localhost:8000/api/v1/appointment/appointments?${params.toString()}`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-
-      setAppointments(apptRes.data);
-      setCurrentPage(1); // Reset to page 1 after fetch
+      setAppointments(apptRes.data.items);
+      setNextCursor(apptRes.data.next_cursor);
+      setCursors(pageCursors);
     } catch (err) {
       console.error("Error loading appointments", err);
       setNotification({ message: "Error loading appointments.", type: "error" });
@@ -90,7 +98,7 @@ export default function AppointmentList() {
         { status },
         { headers: { Authorization: `Bearer ${token}` } }
       );
-      fetchAppointments();
+      fetchAppointments(cursors); // Stay on the current page
       setNotification({ message: "Status updated successfully.", type: "success" });
     } catch (err) {
       console.error("Error updating status", err);
@@ -113,17 +121,12 @@ export default function AppointmentList() {
     fetchAppointments();
   };
 
-  // Pagination logic
-  const totalPages = Math.ceil(appointments.length / rowsPerPage);
-  const paginatedAppointments = appointments.slice(
-    (currentPage - 1) * rowsPerPage,
-    currentPage * rowsPerPage
-  );
+  const handleNextPage = () => {
+    if (nextCursor) fetchAppointments([...cursors, nextCursor]);
+  };
 
-  const handlePageChange = (page: number) => {
-    if (page > 0 && page <= totalPages) {
-      setCurrentPage(page);
-    }
+  const handlePrevPage = () => {
+    if (cursors.length > 1) fetchAppointments(cursors.slice(0, -1));
   };
 
   return (
@@ -239,7 +242,7 @@ export default function AppointmentList() {
               </tr>
             </thead>
             <tbody>
-              {paginatedAppointments.map((appt, idx) => (
+              {appointments.map((appt, idx) => (
                 <tr key={appt.id} className="hover:bg-gray-50">
                   <td className="p-2 border">{(currentPage - 1) * rowsPerPage + idx + 1}</td>
                   {user?.user_type !== "doctor" && (
@@ -284,18 +287,18 @@ export default function AppointmentList() {
           {/* Pagination Controls */}
           <div className="mt-4 flex justify-center items-center gap-4">
             <button
-              onClick={() => handlePageChange(currentPage - 1)}
+              onClick={handlePrevPage}
               disabled={currentPage === 1}
               className="px-3 py-1 rounded border bg-gray-200 hover:bg-gray-300 disabled:opacity-50"
             >
               Prev
             </button>
             <span className="font-semibold">
-              Page {currentPage} of {totalPages}
+              Page {currentPage}
             </span>
             <button
-              onClick={() => handlePageChange(currentPage + 1)}
-              disabled={currentPage === totalPages}
+              onClick={handleNextPage}
+              disabled={!nextCursor}
               className="px-3 py-1 rounded border bg-gray-200 hover:bg-gray-300 disabled:opacity-50"
             >
               Next